@@ -6,15 +6,48 @@ Municipal Health Office Bay, Laguna
 
 import sys
 import os
-import pickle
+import time
+_PROCESS_START = time.perf_counter()
 import json
+import html
+from collections import OrderedDict
 import pandas as pd
 from datetime import datetime
 from PyQt5.QtWidgets import *
-from PyQt5.QtCore import Qt, QSize
-from PyQt5.QtGui import QFont, QColor, QPainter
+from PyQt5.QtCore import Qt, QSize, QTimer, QEvent, QFileSystemWatcher, QThread, pyqtSignal
+from PyQt5.QtGui import QFont, QColor, QPainter, QPixmap, QTextDocument
 from PyQt5.QtPrintSupport import QPrinter, QPrintDialog
 import numpy as np
+from scoring import RISK_LABELS, FULL_MODEL_NAME, BASIC_MODEL_NAME
+from model_registry import ModelRegistry, model_files
+from history_store import open_history_store
+from history_model import HistoryTableModel
+from history_export import (FORMATS as EXPORT_FORMATS, export_history, available_formats,
+                            date_filters, format_for_path, with_extension)
+from rollups import RollupStore
+from history_sync import SYNC_DIR, ChangeLog
+from drift import DriftMonitor, format_report
+from shadow import open_shadow_scorer
+from report_templates import recommendations_html
+from perf import PhaseTimer, LatencyStats, METRICS
+from workers import TaskRunner
+from prediction_cache import PredictionCache
+
+STARTUP = PhaseTimer(_PROCESS_START)
+STARTUP.record("imports", _PROCESS_START)
+
+# Live preview: rescore this long after the last change, and rebuild the
+# recommendations once the values have been left alone for the settle delay
+PREVIEW_DEBOUNCE_MS = 80
+PREVIEW_SETTLE_MS = 700
+# Previous visits are looked up once typing in Patient ID pauses
+PATIENT_LOOKUP_MS = 250
+VISITS_SHOWN = 5
+# Model files are reloaded once they have stopped changing for this long, so
+# a copy in progress is not picked up half-written
+MODEL_RELOAD_DELAY_MS = 1500
+# With MRS_SYNC_DIR set, new saves are shipped to the shared folder this often
+SYNC_INTERVAL_MS = 60000
 
 # Design System Colors
 COLORS = {
@@ -42,7 +75,22 @@ class ModernCard(QFrame):
         self.content_layout = layout
         self.setLayout(layout)
 
+def set_style_property(widget, name, value):
+    """Set a dynamic property used by the stylesheet and re-polish the widget,
+    skipping the (costly) re-polish when the value is unchanged."""
+    if widget.property(name) == value:
+        return False
+    widget.setProperty(name, value)
+    widget.style().unpolish(widget)
+    widget.style().polish(widget)
+    return True
+
 class RiskIndicator(QWidget):
+    # Rendered gauges keyed on (risk, confidence text, size, pixel ratio);
+    # the confidence is shown to 0.1%, so that is the natural bucket
+    CACHE_SIZE = 256
+    _cache = OrderedDict()
+    
     def __init__(self, parent=None):
         super().__init__(parent)
         self.risk_level = "Low"
@@ -50,12 +98,31 @@ class RiskIndicator(QWidget):
         self.setMinimumSize(200, 200)
     
     def set_risk(self, level, confidence):
+        if level == self.risk_level and f"{confidence:.1f}" == f"{self.confidence:.1f}":
+            return
         self.risk_level = level
         self.confidence = confidence
         self.update()
     
     def paintEvent(self, event):
-        painter = QPainter(self)
+        with METRICS.stage('paint.indicator'):
+            ratio = self.devicePixelRatioF()
+            key = (self.risk_level, f"{self.confidence:.1f}", self.width(), self.height(), ratio)
+            pixmap = self._cache.get(key)
+            if pixmap is None:
+                pixmap = self.render_gauge(ratio)
+                self._cache[key] = pixmap
+                if len(self._cache) > self.CACHE_SIZE:
+                    self._cache.popitem(last=False)
+            else:
+                self._cache.move_to_end(key)
+            QPainter(self).drawPixmap(0, 0, pixmap)
+    
+    def render_gauge(self, ratio):
+        pixmap = QPixmap(round(self.width() * ratio), round(self.height() * ratio))
+        pixmap.setDevicePixelRatio(ratio)
+        pixmap.fill(Qt.transparent)
+        painter = QPainter(pixmap)
         painter.setRenderHint(QPainter.Antialiasing)
         
         if self.risk_level == "Low":
@@ -78,35 +145,143 @@ class RiskIndicator(QWidget):
         font = QFont("Inter", 24, QFont.Bold)
         painter.setFont(font)
         painter.drawText(rect, Qt.AlignCenter, f"{self.confidence:.1f}%")
+        painter.end()
+        return pixmap
+
+def print_html(document_html, printer):
+    """Lay out and print HTML; runs on a worker thread."""
+    document = QTextDocument()
+    document.setHtml(document_html)
+    document.print_(printer)
+
+def load_startup_data():
+    """Models and history for the window; runs on the StartupLoader thread."""
+    data = {}
+    with STARTUP.phase("load models"):
+        # Hashed .npz bundles when exported, otherwise the pickles
+        registry = ModelRegistry()
+        models = registry.activate(registry.load())
+        data['registry'] = registry
+        data['drift'] = DriftMonitor({'full': models.config_full['feature_ranges'],
+                                      'basic': models.config_basic['feature_ranges']})
+    with STARTUP.phase("load shadow models"):
+        # Candidate pair from MRS_SHADOW_DIR, if any
+        data['shadow'] = open_shadow_scorer()
+    with STARTUP.phase("open history"):
+        store = open_history_store()
+        data['history_repaired'] = store.recover()
+        store.mark()
+        data['history_store'] = store
+        data['rollups'] = RollupStore()
+        data['changelog'] = ChangeLog() if SYNC_DIR else None
+        data['sync_unseeded'] = False
+        if data['changelog'] is not None and not data['changelog'].seeded():
+            if next(store.iter_chunks(chunk_size=1), None) is None:
+                data['changelog'].mark_seeded()
+            else:
+                # Saves from before sync was turned on are not in the log
+                data['sync_unseeded'] = True
+    with STARTUP.phase("index patients"):
+        store.index_patients()
+    return data
+
+class StartupLoader(QThread):
+    loaded = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    
+    def run(self):
+        try:
+            self.loaded.emit(load_startup_data())
+        except Exception as e:
+            self.failed.emit(str(e))
 
 class MaternalRiskApp(QMainWindow):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("Maternal Risk Assessment System - Bay, Laguna")
         self.setGeometry(100, 50, 1400, 900)
-        self.load_models()
-        self.init_ui()
-        self.apply_modern_styles()
+        self.risk_labels = RISK_LABELS
+        self.models_ready = False
+        self.registry = None
+        self.pending_models = None
+        self.shadow = None
+        self.drift = None
+        self.history_store = None
+        self.history_built = False
+        self.rollups = None
+        self.changelog = None
+        self.dashboard_built = False
+        self.current_assessment = None
+        self.tasks = TaskRunner(self)
+        self.prediction_cache = PredictionCache()
+        self.preview_latency = LatencyStats()
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(PREVIEW_DEBOUNCE_MS)
+        self.preview_timer.timeout.connect(self.update_preview)
+        self.settle_timer = QTimer(self)
+        self.settle_timer.setSingleShot(True)
+        self.settle_timer.setInterval(PREVIEW_SETTLE_MS)
+        self.settle_timer.timeout.connect(self.settle_preview)
+        self.visits_timer = QTimer(self)
+        self.visits_timer.setSingleShot(True)
+        self.visits_timer.setInterval(PATIENT_LOOKUP_MS)
+        self.visits_timer.timeout.connect(self.show_patient_visits)
+        self.model_reload_timer = QTimer(self)
+        self.model_reload_timer.setSingleShot(True)
+        self.model_reload_timer.setInterval(MODEL_RELOAD_DELAY_MS)
+        self.model_reload_timer.timeout.connect(self.reload_models)
+        self.sync_timer = QTimer(self)
+        self.sync_timer.setInterval(SYNC_INTERVAL_MS)
+        self.sync_timer.timeout.connect(self.ship_changes)
+        with STARTUP.phase("build main window"):
+            self.init_ui()
+        with STARTUP.phase("apply styles"):
+            self.apply_modern_styles()
     
-    def load_models(self):
-        try:
-            with open('model_BEST_for_deployment.pkl', 'rb') as f:
-                self.model_full = pickle.load(f)
-            with open('scaler.pkl', 'rb') as f:
-                self.scaler_full = pickle.load(f)
-            with open('model_config.json', 'r') as f:
-                self.config_full = json.load(f)
-            with open('model_BASIC_for_deployment.pkl', 'rb') as f:
-                self.model_basic = pickle.load(f)
-            with open('scaler_BASIC.pkl', 'rb') as f:
-                self.scaler_basic = pickle.load(f)
-            with open('model_config_BASIC.json', 'r') as f:
-                self.config_basic = json.load(f)
-            self.risk_labels = {0: 'Low', 1: 'Moderate', 2: 'High'}
-            print("✓ Models loaded successfully")
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load models: {e}")
-            sys.exit(1)
+    def start_loading(self):
+        """Load models and history in the background; the window is already up."""
+        self.loader = StartupLoader(self)
+        self.loader.setObjectName("StartupLoader")
+        self.loader.loaded.connect(self.on_startup_loaded)
+        self.loader.failed.connect(self.on_startup_failed)
+        self.loader.start()
+    
+    def on_startup_loaded(self, data):
+        self.registry = data['registry']
+        self.shadow = data['shadow']
+        self.drift = data['drift']
+        self.history_store = data['history_store']
+        self.rollups = data['rollups']
+        self.changelog = data['changelog']
+        if self.changelog is not None:
+            self.sync_timer.start()
+            self.ship_changes()
+        models = self.registry.current
+        print(f"✓ Models loaded successfully ({models.source_full}, {models.source_basic})")
+        self.show_model_version(models)
+        self.watch_model_files()
+        # Catches files replaced between loading and watching them
+        self.model_reload_timer.start()
+        if data['history_repaired']:
+            print(f"✓ History file repaired: {data['history_repaired']}")
+        self.models_ready = True
+        self.assess_btn.setEnabled(True)
+        self.assess_btn.setText("Calculate Risk Assessment")
+        self.statusBar().showMessage("Ready | Dual Model: Full (90.6%) | Basic (85.2%)")
+        if data['sync_unseeded']:
+            message = ("History sync is on, but assessments saved before it was turned on "
+                       "are not shared yet; run 'python history_sync.py seed'")
+            print(message)
+            self.statusBar().showMessage(message)
+        if self.tabs.currentWidget() in (self.history_page, self.dashboard_page):
+            self.ensure_tab_built(self.tabs.currentIndex())
+        STARTUP.record("ready", STARTUP.start)
+        print(STARTUP.report())
+    
+    def on_startup_failed(self, message):
+        QMessageBox.critical(self, "Error", f"Failed to load models: {message}")
+        QApplication.instance().exit(1)
     
     def init_ui(self):
         central_widget = QWidget()
@@ -124,14 +299,66 @@ class MaternalRiskApp(QMainWindow):
         self.tabs = QTabWidget()
         self.tabs.setObjectName("modernTabs")
         self.assessment_tab = self.create_modern_assessment_tab()
-        self.history_tab = self.create_history_tab()
-        self.about_tab = self.create_about_tab()
+        # History, Dashboard and About are filled in on first activation
+        self.history_page = self.create_lazy_page("historyTab")
+        self.dashboard_page = self.create_lazy_page("dashboardTab")
+        self.about_page = self.create_lazy_page("aboutTab")
         self.tabs.addTab(self.assessment_tab, "New Assessment")
-        self.tabs.addTab(self.history_tab, "History")
-        self.tabs.addTab(self.about_tab, "About")
+        self.tabs.addTab(self.history_page, "History")
+        self.tabs.addTab(self.dashboard_page, "Dashboard")
+        self.tabs.addTab(self.about_page, "About")
+        self.tabs.currentChanged.connect(self.ensure_tab_built)
         
         main_layout.addWidget(self.tabs)
-        self.statusBar().showMessage("Ready | Dual Model: Full (90.6%) | Basic (85.2%)")
+        self.busy_indicator = QProgressBar()
+        self.busy_indicator.setRange(0, 0)
+        self.busy_indicator.setMaximumWidth(120)
+        self.busy_indicator.setMaximumHeight(14)
+        self.busy_indicator.setTextVisible(False)
+        self.busy_indicator.setVisible(False)
+        self.statusBar().addPermanentWidget(self.busy_indicator)
+        self.tasks.busyChanged.connect(self.busy_indicator.setVisible)
+        self.metrics_label = QLabel()
+        self.metrics_label.setObjectName("metricsLabel")
+        self.metrics_label.setVisible(METRICS.enabled)
+        self.statusBar().addPermanentWidget(self.metrics_label)
+        self.model_version_label = QLabel()
+        self.model_version_label.setObjectName("modelVersionLabel")
+        self.statusBar().addPermanentWidget(self.model_version_label)
+        # Replaced model files are picked up without a restart
+        self.model_watcher = QFileSystemWatcher(self)
+        self.model_watcher.fileChanged.connect(self.model_reload_timer.start)
+        self.model_watcher.directoryChanged.connect(self.model_reload_timer.start)
+        self.assess_btn.setEnabled(False)
+        self.assess_btn.setText("Loading models...")
+        self.statusBar().showMessage("Loading models and history...")
+    
+    def create_lazy_page(self, object_name):
+        page = QWidget()
+        page.setObjectName(object_name)
+        layout = QVBoxLayout()
+        layout.setContentsMargins(0, 0, 0, 0)
+        page.setLayout(layout)
+        return page
+    
+    def ensure_tab_built(self, index):
+        page = self.tabs.widget(index)
+        if page is self.history_page and not self.history_built and self.history_store is not None:
+            with STARTUP.phase("build History tab"):
+                self.history_page.layout().addWidget(self.create_history_tab())
+                self.history_built = True
+                self.load_history()
+        elif page is self.dashboard_page and self.rollups is not None:
+            if not self.dashboard_built:
+                with STARTUP.phase("build Dashboard tab"):
+                    self.dashboard_page.layout().addWidget(self.create_dashboard_tab())
+                    self.dashboard_built = True
+                if not self.rollups.is_built(self.history_store):
+                    self.rebuild_rollups()
+            self.load_dashboard()
+        elif page is self.about_page and not self.about_page.layout().count():
+            with STARTUP.phase("build About tab"):
+                self.about_page.layout().addWidget(self.create_about_tab())
     
     def create_modern_header(self):
         header = QFrame()
@@ -244,6 +471,7 @@ class MaternalRiskApp(QMainWindow):
         self.patient_id = QLineEdit()
         self.patient_id.setObjectName("modernInput")
         self.patient_id.setPlaceholderText("e.g., P-2024-001")
+        self.patient_id.textChanged.connect(self.visits_timer.start)
         
         worker_label = QLabel("Health Worker")
         worker_label.setObjectName("formLabel")
@@ -262,9 +490,63 @@ class MaternalRiskApp(QMainWindow):
         form_layout.addWidget(self.health_worker, 1, 1)
         form_layout.addWidget(date_label, 2, 0)
         form_layout.addWidget(date_value, 3, 0, 1, 2)
+        
+        self.patient_visits = QLabel()
+        self.patient_visits.setObjectName("patientVisits")
+        self.patient_visits.setTextFormat(Qt.RichText)
+        self.patient_visits.setWordWrap(True)
+        self.patient_visits.setVisible(False)
+        form_layout.addWidget(self.patient_visits, 4, 0, 1, 2)
         card.content_layout.addLayout(form_layout)
         return card
     
+    def show_patient_visits(self):
+        """Previous visits of the patient whose ID is typed in, from the
+        history's patient index."""
+        patient_id = self.patient_id.text().strip()
+        if not patient_id or self.history_store is None:
+            self.patient_visits.setVisible(False)
+            return
+        try:
+            with METRICS.stage('patient.lookup'):
+                visits = self.history_store.visits(patient_id)
+        except Exception as e:
+            print(f"Error looking up patient: {e}")
+            visits = []
+        if not visits:
+            self.patient_visits.setText(f"No previous visits for {html.escape(patient_id)}")
+            self.patient_visits.setVisible(True)
+            return
+        risk_colors = {'Low': COLORS['success'], 'Moderate': COLORS['warning'], 'High': COLORS['danger']}
+
+        def field(visit, column, width=None):
+            # Stored values are free text; escape them before they go into the label's HTML
+            return html.escape(str(visit.get(column, ''))[:width])
+        rows = []
+        for visit in reversed(visits[-VISITS_SHOWN:]):
+            risk = visit.get('Risk_Level', '')
+            bmi = field(visit, 'BMI')
+            try:
+                bmi = f"{float(visit.get('BMI', '')):.1f}"
+            except (TypeError, ValueError):
+                pass
+            rows.append(
+                f"<tr><td>{field(visit, 'Timestamp', 10)}</td>"
+                f"<td style='color:{risk_colors.get(risk, COLORS['gray_600'])}'><b>{field(visit, 'Risk_Level')}</b></td>"
+                f"<td>{field(visit, 'SystolicBP')}/{field(visit, 'DiastolicBP')}</td>"
+                f"<td>{bmi}</td><td>{field(visit, 'Hemoglobin')}</td></tr>")
+        trend = ""
+        if len(visits) > 1:
+            first, last = visits[0], visits[-1]
+            trend = (f"<p>Systolic BP {field(first, 'SystolicBP')} &rarr; {field(last, 'SystolicBP')} "
+                     f"since {field(first, 'Timestamp', 10)}</p>")
+        self.patient_visits.setText(
+            f"<p><b>{len(visits)} previous visit{'s' if len(visits) != 1 else ''}</b></p>"
+            f"<table cellspacing='0' cellpadding='4'>"
+            f"<tr><th align='left'>Date</th><th align='left'>Risk</th><th align='left'>BP</th>"
+            f"<th align='left'>BMI</th><th align='left'>Hb</th></tr>{''.join(rows)}</table>{trend}")
+        self.patient_visits.setVisible(True)
+    
     def create_clinical_measurements_card(self):
         card = ModernCard("Clinical Measurements")
         form_layout = QVBoxLayout()
@@ -379,6 +661,16 @@ class MaternalRiskApp(QMainWindow):
         self.model_indicator.setWordWrap(True)
         self.update_model_indicator()
         form_layout.addWidget(self.model_indicator)
+        
+        self.live_preview = QCheckBox("Live preview while typing")
+        self.live_preview.setObjectName("modernCheckbox")
+        self.live_preview.setChecked(False)
+        self.live_preview.stateChanged.connect(self.toggle_live_preview)
+        form_layout.addWidget(self.live_preview)
+        for spin_box in (self.weight_input, self.height_input, self.systolic_input,
+                         self.diastolic_input, self.blood_sugar_input, self.hemoglobin_input):
+            spin_box.valueChanged.connect(self.schedule_preview)
+        self.lab_available.stateChanged.connect(self.schedule_preview)
         card.content_layout.addLayout(form_layout)
         return card
     
@@ -431,6 +723,17 @@ class MaternalRiskApp(QMainWindow):
         self.model_used_label.setAlignment(Qt.AlignCenter)
         results_layout.addWidget(self.model_used_label)
         
+        self.probability_line = QLabel()
+        self.probability_line.setObjectName("probabilityLine")
+        self.probability_line.setAlignment(Qt.AlignCenter)
+        results_layout.addWidget(self.probability_line)
+        
+        self.drift_warning = QLabel()
+        self.drift_warning.setObjectName("driftWarning")
+        self.drift_warning.setWordWrap(True)
+        self.drift_warning.setVisible(False)
+        results_layout.addWidget(self.drift_warning)
+        
         rec_title = QLabel("Recommended Actions")
         rec_title.setObjectName("sectionTitle")
         results_layout.addWidget(rec_title)
@@ -479,12 +782,10 @@ class MaternalRiskApp(QMainWindow):
     def update_model_indicator(self):
         if self.lab_available.isChecked():
             self.model_indicator.setText("Using: Full Model (5 features) - 90.6% accuracy")
-            self.model_indicator.setProperty("indicatorType", "full")
+            set_style_property(self.model_indicator, "indicatorType", "full")
         else:
             self.model_indicator.setText("Using: Basic Model (3 features) - 85.2% accuracy")
-            self.model_indicator.setProperty("indicatorType", "basic")
-        self.model_indicator.style().unpolish(self.model_indicator)
-        self.model_indicator.style().polish(self.model_indicator)
+            set_style_property(self.model_indicator, "indicatorType", "basic")
     
     def calculate_bmi(self):
         weight = self.weight_input.value()
@@ -504,139 +805,258 @@ class MaternalRiskApp(QMainWindow):
             else:
                 self.bmi_status.setText("Obese")
                 bmi_type = "danger"
-            self.bmi_label.setProperty("bmiType", bmi_type)
-            self.bmi_status.setProperty("bmiType", bmi_type)
-            self.bmi_label.style().unpolish(self.bmi_label)
-            self.bmi_label.style().polish(self.bmi_label)
-            self.bmi_status.style().unpolish(self.bmi_status)
-            self.bmi_status.style().polish(self.bmi_status)
+            set_style_property(self.bmi_label, "bmiType", bmi_type)
+            set_style_property(self.bmi_status, "bmiType", bmi_type)
+    
+    def read_inputs(self):
+        """Engine for the current form and the assessment it would produce."""
+        # One snapshot of the registry: a reload cannot change the model mid-assessment
+        models = self.registry.current
+        weight = self.weight_input.value()
+        height = self.height_input.value() / 100
+        bmi = weight / (height ** 2)
+        lab_available = self.lab_available.isChecked()
+        
+        input_data = {
+            'BMI': bmi, 'SystolicBP': self.systolic_input.value(),
+            'DiastolicBP': self.diastolic_input.value()
+        }
+        if lab_available:
+            input_data['Blood Sugar Level'] = self.blood_sugar_input.value()
+            input_data['Hemoglobin Level'] = self.hemoglobin_input.value()
+            engine = models.engine_full
+            model_used = FULL_MODEL_NAME
+        else:
+            engine = models.engine_basic
+            model_used = BASIC_MODEL_NAME
+        assessment = {
+            'input_data': input_data, 'bmi': bmi,
+            'model_used': model_used, 'lab_available': lab_available
+        }
+        return engine, assessment
     
     def assess_risk(self):
+        self.assess(explicit=True)
+    
+    def assess(self, explicit):
+        """Score the form. explicit is False for a settled live preview,
+        which is shown like any result but not logged as an assessment."""
+        if self.tasks.is_running('assess'):
+            return
         try:
-            weight = self.weight_input.value()
-            height = self.height_input.value() / 100
-            bmi = weight / (height ** 2)
-            lab_available = self.lab_available.isChecked()
-            
-            if lab_available:
-                input_data = pd.DataFrame({
-                    'BMI': [bmi], 'SystolicBP': [self.systolic_input.value()],
-                    'Blood Sugar Level': [self.blood_sugar_input.value()],
-                    'Hemoglobin Level': [self.hemoglobin_input.value()],
-                    'DiastolicBP': [self.diastolic_input.value()]
-                })
-                input_scaled = self.scaler_full.transform(input_data)
-                prediction_num = self.model_full.predict(input_scaled)[0]
-                prediction_proba = self.model_full.predict_proba(input_scaled)[0]
-                model_used = "Full Model (5 features)"
-            else:
-                input_data = pd.DataFrame({
-                    'BMI': [bmi], 'SystolicBP': [self.systolic_input.value()],
-                    'DiastolicBP': [self.diastolic_input.value()]
-                })
-                input_scaled = self.scaler_basic.transform(input_data)
-                prediction_num = self.model_basic.predict(input_scaled)[0]
-                prediction_proba = self.model_basic.predict_proba(input_scaled)[0]
-                model_used = "Basic Model (3 features)"
-            
-            risk_level = self.risk_labels[prediction_num]
-            confidence = prediction_proba[prediction_num] * 100
-            self.current_assessment = {
-                'risk_level': risk_level, 'confidence': confidence,
-                'probabilities': prediction_proba, 'input_data': input_data,
-                'bmi': bmi, 'model_used': model_used, 'lab_available': lab_available
-            }
-            self.display_results(risk_level, confidence, prediction_proba, model_used, lab_available)
+            began = time.perf_counter()
+            with METRICS.stage('assess.inputs'):
+                engine, assessment = self.read_inputs()
+            with METRICS.stage('assess.vector'):
+                vector = engine.vector(assessment['input_data'])
+            with METRICS.stage('assess.cache'):
+                cached = self.prediction_cache.get(engine, vector)
+            assessment['began'] = began
+            assessment['explicit'] = explicit
+            if cached is not None:
+                self.on_assessed(assessment, cached)
+                return
+            self.assess_btn.setEnabled(False)
+            self.tasks.run('assess', self.score_and_cache, engine, vector,
+                           on_done=lambda result: self.on_assessed(assessment, result),
+                           on_error=self.on_assess_failed)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Assessment failed: {str(e)}")
     
-    def display_results(self, risk_level, confidence, probabilities, model_used, lab_available):
+    def score_and_cache(self, engine, vector):
+        with METRICS.stage('assess.score'):
+            result = engine.score(vector)
+        self.prediction_cache.put(engine, vector, result)
+        return result
+    
+    def toggle_live_preview(self):
+        if self.live_preview.isChecked():
+            self.schedule_preview()
+        else:
+            self.preview_timer.stop()
+            self.settle_timer.stop()
+            self.save_btn.setEnabled(not self.tasks.is_running('save'))
+            self.statusBar().showMessage("Ready | Dual Model: Full (90.6%) | Basic (85.2%)")
+    
+    def schedule_preview(self):
+        if not (self.models_ready and self.live_preview.isChecked()):
+            return
+        # The shown result no longer matches the form until it settles
+        self.save_btn.setEnabled(False)
+        self.settle_timer.stop()
+        self.preview_timer.start()
+    
+    def update_preview(self):
+        """Rescore the form and refresh the indicator and probability line only;
+        the recommendations wait for settle_preview."""
+        began = time.perf_counter()
+        try:
+            engine, assessment = self.read_inputs()
+            prediction_num, prediction_proba = self.prediction_cache.score(
+                engine, engine.vector(assessment['input_data']))
+        except Exception as e:
+            self.statusBar().showMessage(f"Live preview unavailable: {e}")
+            return
+        risk_level = self.risk_labels[prediction_num]
         self.results_card.setVisible(True)
+        self.show_risk(risk_level, prediction_proba[prediction_num] * 100, prediction_proba)
+        self.show_drift_flags(self.drift.out_of_range(self.model_kind(assessment), assessment['input_data']))
+        self.preview_latency.add(time.perf_counter() - began)
+        self.statusBar().showMessage(f"Live preview: {self.preview_latency.summary()}")
+        self.update_metrics_readout('frame')
+        self.settle_timer.start()
+    
+    def settle_preview(self):
+        # Scored and cached by the last preview, so this completes synchronously
+        if self.models_ready and self.live_preview.isChecked():
+            self.assess(explicit=False)
+    
+    def on_assessed(self, assessment, result):
+        self.assess_btn.setEnabled(True)
+        self.apply_pending_models()
+        self.save_btn.setEnabled(not self.tasks.is_running('save'))
+        prediction_num, prediction_proba = result
+        risk_level = self.risk_labels[prediction_num]
+        confidence = prediction_proba[prediction_num] * 100
+        assessment.update({
+            'risk_level': risk_level, 'confidence': confidence,
+            'probabilities': prediction_proba, 'saved': False
+        })
+        self.current_assessment = assessment
+        self.display_results(risk_level, confidence, prediction_proba,
+                             assessment['model_used'], assessment['lab_available'])
+        self.show_drift_flags(self.drift.out_of_range(self.model_kind(assessment), assessment['input_data']))
+        if assessment['explicit']:
+            self.submit_shadow(assessment)
+            self.observe_drift(assessment)
+        METRICS.record('assess.total', time.perf_counter() - assessment.pop('began'))
+        self.update_metrics_readout('assess')
+    
+    def submit_shadow(self, assessment):
+        """Hand an assessment to the shadow scorer once. Only explicit Assess
+        and Save count, so half-typed live previews stay out of the log."""
+        if self.shadow is None or assessment.get('shadowed'):
+            return
+        assessment['shadowed'] = True
+        self.shadow.submit(self.model_kind(assessment), assessment['input_data'],
+                           assessment['risk_level'], assessment['probabilities'])
+    
+    def observe_drift(self, assessment):
+        """Add an assessment's inputs to the drift statistics once, on the
+        same explicit Assess or Save as submit_shadow."""
+        if assessment.get('observed'):
+            return
+        assessment['observed'] = True
+        self.drift.observe(self.model_kind(assessment), assessment['input_data'])
+    
+    def on_assess_failed(self, message):
+        self.assess_btn.setEnabled(True)
+        self.apply_pending_models()
+        QMessageBox.critical(self, "Error", f"Assessment failed: {message}")
+    
+    def watch_model_files(self):
+        # Replacing a file drops it from the watcher, so re-add after every change;
+        # the folder itself reports files that are created or renamed into place
+        paths = [os.path.abspath(p) for p in model_files() if os.path.exists(p)]
+        paths.append(os.path.dirname(paths[0]) if paths else os.getcwd())
+        watched = set(self.model_watcher.files()) | set(self.model_watcher.directories())
+        missing = [p for p in paths if p not in watched]
+        if missing:
+            self.model_watcher.addPaths(missing)
+    
+    def reload_models(self):
+        if self.registry is None or not self.registry.changed():
+            return
+        if not self.tasks.run('reload models', self.registry.reload,
+                              on_done=self.on_models_reloaded, on_error=self.on_models_reload_failed):
+            # A reload is already running; check again once it is done
+            self.model_reload_timer.start()
+    
+    def on_models_reloaded(self, deployment):
+        self.watch_model_files()
+        if deployment is None:
+            return
+        self.pending_models = deployment
+        self.apply_pending_models()
+    
+    def on_models_reload_failed(self, message):
+        self.watch_model_files()
+        current = self.registry.current
+        print(f"Model reload failed: {message}")
+        self.statusBar().showMessage(f"New model files rejected ({message}); still using {current.version}")
+    
+    def apply_pending_models(self):
+        """Swap in a reloaded pair, but never while an assessment is being scored."""
+        if self.pending_models is None or self.tasks.is_running('assess'):
+            return
+        models = self.registry.activate(self.pending_models)
+        self.drift.set_reference('full', models.config_full['feature_ranges'])
+        self.drift.set_reference('basic', models.config_basic['feature_ranges'])
+        self.pending_models = None
+        print(f"✓ Models reloaded ({models.source_full}, {models.source_basic}): {models.version}")
+        self.show_model_version(models)
+        self.statusBar().showMessage(f"Models updated: {models.version}")
+        if self.live_preview.isChecked():
+            self.schedule_preview()
+    
+    def show_model_version(self, models):
+        self.model_version_label.setText(f"Models: {models.version}")
+        self.model_version_label.setToolTip(f"Full: {models.source_full}\nBasic: {models.source_basic}")
+    
+    def model_kind(self, assessment):
+        return 'full' if assessment['lab_available'] else 'basic'
+    
+    def show_drift_flags(self, flags):
+        """Name the inputs outside the range the model was trained on."""
+        if not flags:
+            self.drift_warning.setVisible(False)
+            return
+        parts = [f"{name} {value:.1f} (trained on {low:g}–{high:g})" for name, value, low, high in flags]
+        self.drift_warning.setText("Outside the training data: " + "; ".join(parts)
+                                   + ". Interpret this result with extra care.")
+        self.drift_warning.setVisible(True)
+    
+    def show_risk(self, risk_level, confidence, probabilities):
         risk_icons = {'Low': '[LOW]', 'Moderate': '[MODERATE]', 'High': '[HIGH]'}
         self.risk_text.setText(f"{risk_icons[risk_level]} {risk_level.upper()} RISK")
-        self.risk_text.setProperty("riskType", risk_level.lower())
-        self.risk_text.style().unpolish(self.risk_text)
-        self.risk_text.style().polish(self.risk_text)
+        set_style_property(self.risk_text, "riskType", risk_level.lower())
         self.risk_indicator.set_risk(risk_level, confidence)
+        low, mod, high = probabilities[0]*100, probabilities[1]*100, probabilities[2]*100
+        self.probability_line.setText(f"Low: {low:.1f}% | Moderate: {mod:.1f}% | High: {high:.1f}%")
+    
+    def display_results(self, risk_level, confidence, probabilities, model_used, lab_available):
+        with METRICS.stage('assess.restyle'):
+            self.results_card.setVisible(True)
+            self.show_risk(risk_level, confidence, probabilities)
+            
+            if lab_available:
+                self.model_used_label.setText(f"[FULL] {model_used} | Lab: Included")
+                set_style_property(self.model_used_label, "modelType", "full")
+            else:
+                self.model_used_label.setText(f"[BASIC] {model_used} | Lab: Not Available")
+                set_style_property(self.model_used_label, "modelType", "basic")
         
-        if lab_available:
-            self.model_used_label.setText(f"[FULL] {model_used} | Lab: Included")
-            self.model_used_label.setProperty("modelType", "full")
-        else:
-            self.model_used_label.setText(f"[BASIC] {model_used} | Lab: Not Available")
-            self.model_used_label.setProperty("modelType", "basic")
-        self.model_used_label.style().unpolish(self.model_used_label)
-        self.model_used_label.style().polish(self.model_used_label)
-        
-        recommendations = self.get_recommendations(risk_level, probabilities, lab_available)
-        self.recommendations.setHtml(recommendations)
+        with METRICS.stage('assess.recommendations'):
+            recommendations = self.get_recommendations(risk_level, probabilities, lab_available)
+        with METRICS.stage('assess.render'):
+            self.recommendations.setHtml(recommendations)
     
     def get_recommendations(self, risk_level, probabilities, lab_available):
-        low, mod, high = probabilities[0]*100, probabilities[1]*100, probabilities[2]*100
-        lab_warn = ""
-        if not lab_available and risk_level in ['Moderate', 'High']:
-            lab_warn = "<div style='background:#FEF3C7;padding:12px;border-radius:8px;margin:12px 0;border-left:4px solid #F6AD55'><b style='color:#92400E'>Important:</b> Basic Model used. Lab tests <b>strongly recommended</b>.</div>"
-        
-        style = "font-family:Inter,sans-serif;font-size:13px;line-height:1.6;color:#475569;"
-        
-        if risk_level == 'Low':
-            lab_note = "<li><b>Get lab tests</b> for complete assessment</li>" if not lab_available else ""
-            return (
-                f"<div style='{style}'>{lab_warn}"
-                f"<h3 style='color:#48BB78'>Low Risk - Routine Care</h3>"
-                f"<div style='background:#f8fafc;padding:12px;border-radius:8px;margin:12px 0'>"
-                f"<b>Probability:</b> Low:{low:.1f}% | Mod:{mod:.1f}% | High:{high:.1f}%</div>"
-                f"<b>Actions:</b><ul>"
-                f"<li>Regular prenatal checkups (monthly)</li>"
-                f"<li>Healthy diet and exercise</li>"
-                f"<li>Monitor symptoms</li>"
-                f"<li>Return if warning signs</li>"
-                f"<li>Next: 4 weeks</li>"
-                f"{lab_note}"
-                f"</ul>"
-                f"<p style='font-style:italic;color:#48BB78'>Patient can be managed at barangay health center level</p>"
-                f"</div>"
-            )
-        elif risk_level == 'Moderate':
-            lab_priority = "<li style='color:#FC8181'><b>PRIORITY: Get lab tests</b> before RHU visit</li>" if not lab_available else ""
-            return (
-                f"<div style='{style}'>{lab_warn}"
-                f"<h3 style='color:#F6AD55'>Moderate Risk - Enhanced Monitoring</h3>"
-                f"<div style='background:#f8fafc;padding:12px;border-radius:8px;margin:12px 0'>"
-                f"<b>Probability:</b> Low:{low:.1f}% | Mod:{mod:.1f}% | High:{high:.1f}%</div>"
-                f"<b>Actions:</b><ul>"
-                f"<li><b>Refer to RHU</b> for evaluation</li>"
-                f"{lab_priority}"
-                f"<li>Bi-weekly prenatal visits</li>"
-                f"<li>Monitor BP and blood sugar</li>"
-                f"<li>Watch for warning signs</li>"
-                f"</ul>"
-                f"<p style='font-style:italic;color:#F6AD55'>Coordinate with RHU midwife/physician</p>"
-                f"</div>"
-            )
-        else:
-            lab_urgent = "<li style='color:#FC8181'><b>URGENT: Lab tests en route</b></li>" if not lab_available else ""
-            return (
-                f"<div style='{style}'>{lab_warn}"
-                f"<h3 style='color:#FC8181'>High Risk - URGENT REFERRAL</h3>"
-                f"<div style='background:#f8fafc;padding:12px;border-radius:8px;margin:12px 0'>"
-                f"<b>Probability:</b> Low:{low:.1f}% | Mod:{mod:.1f}% | High:{high:.1f}%</div>"
-                f"<b style='color:#742A2A'>Actions:</b><ul>"
-                f"<li style='color:#FC8181'><b>IMMEDIATE hospital/OB-GYN referral</b></li>"
-                f"{lab_urgent}"
-                f"<li>Specialist care required</li>"
-                f"<li>Weekly+ visits needed</li>"
-                f"<li>Prepare for complications</li>"
-                f"</ul>"
-                f"<p style='font-weight:bold;color:#FC8181'>DO NOT DELAY: Hospital referral immediately</p>"
-                f"</div>"
-            )
+        return recommendations_html(risk_level, probabilities, lab_available)
     
     def save_assessment(self):
+        if self.tasks.is_running('save'):
+            return
+        if self.current_assessment is None:
+            return
+        if self.current_assessment.get('saved'):
+            QMessageBox.information(self, "Already Saved", "This assessment has already been saved.")
+            return
         try:
+            began = time.perf_counter()
             record = {
                 'Timestamp': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                'Patient_ID': self.patient_id.text() or 'N/A',
+                'Patient_ID': self.patient_id.text().strip() or 'N/A',
                 'Age': self.age_input.value(),
                 'BMI': self.current_assessment['bmi'],
                 'SystolicBP': self.systolic_input.value(),
@@ -647,30 +1067,115 @@ class MaternalRiskApp(QMainWindow):
                 'Confidence': f"{self.current_assessment['confidence']:.1f}%",
                 'Model_Used': self.current_assessment['model_used'],
                 'Lab_Available': 'Yes' if self.current_assessment['lab_available'] else 'No',
-                'Health_Worker': self.health_worker.text() or 'N/A'
+                'Health_Worker': self.health_worker.text().strip() or 'N/A'
             }
-            history_file = 'assessment_history.csv'
-            if os.path.exists(history_file):
-                df = pd.read_csv(history_file)
-                df = pd.concat([df, pd.DataFrame([record])], ignore_index=True)
-            else:
-                df = pd.DataFrame([record])
-            df.to_csv(history_file, index=False)
-            self.load_history()
-            QMessageBox.information(self, "Success", "Assessment saved successfully!")
+            assessment = self.current_assessment
+            self.submit_shadow(assessment)
+            self.observe_drift(assessment)
+            METRICS.record('save.record', time.perf_counter() - began)
+            self.save_btn.setEnabled(False)
+            self.tasks.run('save', self.append_record, record,
+                           on_done=lambda problems: self.on_saved(assessment, began, problems),
+                           on_error=self.on_save_failed)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to save: {str(e)}")
     
+    def append_record(self, record):
+        """Append to the history, then update what is derived from it.
+
+        Only the history append can fail the save: once the row is stored,
+        failing follow-up steps are logged and returned by name, so a retry
+        never duplicates the row.
+        """
+        problems = []
+        # A Dashboard rebuild reads the history and replaces the rollups as
+        # one step; the row and its rollup update must land on one side of it
+        with self.rollups.write_lock:
+            with METRICS.stage('save.append'):
+                self.history_store.append(record)
+            try:
+                with METRICS.stage('save.rollup'):
+                    self.rollups.add(record)
+            except Exception as e:
+                print(f"Dashboard rollup update failed: {e}")
+                problems.append("dashboard")
+                # Rebuilt from the history the next time the Dashboard opens
+                try:
+                    self.rollups.invalidate()
+                except Exception:
+                    pass
+        if self.changelog is not None:
+            try:
+                with METRICS.stage('save.changelog'):
+                    self.changelog.append(record)
+            except Exception as e:
+                # Picked up by the next 'history_sync.py seed'
+                print(f"Sync change log update failed: {e}")
+                problems.append("sync log")
+        try:
+            with METRICS.stage('save.drift'):
+                self.drift.save()
+        except Exception as e:
+            # The statistics stay in memory and go out with the next save
+            print(f"Drift statistics not saved: {e}")
+            problems.append("drift statistics")
+        return problems
+    
+    def on_saved(self, assessment, began, problems):
+        assessment['saved'] = True
+        self.save_btn.setEnabled(True)
+        if problems:
+            self.statusBar().showMessage(f"Assessment saved, but could not update: {', '.join(problems)}")
+        with METRICS.stage('save.refresh'):
+            self.refresh_history_tail()
+            self.show_patient_visits()
+            if self.dashboard_built:
+                self.load_dashboard()
+        METRICS.record('save.total', time.perf_counter() - began)
+        self.update_metrics_readout('save')
+        QMessageBox.information(self, "Success", "Assessment saved successfully!")
+    
+    def ship_changes(self):
+        self.tasks.run('sync', self.changelog.ship, SYNC_DIR,
+                       on_done=self.on_changes_shipped, on_error=self.on_ship_failed)
+    
+    def on_changes_shipped(self, count):
+        if count:
+            print(f"✓ Shipped {count} new records to {SYNC_DIR}")
+    
+    def on_ship_failed(self, message):
+        # The shared folder may be offline; the changes stay queued in the log
+        print(f"History sync failed: {message}")
+        self.statusBar().showMessage(f"History sync failed, will retry: {message}")
+    
+    def on_save_failed(self, message):
+        self.save_btn.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Failed to save: {message}")
+    
     def print_report(self):
+        if self.tasks.is_running('print'):
+            return
         try:
             printer = QPrinter(QPrinter.HighResolution)
             dialog = QPrintDialog(printer, self)
             if dialog.exec_() == QPrintDialog.Accepted:
-                self.recommendations.document().print_(printer)
-                QMessageBox.information(self, "Success", "Report sent to printer!")
+                # Only the HTML crosses to the worker; QTextDocument is not
+                # thread-safe, so the worker lays out a document of its own
+                self.print_btn.setEnabled(False)
+                self.tasks.run('print', print_html, self.recommendations.toHtml(), printer,
+                               on_done=lambda _: self.on_printed(),
+                               on_error=self.on_print_failed)
         except Exception as e:
             QMessageBox.warning(self, "Print Error", f"Could not print: {str(e)}")
     
+    def on_printed(self):
+        self.print_btn.setEnabled(True)
+        QMessageBox.information(self, "Success", "Report sent to printer!")
+    
+    def on_print_failed(self, message):
+        self.print_btn.setEnabled(True)
+        QMessageBox.warning(self, "Print Error", f"Could not print: {message}")
+    
     def new_assessment(self):
         self.patient_id.clear()
         self.health_worker.clear()
@@ -682,6 +1187,10 @@ class MaternalRiskApp(QMainWindow):
         self.blood_sugar_input.setValue(5.5)
         self.hemoglobin_input.setValue(12.0)
         self.lab_available.setChecked(False)
+        # Resetting the fields queued a preview; a new assessment starts blank
+        self.preview_timer.stop()
+        self.settle_timer.stop()
+        self.save_btn.setEnabled(not self.tasks.is_running('save'))
         self.results_card.setVisible(False)
     
     def create_history_tab(self):
@@ -694,75 +1203,255 @@ class MaternalRiskApp(QMainWindow):
         title.setObjectName("pageTitle")
         header_layout.addWidget(title)
         header_layout.addStretch()
-        export_btn = QPushButton("Export to CSV")
-        export_btn.setObjectName("secondaryButton")
-        export_btn.setMinimumHeight(40)
-        export_btn.setCursor(Qt.PointingHandCursor)
-        export_btn.clicked.connect(self.export_history)
-        header_layout.addWidget(export_btn)
+        self.export_btn = QPushButton("Export")
+        self.export_btn.setObjectName("secondaryButton")
+        self.export_btn.setMinimumHeight(40)
+        self.export_btn.setCursor(Qt.PointingHandCursor)
+        self.export_btn.clicked.connect(self.export_history)
+        header_layout.addWidget(self.export_btn)
         layout.addLayout(header_layout)
         
-        self.history_table = QTableWidget()
+        filter_layout = QHBoxLayout()
+        filter_layout.setSpacing(12)
+        self.history_risk_filter = QComboBox()
+        self.history_risk_filter.setObjectName("modernInput")
+        self.history_risk_filter.addItems(["All Risk Levels", "Low", "Moderate", "High"])
+        self.history_risk_filter.currentIndexChanged.connect(self.load_history)
+        self.history_patient_filter = QLineEdit()
+        self.history_patient_filter.setObjectName("modernInput")
+        self.history_patient_filter.setPlaceholderText("Filter by Patient ID")
+        self.history_patient_filter.editingFinished.connect(self.load_history)
+        self.history_worker_filter = QLineEdit()
+        self.history_worker_filter.setObjectName("modernInput")
+        self.history_worker_filter.setPlaceholderText("Filter by Health Worker")
+        self.history_worker_filter.editingFinished.connect(self.load_history)
+        self.history_lab_filter = QComboBox()
+        self.history_lab_filter.setObjectName("modernInput")
+        self.history_lab_filter.addItems(["Any Lab Status", "Lab: Yes", "Lab: No"])
+        self.history_lab_filter.currentIndexChanged.connect(self.load_history)
+        self.history_from_filter = QLineEdit()
+        self.history_from_filter.setObjectName("modernInput")
+        self.history_from_filter.setPlaceholderText("From YYYY-MM-DD")
+        self.history_from_filter.editingFinished.connect(self.load_history)
+        self.history_to_filter = QLineEdit()
+        self.history_to_filter.setObjectName("modernInput")
+        self.history_to_filter.setPlaceholderText("To YYYY-MM-DD")
+        self.history_to_filter.editingFinished.connect(self.load_history)
+        self.history_count_label = QLabel()
+        self.history_count_label.setObjectName("formHint")
+        filter_layout.addWidget(self.history_risk_filter)
+        filter_layout.addWidget(self.history_patient_filter)
+        filter_layout.addWidget(self.history_worker_filter)
+        filter_layout.addWidget(self.history_lab_filter)
+        filter_layout.addWidget(self.history_from_filter)
+        filter_layout.addWidget(self.history_to_filter)
+        filter_layout.addStretch()
+        filter_layout.addWidget(self.history_count_label)
+        layout.addLayout(filter_layout)
+        
+        self.history_model = HistoryTableModel(self.history_store, COLORS, self)
+        self.history_table = QTableView()
         self.history_table.setObjectName("modernTable")
-        self.history_table.setColumnCount(10)
-        self.history_table.setHorizontalHeaderLabels([
-            "Date/Time", "Patient ID", "Age", "BMI", "Risk Level",
-            "Confidence", "Model Used", "Health Worker", "Lab Available", "Action"
-        ])
+        self.history_table.setModel(self.history_model)
+        self.history_table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
         self.history_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
         layout.addWidget(self.history_table)
         tab.setLayout(layout)
+        
+        # Rows saved by other instances: file notifications, plus a slow poll for
+        # shared folders that do not deliver them
+        self.history_watcher = QFileSystemWatcher(self)
+        self.history_watcher.fileChanged.connect(self.refresh_history_tail)
+        self.history_poll_timer = QTimer(self)
+        self.history_poll_timer.timeout.connect(self.refresh_history_tail)
+        self.history_poll_timer.start(5000)
         return tab
     
+    def history_filters(self):
+        risk = self.history_risk_filter.currentText()
+        return {
+            'risk_level': risk if risk in self.risk_labels.values() else None,
+            'patient_id': self.history_patient_filter.text().strip(),
+            'health_worker': self.history_worker_filter.text().strip(),
+            'lab_available': {1: 'Yes', 2: 'No'}.get(self.history_lab_filter.currentIndex()),
+            **date_filters(self.history_from_filter.text().strip(), self.history_to_filter.text().strip()),
+        }
+    
     def load_history(self):
+        if not self.history_built:
+            return
         try:
-            if not os.path.exists('assessment_history.csv'):
-                return
-            df = pd.read_csv('assessment_history.csv')
-            self.history_table.setRowCount(len(df))
-            for idx, row in df.iterrows():
-                self.history_table.setItem(idx, 0, QTableWidgetItem(row['Timestamp']))
-                self.history_table.setItem(idx, 1, QTableWidgetItem(str(row['Patient_ID'])))
-                self.history_table.setItem(idx, 2, QTableWidgetItem(str(row['Age'])))
-                self.history_table.setItem(idx, 3, QTableWidgetItem(f"{row['BMI']:.1f}"))
-                risk_item = QTableWidgetItem(row['Risk_Level'])
-                if row['Risk_Level'] == 'Low':
-                    risk_item.setBackground(QColor(COLORS['success_bg']))
-                elif row['Risk_Level'] == 'Moderate':
-                    risk_item.setBackground(QColor(COLORS['warning_bg']))
-                else:
-                    risk_item.setBackground(QColor(COLORS['danger_bg']))
-                self.history_table.setItem(idx, 4, risk_item)
-                self.history_table.setItem(idx, 5, QTableWidgetItem(row['Confidence']))
-                self.history_table.setItem(idx, 6, QTableWidgetItem(row.get('Model_Used', 'Full Model')))
-                self.history_table.setItem(idx, 7, QTableWidgetItem(row['Health_Worker']))
-                lab_item = QTableWidgetItem(row.get('Lab_Available', 'Unknown'))
-                if row.get('Lab_Available') == 'Yes':
-                    lab_item.setBackground(QColor(COLORS['success_bg']))
-                else:
-                    lab_item.setBackground(QColor(COLORS['warning_bg']))
-                self.history_table.setItem(idx, 8, lab_item)
-                self.history_table.setItem(idx, 9, QTableWidgetItem("Saved"))
+            began = time.perf_counter()
+            with METRICS.stage('history.mark'):
+                self.history_store.mark()
+            with METRICS.stage('history.reload'):
+                self.history_model.reload(**self.history_filters())
+            self.history_count_label.setText(f"{self.history_model.total:,} records")
+            with METRICS.stage('history.watch'):
+                self.watch_history_files()
+            METRICS.record('history.total', time.perf_counter() - began)
+            self.update_metrics_readout('history')
         except Exception as e:
             print(f"Error loading history: {e}")
     
+    def watch_history_files(self):
+        paths = [p for p in (self.history_store.path, self.history_store.path + '-wal') if os.path.exists(p)]
+        missing = [p for p in paths if p not in self.history_watcher.files()]
+        if missing:
+            self.history_watcher.addPaths(missing)
+    
+    def refresh_history_tail(self):
+        if not self.history_built:
+            return
+        try:
+            records = self.history_store.poll()
+            if records is None:
+                self.load_history()
+            elif records:
+                self.history_model.add_records(records)
+                self.history_count_label.setText(f"{self.history_model.total:,} records")
+                self.watch_history_files()
+        except Exception as e:
+            print(f"Error refreshing history: {e}")
+    
     def export_history(self):
+        if self.tasks.is_running('export'):
+            return
         try:
-            if not os.path.exists('assessment_history.csv'):
+            # Exports what the History tab is showing
+            filters = self.history_filters()
+            total = self.history_store.count(**filters)
+            if not total:
                 QMessageBox.warning(self, "No Data", "No assessment history to export.")
                 return
-            filename, _ = QFileDialog.getSaveFileName(
+            formats = available_formats()
+            filename, selected = QFileDialog.getSaveFileName(
                 self, "Export History",
                 f"maternal_assessment_{datetime.now().strftime('%Y%m%d')}.csv",
-                "CSV Files (*.csv)"
+                ";;".join(EXPORT_FORMATS[f] for f in formats)
             )
             if filename:
-                df = pd.read_csv('assessment_history.csv')
-                df.to_csv(filename, index=False)
-                QMessageBox.information(self, "Success", "History exported successfully!")
+                selected = next((f for f in formats if EXPORT_FORMATS[f] == selected), 'csv')
+                filename = with_extension(filename, selected)
+                fmt = format_for_path(filename)
+                self.export_btn.setEnabled(False)
+                self.tasks.run('export', export_history, self.history_store, filename, fmt,
+                               total=total, on_done=self.on_exported, on_error=self.on_export_failed,
+                               on_progress=self.on_export_progress, **filters)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Export failed: {e}")
     
+    def on_export_progress(self, done, total):
+        self.statusBar().showMessage(f"Exporting... {done:,} of {total:,} records")
+    
+    def on_exported(self, written):
+        self.export_btn.setEnabled(True)
+        self.statusBar().showMessage(f"Exported {written:,} records", 5000)
+        QMessageBox.information(self, "Success", "History exported successfully!")
+    
+    def on_export_failed(self, message):
+        self.export_btn.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Export failed: {message}")
+    
+    def create_dashboard_tab(self):
+        tab = QWidget()
+        tab.setObjectName("dashboardTab")
+        layout = QVBoxLayout()
+        layout.setContentsMargins(30, 30, 30, 30)
+        header_layout = QHBoxLayout()
+        title = QLabel("Dashboard")
+        title.setObjectName("pageTitle")
+        header_layout.addWidget(title)
+        header_layout.addStretch()
+        self.rebuild_btn = QPushButton("Rebuild from History")
+        self.rebuild_btn.setObjectName("secondaryButton")
+        self.rebuild_btn.setMinimumHeight(40)
+        self.rebuild_btn.setCursor(Qt.PointingHandCursor)
+        self.rebuild_btn.clicked.connect(self.rebuild_rollups)
+        header_layout.addWidget(self.rebuild_btn)
+        layout.addLayout(header_layout)
+        
+        filter_layout = QHBoxLayout()
+        filter_layout.setSpacing(12)
+        self.dashboard_month = QComboBox()
+        self.dashboard_month.setObjectName("modernInput")
+        self.dashboard_month.currentIndexChanged.connect(self.show_dashboard)
+        self.dashboard_grouping = QComboBox()
+        self.dashboard_grouping.setObjectName("modernInput")
+        self.dashboard_grouping.addItems(["By Health Worker", "By Model"])
+        self.dashboard_grouping.currentIndexChanged.connect(self.show_dashboard)
+        self.dashboard_total_label = QLabel()
+        self.dashboard_total_label.setObjectName("formHint")
+        filter_layout.addWidget(self.dashboard_month)
+        filter_layout.addWidget(self.dashboard_grouping)
+        filter_layout.addStretch()
+        filter_layout.addWidget(self.dashboard_total_label)
+        layout.addLayout(filter_layout)
+        
+        self.dashboard_table = QTableWidget()
+        self.dashboard_table.setObjectName("modernTable")
+        self.dashboard_table.setColumnCount(8)
+        self.dashboard_table.setHorizontalHeaderLabels(
+            ['Health Worker', 'Low', 'Moderate', 'High', 'Total', 'Mean Systolic', 'Mean Diastolic', 'Mean BMI'])
+        self.dashboard_table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.dashboard_table.verticalHeader().setVisible(False)
+        self.dashboard_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        layout.addWidget(self.dashboard_table)
+        tab.setLayout(layout)
+        return tab
+    
+    def load_dashboard(self):
+        """Refresh the month list from the rollups and redraw the table."""
+        months = self.rollups.months()
+        current = self.dashboard_month.currentData()
+        self.dashboard_month.blockSignals(True)
+        self.dashboard_month.clear()
+        self.dashboard_month.addItem("All Time", None)
+        for month in months:
+            self.dashboard_month.addItem(datetime.strptime(month, '%Y-%m').strftime('%B %Y'), month)
+        # Default to the latest month; keep the user's choice across refreshes
+        index = self.dashboard_month.findData(current) if current else (1 if months else 0)
+        self.dashboard_month.setCurrentIndex(max(index, 0))
+        self.dashboard_month.blockSignals(False)
+        self.show_dashboard()
+    
+    def show_dashboard(self):
+        by = 'model' if self.dashboard_grouping.currentIndex() == 1 else 'worker'
+        try:
+            rows = self.rollups.summary(self.dashboard_month.currentData(), by=by)
+        except Exception as e:
+            print(f"Error loading dashboard: {e}")
+            return
+        self.dashboard_table.horizontalHeaderItem(0).setText('Model' if by == 'model' else 'Health Worker')
+        self.dashboard_table.setRowCount(len(rows))
+        for r, row in enumerate(rows):
+            values = [row['key'], f"{row['Low']:,}", f"{row['Moderate']:,}", f"{row['High']:,}",
+                      f"{row['total']:,}", f"{row['mean_systolic']:.1f}", f"{row['mean_diastolic']:.1f}",
+                      f"{row['mean_bmi']:.1f}"]
+            for c, value in enumerate(values):
+                item = QTableWidgetItem(value)
+                if c:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                self.dashboard_table.setItem(r, c, item)
+        self.dashboard_total_label.setText(f"{sum(row['total'] for row in rows):,} assessments")
+    
+    def rebuild_rollups(self):
+        if self.tasks.is_running('rollups'):
+            return
+        self.rebuild_btn.setEnabled(False)
+        self.statusBar().showMessage("Rebuilding dashboard from history...")
+        self.tasks.run('rollups', self.rollups.rebuild, self.history_store,
+                       on_done=self.on_rollups_rebuilt, on_error=self.on_rollups_failed)
+    
+    def on_rollups_rebuilt(self, total):
+        self.rebuild_btn.setEnabled(True)
+        self.statusBar().showMessage(f"Dashboard rebuilt from {total:,} records", 5000)
+        self.load_dashboard()
+    
+    def on_rollups_failed(self, message):
+        self.rebuild_btn.setEnabled(True)
+        QMessageBox.critical(self, "Error", f"Dashboard rebuild failed: {message}")
+    
     def create_about_tab(self):
         tab = QWidget()
         tab.setObjectName("aboutTab")
@@ -828,6 +1517,7 @@ class MaternalRiskApp(QMainWindow):
         #formLabel {{color:{COLORS['gray_900']};font-size:13px;font-weight:600}}
         #formHint {{color:{COLORS['gray_400']};font-size:11px;font-style:italic}}
         #formValue {{color:{COLORS['gray_900']};font-size:14px;font-weight:600}}
+        #patientVisits {{background:{COLORS['gray_50']};border:1px solid {COLORS['gray_200']};border-radius:8px;padding:10px;font-size:12px;color:{COLORS['gray_600']}}}
         #modernInput {{padding:12px 16px;border:2px solid {COLORS['gray_200']};border-radius:10px;font-size:14px;background:{COLORS['white']};color:{COLORS['gray_900']}}}
         #modernInput:focus {{border:2px solid {COLORS['primary']}}}
         #modernSpinBox {{padding:12px 16px;border:2px solid {COLORS['gray_200']};border-radius:10px;font-size:14px;background:{COLORS['white']};color:{COLORS['gray_900']}}}
@@ -866,6 +1556,10 @@ class MaternalRiskApp(QMainWindow):
         #riskText[riskType="high"] {{color:{COLORS['danger']};background:{COLORS['danger_bg']}}}
         #confidenceLabel {{font-size:14px;color:{COLORS['gray_600']};font-weight:600}}
         #modelUsedLabel {{font-size:12px;font-style:italic;padding:8px;border-radius:6px}}
+        #probabilityLine {{font-size:12px;color:{COLORS['gray_600']}}}
+        #driftWarning {{background:{COLORS['warning_bg']};color:{COLORS['warning_text']};border-left:4px solid {COLORS['warning']};border-radius:6px;padding:8px;font-size:12px}}
+        #metricsLabel {{font-size:11px;color:{COLORS['gray_600']}}}
+        #modelVersionLabel {{font-size:11px;color:{COLORS['primary_light']};padding:0 8px}}
         #modelUsedLabel[modelType="full"] {{color:{COLORS['success_text']};background:{COLORS['success_bg']}}}
         #modelUsedLabel[modelType="basic"] {{color:{COLORS['warning_text']};background:{COLORS['warning_bg']}}}
         #recommendationsText {{border:2px solid {COLORS['gray_200']};border-radius:12px;padding:16px;background:{COLORS['white']}}}
@@ -886,15 +1580,54 @@ class MaternalRiskApp(QMainWindow):
         QMessageBox QPushButton:hover {{background:#3db3b9}}
         """)
     
+    def event(self, event):
+        # With MRS_METRICS=1, every repaint of the window is timed as a frame
+        if METRICS.enabled and event.type() == QEvent.UpdateRequest:
+            with METRICS.stage('frame'):
+                return super().event(event)
+        return super().event(event)
+    
+    def update_metrics_readout(self, prefix):
+        if METRICS.enabled:
+            self.metrics_label.setText(METRICS.readout(prefix))
+    
     def closeEvent(self, event):
         reply = QMessageBox.question(self, 'Confirm Exit', 'Are you sure you want to exit?',
                                     QMessageBox.Yes | QMessageBox.No, QMessageBox.No)
         if reply == QMessageBox.Yes:
+            # Let an in-flight save or export finish writing
+            self.tasks.wait()
+            if self.history_store is not None:
+                self.history_store.close()
+                self.rollups.close()
+            if self.changelog is not None:
+                try:
+                    self.changelog.ship(SYNC_DIR)
+                except Exception as e:
+                    print(f"History sync failed: {e}")
+            if self.drift is not None:
+                try:
+                    self.drift.save()
+                except OSError as e:
+                    print(f"Drift statistics not saved: {e}")
+                print(format_report(self.drift.report()))
+            if self.shadow is not None:
+                self.shadow.close()
+                print(self.shadow.summary.report())
+            stats = self.prediction_cache.stats()
+            print(f"Prediction cache: {stats['hits']} hits, {stats['misses']} misses, "
+                  f"{stats['evictions']} evictions")
+            if self.preview_latency.count:
+                print(f"Live preview latency: {self.preview_latency.summary()}")
+            if METRICS.enabled:
+                print(METRICS.report())
+                METRICS.close()
             event.accept()
         else:
             event.ignore()
 
 def main():
+    app_start = time.perf_counter()
     app = QApplication(sys.argv)
     app.setApplicationName("Maternal Risk Assessment System")
     app.setOrganizationName("Municipal Health Office Bay, Laguna")
@@ -902,9 +1635,11 @@ def main():
     if font.family() != "Inter":
         font = QFont("Segoe UI", 10)
     app.setFont(font)
+    STARTUP.record("create application", app_start)
     window = MaternalRiskApp()
-    window.show()
-    window.load_history()
+    with STARTUP.phase("show window"):
+        window.show()
+    window.start_loading()
     sys.exit(app.exec_())
 
 if __name__ == '__main__':
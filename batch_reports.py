@@ -0,0 +1,144 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Batch Referral Reports
+Renders the recommendations report of selected history records to PDF,
+headless and in parallel
+
+Usage: python batch_reports.py [--from 2025-03-01] [--to 2025-03-01]
+                               [--risk-level High] [--health-worker NAME]
+                               [--patient-id ID] [--lab yes|no]
+                               [--output-dir reports] [--workers N]
+                               [--backend csv|sqlite]
+
+Records are re-scored with the deployed models for the probability breakdown
+(history keeps only the level and confidence). The HTML is filled in from
+the precompiled templates in this process; worker processes each start one
+offscreen Qt instance and lay out and write the PDFs.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import pandas as pd
+from history_export import date_filters
+from history_store import open_history_store, HISTORY_BACKEND
+from model_bundle import load_deployment
+from report_templates import report_html
+from scoring import score_frame
+
+DEFAULT_OUTPUT_DIR = 'reports'
+# Reports sent to a worker per task, to amortize the pickling round trip
+DEFAULT_BATCH_SIZE = 16
+PROB_COLUMNS = ['Prob_Low', 'Prob_Moderate', 'Prob_High']
+
+_app = None
+
+
+def _init_worker():
+    global _app
+    os.environ['QT_QPA_PLATFORM'] = 'offscreen'
+    from PyQt5.QtGui import QGuiApplication
+    _app = QGuiApplication.instance() or QGuiApplication([sys.argv[0]])
+
+
+def render_pdfs(items):
+    """Write each (path, html) as an A4 PDF. Runs in a worker process."""
+    from PyQt5.QtGui import QPageSize, QPdfWriter, QTextDocument
+    for path, document_html in items:
+        document = QTextDocument()
+        document.setHtml(document_html)
+        writer = QPdfWriter(path + '.tmp')
+        writer.setPageSize(QPageSize(QPageSize.A4))
+        writer.setResolution(150)
+        document.print_(writer)
+        del writer
+        os.replace(path + '.tmp', path)
+    return len(items)
+
+
+def report_filename(record, index):
+    """Date, patient and position, reduced to characters safe in file names."""
+    patient = re.sub(r'[^A-Za-z0-9_-]+', '_', str(record.get('Patient_ID', ''))).strip('_') or 'NA'
+    return f"{str(record.get('Timestamp', ''))[:10]}_{patient}_{index:05d}.pdf"
+
+
+def select_records(store, **filters):
+    records = []
+    for chunk in store.iter_chunks(**filters):
+        records.extend(chunk)
+    return records
+
+
+def build_reports(records, output_dir):
+    """[(pdf path, html)] for records, re-scored with the deployed models."""
+    if not records:
+        return []
+    engine_full, engine_basic = load_deployment('full')[0], load_deployment('basic')[0]
+    results = score_frame(pd.DataFrame.from_records(records), engine_full, engine_basic)
+    levels = results['Risk_Level'].tolist()
+    probabilities = results[PROB_COLUMNS].to_numpy().tolist()
+    return [(os.path.join(output_dir, report_filename(record, i)),
+             report_html(record, level, proba) if level != 'N/A' else None)
+            for i, (record, level, proba) in enumerate(zip(records, levels, probabilities))]
+
+
+def render_reports(reports, workers=None, batch_size=DEFAULT_BATCH_SIZE, progress=None):
+    """Render the (path, html) pairs on a process pool. Returns the count written."""
+    batches = [reports[i:i + batch_size] for i in range(0, len(reports), batch_size)]
+    written = 0
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        for n in pool.map(render_pdfs, batches):
+            written += n
+            if progress:
+                progress(written, len(reports))
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Render referral reports for history records to PDF")
+    parser.add_argument('--from', dest='date_from', help="First day, YYYY-MM-DD")
+    parser.add_argument('--to', dest='date_to', help="Last day, YYYY-MM-DD")
+    parser.add_argument('--risk-level', default='High', choices=['Low', 'Moderate', 'High', 'all'])
+    parser.add_argument('--health-worker')
+    parser.add_argument('--patient-id')
+    parser.add_argument('--lab', choices=['yes', 'no'], help="Only records with/without lab results")
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    parser.add_argument('--backend', default=HISTORY_BACKEND, choices=['csv', 'sqlite'])
+    args = parser.parse_args(argv)
+
+    filters = date_filters(args.date_from, args.date_to)
+    filters.update(risk_level=None if args.risk_level == 'all' else args.risk_level,
+                   health_worker=args.health_worker, patient_id=args.patient_id,
+                   lab_available=args.lab.capitalize() if args.lab else None)
+    start = time.perf_counter()
+    store = open_history_store(args.backend)
+    try:
+        records = select_records(store, **filters)
+    finally:
+        store.close()
+    if not records:
+        print("No matching records")
+        return 0
+    os.makedirs(args.output_dir, exist_ok=True)
+    reports = build_reports(records, args.output_dir)
+    skipped = sum(1 for _, document_html in reports if document_html is None)
+    reports = [r for r in reports if r[1] is not None]
+    prepared = time.perf_counter()
+    written = render_reports(reports, args.workers, args.batch_size,
+                             progress=lambda n, total: print(f"  {n:,}/{total:,} reports", end='\r'))
+    elapsed = time.perf_counter() - start
+    rendering = time.perf_counter() - prepared
+    print()
+    if skipped:
+        print(f"Skipped {skipped:,} records without usable vitals")
+    print(f"✓ {written:,} reports in {elapsed:.1f}s ({written / elapsed:.1f} reports/sec; "
+          f"rendering {written / rendering:.1f} reports/sec) -> {args.output_dir}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
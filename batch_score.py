@@ -0,0 +1,100 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Batch Scoring
+Scores whole CSV intake sheets headlessly with the Full/Basic model pair
+
+Usage: python batch_score.py intake.csv scored.csv [--chunk-size 50000] [--grid]
+                                                   [--no-drift]
+The scored vitals are added to the input drift statistics (see drift.py)
+unless --no-drift is given; failing to save them only prints a warning.
+"""
+
+import argparse
+import os
+import sys
+import time
+import pandas as pd
+from scoring import load_engines, score_frame, feature_matrix, lab_mask, RESULT_COLUMNS
+from drift import DriftMonitor, format_report
+from risk_grid import GRID_FILE, load_basic_grid
+
+DEFAULT_CHUNK_SIZE = 50000
+
+
+def score_csv(input_path, output_path, chunk_size=DEFAULT_CHUNK_SIZE, engines=None, progress=None,
+              monitor=None):
+    """Stream input_path through the models chunk by chunk and write output_path.
+
+    Input columns are passed through verbatim; result columns are appended
+    (or overwritten when already present). With a DriftMonitor, each chunk's
+    vitals are added to its statistics. Returns per-risk-level row counts.
+    """
+    engine_full, engine_basic = engines or load_engines()
+    counts = {}
+    rows_done = 0
+    first = True
+    reader = pd.read_csv(input_path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    with open(output_path, 'w', newline='', encoding='utf-8') as out:
+        for chunk in reader:
+            results = score_frame(chunk, engine_full, engine_basic)
+            if monitor is not None:
+                use_full = lab_mask(chunk)
+                for kind, engine, rows in (('full', engine_full, use_full), ('basic', engine_basic, ~use_full)):
+                    monitor.observe_batch(kind, engine.feature_names, feature_matrix(chunk[rows], engine))
+            chunk = chunk.drop(columns=[c for c in RESULT_COLUMNS if c in chunk.columns])
+            chunk = pd.concat([chunk, results], axis=1)
+            chunk.to_csv(out, index=False, header=first)
+            first = False
+            for level, n in results['Risk_Level'].value_counts().items():
+                counts[level] = counts.get(level, 0) + int(n)
+            rows_done += len(chunk)
+            if progress:
+                progress(rows_done)
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV of patients with the maternal risk models")
+    parser.add_argument('input', help="CSV with BMI, SystolicBP, DiastolicBP and optional Blood_Sugar, Hemoglobin")
+    parser.add_argument('output', help="Destination CSV")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f"Rows per chunk (default {DEFAULT_CHUNK_SIZE})")
+    parser.add_argument('--grid', nargs='?', const=GRID_FILE, default=None, metavar='PATH',
+                        help=f"Score Basic-model rows from the lookup grid (default {GRID_FILE})")
+    parser.add_argument('--no-drift', action='store_true', help="Leave the input drift statistics alone")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input):
+        print(f"Input file not found: {args.input}")
+        return 1
+    start = time.perf_counter()
+    try:
+        engines = None
+        if args.grid:
+            engine_full, engine_basic = load_engines()
+            engines = (engine_full, load_basic_grid(engine_basic, args.grid))
+        monitor = None if args.no_drift else DriftMonitor()
+        counts = score_csv(args.input, args.output, args.chunk_size, engines=engines,
+                           progress=lambda n: print(f"  {n:,} rows scored", end='\r'), monitor=monitor)
+    except Exception as e:
+        print(f"Batch scoring failed: {e}")
+        return 1
+    elapsed = time.perf_counter() - start
+    print()
+    if monitor is not None:
+        # The scored file is complete either way; drift tracking is secondary
+        try:
+            monitor.save()
+        except OSError as e:
+            print(f"Warning: drift statistics not saved to {monitor.path}: {e}")
+    total = sum(counts.values())
+    print(f"✓ Scored {total:,} rows in {elapsed:.2f}s -> {args.output}")
+    for level in ['Low', 'Moderate', 'High', 'N/A']:
+        if level in counts:
+            print(f"  {level}: {counts[level]:,}")
+    if monitor is not None:
+        print(format_report(monitor.report()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
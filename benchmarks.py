@@ -0,0 +1,312 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Benchmarks
+Headless timings for scoring, history I/O and history table population
+
+Run from the project directory (the models are loaded from there):
+    python benchmarks.py [--sizes 10000 100000 1000000] [--quick]
+                         [--output bench_results.json]
+                         [--baseline bench_baseline.json] [--threshold 0.25]
+                         [--save-baseline]
+
+Every timing is the best of --repeat runs, in seconds. With a baseline file,
+any metric slower than baseline * (1 + threshold) is reported as a
+regression and the exit status is 1.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import numpy as np
+from model_bundle import load_deployment
+from history import HISTORY_COLUMNS
+from history_store import CsvHistoryStore, SqliteHistoryStore
+from history_export import export_history
+
+DEFAULT_SIZES = [10000, 100000, 1000000]
+QUICK_SIZES = [10000, 100000]
+BATCH_SIZES = [1000, 100000, 1000000]
+DEFAULT_OUTPUT = 'bench_results.json'
+DEFAULT_BASELINE = 'bench_baseline.json'
+DEFAULT_THRESHOLD = 0.25
+
+
+def best_of(fn, repeat):
+    """Fastest wall-clock time of fn() over repeat runs."""
+    best = float('inf')
+    for _ in range(repeat):
+        began = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - began)
+    return best
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process so far, or None where the
+    resource module is unavailable (Windows)."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+
+def random_vitals(rng, n, engine):
+    """(n, n_features) inputs drawn uniformly from plausible vital ranges."""
+    ranges = {
+        'BMI': (17.0, 40.0), 'SystolicBP': (90, 180), 'DiastolicBP': (60, 120),
+        'Blood Sugar Level': (4.0, 18.0), 'Hemoglobin Level': (9.5, 14.0),
+    }
+    return np.column_stack([rng.uniform(*ranges[name], n) for name in engine.feature_names])
+
+
+def synthetic_records(n, seed=0):
+    """n history records shaped like the app's saves, oldest first."""
+    rng = np.random.default_rng(seed)
+    start = np.datetime64('2024-01-01T08:00:00')
+    stamps = (start + np.sort(rng.integers(0, 3 * 365 * 86400, n)).astype('timedelta64[s]'))
+    lab = rng.random(n) < 0.5
+    levels = np.array(['Low', 'Moderate', 'High'])[rng.integers(0, 3, n)]
+    sugar = np.round(rng.uniform(4.0, 18.0, n), 1).astype(str)
+    hb = np.round(rng.uniform(9.5, 14.0, n), 1).astype(str)
+    columns = {
+        'Timestamp': np.char.replace(stamps.astype(str), 'T', ' '),
+        'Patient_ID': np.char.add('P-', rng.integers(1, max(2, n // 4), n).astype(str)),
+        'Age': rng.integers(15, 50, n).astype(str),
+        'BMI': np.round(rng.uniform(17.0, 40.0, n), 2).astype(str),
+        'SystolicBP': rng.integers(90, 181, n).astype(str),
+        'DiastolicBP': rng.integers(60, 121, n).astype(str),
+        'Blood_Sugar': np.where(lab, sugar, 'N/A'),
+        'Hemoglobin': np.where(lab, hb, 'N/A'),
+        'Risk_Level': levels,
+        'Confidence': np.char.add(np.round(rng.uniform(40, 99, n), 1).astype(str), '%'),
+        'Model_Used': np.where(lab, 'Full Model (5 features)', 'Basic Model (3 features)'),
+        'Lab_Available': np.where(lab, 'Yes', 'No'),
+        'Health_Worker': np.array(['Ana', 'Ben', 'Cora', 'Dan'])[rng.integers(0, 4, n)],
+    }
+    return [columns[c] for c in HISTORY_COLUMNS]
+
+
+def write_synthetic_csv(path, n, seed=0, chunk_size=100000):
+    with open(path, 'w', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(HISTORY_COLUMNS)
+        for start in range(0, n, chunk_size):
+            columns = synthetic_records(min(chunk_size, n - start), seed + start)
+            writer.writerows(zip(*columns))
+
+
+def sample_record():
+    return {
+        'Timestamp': time.strftime('%Y-%m-%d %H:%M:%S'), 'Patient_ID': 'P-BENCH', 'Age': 27,
+        'BMI': 23.4375, 'SystolicBP': 120, 'DiastolicBP': 80, 'Blood_Sugar': 'N/A',
+        'Hemoglobin': 'N/A', 'Risk_Level': 'Low', 'Confidence': '71.2%',
+        'Model_Used': 'Basic Model (3 features)', 'Lab_Available': 'No', 'Health_Worker': 'Bench',
+    }
+
+
+def bench_scoring(results, repeat, quick):
+    engines = {kind: load_deployment(kind)[0] for kind in ('full', 'basic')}
+    rng = np.random.default_rng(0)
+    calls = 2000
+    for kind, engine in engines.items():
+        rows = random_vitals(rng, calls, engine)
+        values = [list(row) for row in rows]
+
+        def single():
+            for row in values:
+                engine.score(row)
+        results[f'score.single.{kind}'] = best_of(single, repeat) / calls
+        for n in BATCH_SIZES[:2] if quick else BATCH_SIZES:
+            X = random_vitals(rng, n, engine)
+            results[f'score.batch.{kind}.{n}'] = best_of(lambda: engine.score_batch(X), repeat)
+
+
+def bench_appends(results, workdir, repeat, count=200):
+    record = sample_record()
+    for name, store_cls, path in (('csv', CsvHistoryStore, 'append.csv'),
+                                  ('sqlite', SqliteHistoryStore, 'append.db')):
+        store = store_cls(os.path.join(workdir, path))
+
+        def appends():
+            for _ in range(count):
+                store.append(record)
+        results[f'history.append.{name}'] = best_of(appends, repeat) / count
+        store.close()
+
+
+def bench_history(results, workdir, n, repeat):
+    csv_path = os.path.join(workdir, f'history_{n}.csv')
+    db_path = os.path.join(workdir, f'history_{n}.db')
+    write_synthetic_csv(csv_path, n)
+    SqliteHistoryStore(db_path).import_csv(csv_path)
+
+    for name, open_store, path in (('csv', CsvHistoryStore, csv_path),
+                                   ('sqlite', SqliteHistoryStore, db_path)):
+        def load():
+            # What the History tab does on open: count, then the first page
+            store = open_store(path)
+            store.mark()
+            store.count()
+            store.query(0, 200)
+            store.close()
+        results[f'history.load.{name}.{n}'] = best_of(load, repeat)
+
+        store = open_store(path)
+        store.count()
+        out = os.path.join(workdir, f'export_{name}_{n}.csv')
+        results[f'history.export.{name}.{n}'] = best_of(lambda: export_history(store, out), repeat)
+        results[f'history.filter.{name}.{n}'] = best_of(
+            lambda: store.query(0, 200, risk_level='High', health_worker='Ana'), repeat)
+        store.close()
+        os.remove(out)
+    return csv_path, db_path
+
+
+def bench_table(results, paths, n, repeat):
+    """Offscreen QTableView population from a store, including painting the
+    first screen of cells."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication, QTableView
+    from history_model import HistoryTableModel
+    from app import COLORS
+    app = QApplication.instance() or QApplication(sys.argv)
+    for name, open_store, path in (('csv', CsvHistoryStore, paths[0]),
+                                   ('sqlite', SqliteHistoryStore, paths[1])):
+        def populate():
+            store = open_store(path)
+            model = HistoryTableModel(store, COLORS)
+            view = QTableView()
+            view.resize(1200, 700)
+            view.setModel(model)
+            model.reload()
+            view.grab()
+            app.processEvents()
+            store.close()
+        results[f'table.populate.{name}.{n}'] = best_of(populate, repeat)
+
+
+def bench_paint(results, repeat, frames=200):
+    """Offscreen RiskIndicator repaints cycling through a few results, as the
+    live preview does, with the pixmap cache warm and cold."""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt5.QtWidgets import QApplication
+    from app import RiskIndicator
+    app = QApplication.instance() or QApplication(sys.argv)
+    indicator = RiskIndicator()
+    indicator.resize(240, 240)
+    indicator.show()
+    values = [(['Low', 'Moderate', 'High'][i % 3], 40.0 + i % 7) for i in range(frames)]
+
+    def repaint(clear_cache):
+        for level, confidence in values:
+            if clear_cache:
+                RiskIndicator._cache.clear()
+            indicator.set_risk(level, confidence)
+            indicator.grab()
+    repaint(False)
+    results['paint.indicator.cached'] = best_of(lambda: repaint(False), repeat) / frames
+    results['paint.indicator.uncached'] = best_of(lambda: repaint(True), repeat) / frames
+    indicator.close()
+
+
+def run(sizes, repeat, quick, include_table=True):
+    results = {}
+    bench_scoring(results, repeat, quick)
+    workdir = tempfile.mkdtemp(prefix='mrs_bench_')
+    if include_table:
+        bench_paint(results, repeat)
+    try:
+        bench_appends(results, workdir, repeat)
+        for n in sizes:
+            paths = bench_history(results, workdir, n, repeat)
+            if include_table:
+                bench_table(results, paths, n, repeat)
+            for path in paths:
+                os.remove(path)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        'meta': {
+            'python': platform.python_version(), 'platform': platform.platform(),
+            'numpy': np.__version__, 'sizes': sizes, 'repeat': repeat,
+            'created': time.strftime('%Y-%m-%d %H:%M:%S'),
+        },
+        'seconds': results,
+        'peak_rss_mb': peak_rss_mb(),
+    }
+
+
+def compare(current, baseline, threshold):
+    """Metrics present in both runs that got slower than the threshold allows.
+    Returns [(name, baseline_s, current_s, ratio)]."""
+    regressions = []
+    for name, seconds in current['seconds'].items():
+        before = baseline.get('seconds', {}).get(name)
+        if before and seconds > before * (1 + threshold):
+            regressions.append((name, before, seconds, seconds / before))
+    rss, rss_before = current.get('peak_rss_mb'), baseline.get('peak_rss_mb')
+    if rss and rss_before and rss > rss_before * (1 + threshold):
+        regressions.append(('peak_rss_mb', rss_before, rss, rss / rss_before))
+    return regressions
+
+
+def format_seconds(seconds):
+    if seconds < 1e-3:
+        return f"{seconds * 1e6:9.1f} us"
+    if seconds < 1:
+        return f"{seconds * 1e3:9.2f} ms"
+    return f"{seconds:9.3f} s "
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maternal risk assessment benchmarks")
+    parser.add_argument('--sizes', type=int, nargs='+', help="Synthetic history sizes")
+    parser.add_argument('--quick', action='store_true', help="Skip the 1M-row runs")
+    parser.add_argument('--repeat', type=int, default=3, help="Runs per timing (best is kept)")
+    parser.add_argument('--no-table', action='store_true', help="Skip the offscreen table benchmark")
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help=f"Allowed slowdown as a fraction (default {DEFAULT_THRESHOLD})")
+    parser.add_argument('--save-baseline', action='store_true', help="Also write the results as the baseline")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes or (QUICK_SIZES if args.quick else DEFAULT_SIZES)
+    report = run(sizes, args.repeat, args.quick, include_table=not args.no_table)
+    for name, seconds in report['seconds'].items():
+        print(f"  {name:<36} {format_seconds(seconds)}")
+    if report['peak_rss_mb'] is not None:
+        print(f"  {'peak RSS':<36} {report['peak_rss_mb']:9.1f} MB")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"✓ Results written to {args.output}")
+    if args.save_baseline:
+        shutil.copyfile(args.output, args.baseline)
+        print(f"✓ Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline, 'r') as f:
+        baseline = json.load(f)
+    regressions = compare(report, baseline, args.threshold)
+    if not regressions:
+        print(f"✓ No regressions beyond {args.threshold:.0%} against {args.baseline}")
+        return 0
+    print(f"Regressions beyond {args.threshold:.0%} against {args.baseline}:")
+    for name, before, after, ratio in regressions:
+        print(f"  {name:<36} {before:.6g} -> {after:.6g} ({ratio:.2f}x)")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,240 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Input Drift Monitor
+Running statistics of the vitals actually scored, compared with the training
+feature_ranges in model_config.json / model_config_BASIC.json
+
+Every assessment and batch run updates a per-model, per-feature count, mean
+and sum of squared deviations (Welford's algorithm; batches are folded in
+with Chan's pairwise update), so memory stays constant however many inputs
+are seen. The totals persist across sessions in drift_state.json (or at
+MRS_DRIFT_STATE).
+
+Report the shift so far:
+    python drift.py [report|reset] [--state PATH]
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import threading
+import numpy as np
+from history import locked
+from model_bundle import DEPLOYMENTS, load_deployment
+
+DRIFT_STATE = os.environ.get('MRS_DRIFT_STATE', 'drift_state.json')
+STATE_FORMAT = 1
+# Flagged as drifted once this many inputs are seen and the live mean is
+# MEAN_SHIFT_LIMIT training standard deviations away, or the variance ratio
+# falls outside VARIANCE_RATIO_LIMITS
+MIN_SAMPLES = 30
+MEAN_SHIFT_LIMIT = 0.5
+VARIANCE_RATIO_LIMITS = (0.5, 2.0)
+
+
+class RunningStats:
+    """Count, mean and sum of squared deviations (M2) of one feature, plus
+    the observed extremes and how many values fell outside the training range."""
+
+    __slots__ = ('n', 'mean', 'm2', 'low', 'high', 'out_of_range')
+
+    def __init__(self, n=0, mean=0.0, m2=0.0, low=math.inf, high=-math.inf, out_of_range=0):
+        self.n, self.mean, self.m2 = n, mean, m2
+        self.low, self.high, self.out_of_range = low, high, out_of_range
+
+    def add(self, x, outside=False):
+        """Welford's single-value update."""
+        self.n += 1
+        delta = x - self.mean
+        self.mean += delta / self.n
+        self.m2 += delta * (x - self.mean)
+        self.low, self.high = min(self.low, x), max(self.high, x)
+        self.out_of_range += bool(outside)
+
+    def merge(self, other):
+        """Fold in another RunningStats (Chan et al.'s pairwise combination)."""
+        if not other.n:
+            return
+        n = self.n + other.n
+        delta = other.mean - self.mean
+        self.mean += delta * other.n / n
+        self.m2 += other.m2 + delta * delta * self.n * other.n / n
+        self.n = n
+        self.low, self.high = min(self.low, other.low), max(self.high, other.high)
+        self.out_of_range += other.out_of_range
+
+    @classmethod
+    def of(cls, values, lo, hi):
+        values = np.asarray(values, dtype=np.float64)
+        if not len(values):
+            return cls()
+        mean = float(values.mean())
+        return cls(len(values), mean, float(((values - mean) ** 2).sum()), float(values.min()),
+                   float(values.max()), int(((values < lo) | (values > hi)).sum()))
+
+    @property
+    def variance(self):
+        return self.m2 / (self.n - 1) if self.n > 1 else float('nan')
+
+    def to_dict(self):
+        return {'n': self.n, 'mean': self.mean, 'm2': self.m2, 'out_of_range': self.out_of_range,
+                'low': self.low if self.n else None, 'high': self.high if self.n else None}
+
+    @classmethod
+    def from_dict(cls, d):
+        return cls(d['n'], d['mean'], d['m2'],
+                   math.inf if d.get('low') is None else d['low'],
+                   -math.inf if d.get('high') is None else d['high'], d.get('out_of_range', 0))
+
+
+def load_references():
+    """{kind: feature_ranges} of the deployed pair, from the same config
+    (bundle or source file) that the models are loaded with."""
+    return {kind: load_deployment(kind)[1]['feature_ranges'] for kind in DEPLOYMENTS}
+
+
+class DriftMonitor:
+    """Per-model, per-feature RunningStats against the training ranges.
+
+    Updates accumulate in memory; save() folds them into the state file,
+    re-reading it first under an exclusive lock on <state>.lock, so the app
+    and a batch run that both save do not overwrite each other's counts.
+    """
+
+    def __init__(self, references=None, path=DRIFT_STATE):
+        self.path = path
+        self.references = references if references is not None else load_references()
+        self.totals = self._load()
+        self.pending = {}
+        self._lock = threading.Lock()
+
+    def set_reference(self, kind, feature_ranges):
+        with self._lock:
+            self.references[kind] = feature_ranges
+
+    def out_of_range(self, kind, input_data):
+        """[(feature, value, min, max)] for inputs outside the training range."""
+        ranges = self.references[kind]
+        return [(name, value, ranges[name]['min'], ranges[name]['max'])
+                for name, value in input_data.items()
+                if name in ranges and not ranges[name]['min'] <= value <= ranges[name]['max']]
+
+    def observe(self, kind, input_data):
+        """Add one assessment. Returns the out-of-range flags."""
+        flags = self.out_of_range(kind, input_data)
+        with self._lock:
+            outside = {name for name, *_ in flags}
+            stats = self.pending.setdefault(kind, {})
+            for name, value in input_data.items():
+                if name in self.references[kind]:
+                    stats.setdefault(name, RunningStats()).add(float(value), name in outside)
+        return flags
+
+    def observe_batch(self, kind, feature_names, X):
+        """Add an (n_rows, n_features) matrix; rows with a missing value are skipped."""
+        X = np.asarray(X, dtype=np.float64)
+        X = X[~np.isnan(X).any(axis=1)]
+        if not len(X):
+            return
+        with self._lock:
+            ranges = self.references[kind]
+            stats = self.pending.setdefault(kind, {})
+            for j, name in enumerate(feature_names):
+                if name in ranges:
+                    batch = RunningStats.of(X[:, j], ranges[name]['min'], ranges[name]['max'])
+                    stats.setdefault(name, RunningStats()).merge(batch)
+
+    def _load(self):
+        try:
+            with open(self.path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if data.get('format') != STATE_FORMAT:
+            return {}
+        return {kind: {name: RunningStats.from_dict(d) for name, d in features.items()}
+                for kind, features in data['models'].items()}
+
+    def save(self):
+        with self._lock:
+            if not self.pending:
+                return
+            with open(self.path + '.lock', 'ab') as lock, locked(lock):
+                self._merge_pending()
+
+    def _merge_pending(self):
+        # Called with both locks held
+        totals = self._load()
+        for kind, features in self.pending.items():
+            for name, stats in features.items():
+                totals.setdefault(kind, {}).setdefault(name, RunningStats()).merge(stats)
+        data = {'format': STATE_FORMAT,
+                'models': {kind: {name: s.to_dict() for name, s in features.items()}
+                           for kind, features in totals.items()}}
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f, indent=1)
+        os.replace(tmp, self.path)
+        self.totals = totals
+        self.pending = {}
+
+    def report(self):
+        """Per model and feature: live vs training mean/std, the mean shift in
+        training standard deviations, the variance ratio and a drift flag."""
+        with self._lock:
+            combined = {}
+            for source in (self.totals, self.pending):
+                for kind, features in source.items():
+                    for name, stats in features.items():
+                        combined.setdefault(kind, {}).setdefault(name, RunningStats()).merge(stats)
+        rows = []
+        for kind, features in combined.items():
+            ranges = self.references.get(kind, {})
+            for name, stats in features.items():
+                ref = ranges.get(name)
+                if ref is None or not stats.n:
+                    continue
+                live_std = math.sqrt(stats.variance) if stats.n > 1 else float('nan')
+                shift = (stats.mean - ref['mean']) / ref['std'] if ref['std'] else float('nan')
+                ratio = stats.variance / ref['std'] ** 2 if ref['std'] and stats.n > 1 else float('nan')
+                drifted = stats.n >= MIN_SAMPLES and (
+                    abs(shift) > MEAN_SHIFT_LIMIT
+                    or not VARIANCE_RATIO_LIMITS[0] <= ratio <= VARIANCE_RATIO_LIMITS[1])
+                rows.append({'model': kind, 'feature': name, 'n': stats.n,
+                             'mean': stats.mean, 'std': live_std,
+                             'train_mean': ref['mean'], 'train_std': ref['std'],
+                             'mean_shift': shift, 'variance_ratio': ratio,
+                             'out_of_range': stats.out_of_range, 'drifted': drifted})
+        return rows
+
+
+def format_report(rows):
+    if not rows:
+        return "Input drift: no inputs observed yet"
+    lines = ["Input drift (live vs training):",
+             f"  {'model':<6} {'feature':<18} {'n':>8} {'mean':>8} {'train':>8} {'shift':>7} "
+             f"{'var x':>6} {'outside':>8}"]
+    for r in rows:
+        lines.append(f"  {r['model']:<6} {r['feature']:<18} {r['n']:>8,} {r['mean']:>8.2f} "
+                     f"{r['train_mean']:>8.2f} {r['mean_shift']:>+7.2f} {r['variance_ratio']:>6.2f} "
+                     f"{r['out_of_range']:>8,}{'  DRIFT' if r['drifted'] else ''}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report input drift against the training ranges")
+    parser.add_argument('command', nargs='?', default='report', choices=['report', 'reset'])
+    parser.add_argument('--state', default=DRIFT_STATE)
+    args = parser.parse_args(argv)
+    if args.command == 'reset':
+        if os.path.exists(args.state):
+            os.remove(args.state)
+        print(f"✓ Cleared {args.state}")
+        return 0
+    print(format_report(DriftMonitor(path=args.state).report()))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Assessment History File
+Append-only, crash-safe writes to assessment_history.csv
+"""
+
+import csv
+import io
+import os
+from contextlib import contextmanager
+
+HISTORY_FILE = 'assessment_history.csv'
+HISTORY_COLUMNS = [
+    'Timestamp', 'Patient_ID', 'Age', 'BMI', 'SystolicBP', 'DiastolicBP',
+    'Blood_Sugar', 'Hemoglobin', 'Risk_Level', 'Confidence', 'Model_Used',
+    'Lab_Available', 'Health_Worker'
+]
+
+if os.name == 'nt':
+    import msvcrt
+
+    @contextmanager
+    def locked(f):
+        # Lock a single byte at offset 0; every writer contends on the same range
+        pos = f.tell()
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        f.seek(pos)
+        try:
+            yield f
+        finally:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+else:
+    import fcntl
+
+    @contextmanager
+    def locked(f):
+        # lockf maps to POSIX record locks, which are honoured over NFS/SMB mounts
+        fcntl.lockf(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield f
+        finally:
+            fcntl.lockf(f.fileno(), fcntl.LOCK_UN)
+
+
+def format_row(record, columns=HISTORY_COLUMNS):
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator='\n').writerow([record.get(c, '') for c in columns])
+    return buf.getvalue().encode('utf-8')
+
+
+class HistoryWriter:
+    """Appends assessment records to the history CSV in constant time.
+
+    Each append is one buffered write of a complete line followed by fsync,
+    done under an exclusive file lock so app instances sharing a folder never
+    interleave partial rows.
+    """
+
+    def __init__(self, path=HISTORY_FILE, columns=HISTORY_COLUMNS):
+        self.path = path
+        self.columns = list(columns)
+
+    def append(self, record):
+        """Append one record; returns the byte offset the row was written at.
+
+        A torn last line left by another instance that crashed mid-write is
+        quarantined first, so the new row never lands on the end of it.
+        """
+        with open(self.path, 'a+b') as f:
+            with locked(f):
+                size = f.seek(0, os.SEEK_END)
+                if size == 0:
+                    f.write(format_row(dict(zip(self.columns, self.columns)), self.columns))
+                else:
+                    self._remove_torn_tail(f, size)
+                offset = f.seek(0, os.SEEK_END)
+                f.write(format_row(record, self.columns))
+                f.flush()
+                os.fsync(f.fileno())
+        return offset
+
+    def recover(self):
+        """Repair the history file at startup.
+
+        A last line without its newline is the remains of a write that was
+        cut off by a crash; it is moved to <file>.torn and truncated away.
+        A file whose header predates the current column set is upgraded once.
+        Returns a short description of what was repaired, or None.
+        """
+        if not os.path.exists(self.path):
+            return None
+        repaired = []
+        with open(self.path, 'r+b') as f:
+            with locked(f):
+                size = f.seek(0, os.SEEK_END)
+                if size == 0:
+                    return None
+                torn = self._remove_torn_tail(f, size)
+                if torn:
+                    repaired.append(f"removed torn last line ({len(torn)} bytes)")
+                f.seek(0)
+                header = next(csv.reader([f.readline().decode('utf-8-sig')]), [])
+                missing = [c for c in self.columns if c not in header]
+                if missing:
+                    self.columns += [c for c in header if c not in self.columns]
+                    self._upgrade(f)
+                    repaired.append(f"added columns {', '.join(missing)}")
+                else:
+                    # Extra or reordered columns are kept; rows follow the file's header
+                    self.columns = header
+        return "; ".join(repaired) or None
+
+    def _remove_torn_tail(self, f, size):
+        # Moves the bytes after the last newline to <file>.torn; call under the lock
+        torn = self._torn_tail(f, size)
+        if torn:
+            with open(self.path + '.torn', 'ab') as side:
+                side.write(torn + b'\n')
+            f.truncate(size - len(torn))
+            f.flush()
+            os.fsync(f.fileno())
+        return torn
+
+    def _torn_tail(self, f, size):
+        # Walk back from EOF in blocks to find the bytes after the last newline
+        f.seek(size - 1)
+        if f.read(1) == b'\n':
+            return b''
+        tail = b''
+        pos = size
+        while pos > 0:
+            step = min(4096, pos)
+            pos -= step
+            f.seek(pos)
+            tail = f.read(step) + tail
+            nl = tail.rfind(b'\n')
+            if nl != -1:
+                return tail[nl + 1:]
+        return tail
+
+    def _upgrade(self, f):
+        # One-time rewrite in place; the original bytes are kept in <file>.bak first
+        f.seek(0)
+        with open(self.path + '.bak', 'wb') as bak:
+            while True:
+                block = f.read(1 << 20)
+                if not block:
+                    break
+                bak.write(block)
+            bak.flush()
+            os.fsync(bak.fileno())
+        with open(self.path + '.bak', 'r', encoding='utf-8-sig', newline='') as src:
+            rows = csv.DictReader(src)
+            f.seek(0)
+            f.truncate()
+            f.write(format_row(dict(zip(self.columns, self.columns)), self.columns))
+            for row in rows:
+                f.write(format_row(row, self.columns))
+        f.flush()
+        os.fsync(f.fileno())
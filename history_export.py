@@ -0,0 +1,173 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - History Export
+Streams filtered assessment history to CSV, gzip CSV, Parquet or Arrow IPC
+
+Usage: python history_export.py out.csv.gz [--from 2025-01-01] [--to 2025-03-31]
+                                 [--risk-level High] [--health-worker NAME]
+                                 [--lab yes|no] [--backend csv|sqlite]
+The format follows the extension: .csv, .csv.gz, .parquet, .arrow/.feather.
+Parquet and Arrow need pyarrow.
+"""
+
+import argparse
+import csv
+import gzip
+import sys
+import pandas as pd
+from history import HISTORY_COLUMNS
+from history_store import open_history_store, HISTORY_BACKEND
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+FORMATS = {
+    'csv': "CSV Files (*.csv)",
+    'csv.gz': "Compressed CSV (*.csv.gz)",
+    'parquet': "Parquet (*.parquet)",
+    'arrow': "Arrow IPC (*.arrow *.feather)",
+}
+EXTENSIONS = {'csv': ('.csv',), 'csv.gz': ('.csv.gz',), 'parquet': ('.parquet',),
+              'arrow': ('.arrow', '.feather')}
+COLUMNAR_FORMATS = ('parquet', 'arrow')
+# Typed in the columnar formats; 'N/A' and blanks become nulls
+NUMERIC_COLUMNS = ('Age', 'BMI', 'SystolicBP', 'DiastolicBP', 'Blood_Sugar', 'Hemoglobin')
+DEFAULT_CHUNK_SIZE = 10000
+
+
+def available_formats():
+    return [f for f in FORMATS if f not in COLUMNAR_FORMATS or pa is not None]
+
+
+def format_for_path(path, default='csv'):
+    lower = path.lower()
+    # .csv.gz before .csv
+    for fmt in ('csv.gz', 'parquet', 'arrow', 'csv'):
+        if lower.endswith(EXTENSIONS[fmt]):
+            return fmt
+    return default
+
+
+def with_extension(path, fmt):
+    """path unchanged when it already names a format, else with fmt's extension."""
+    if format_for_path(path, None):
+        return path
+    return path + EXTENSIONS[fmt][0]
+
+
+def date_filters(date_from=None, date_to=None):
+    """Store filters for an inclusive date range; a bare YYYY-MM-DD end date
+    covers the whole day."""
+    if date_to and len(date_to) == 10:
+        date_to += ' 23:59:59'
+    return {'date_from': date_from or None, 'date_to': date_to or None}
+
+
+def _write_csv(f, chunks, progress, total):
+    writer = csv.DictWriter(f, fieldnames=HISTORY_COLUMNS, extrasaction='ignore')
+    writer.writeheader()
+    done = 0
+    for chunk in chunks:
+        writer.writerows(chunk)
+        done += len(chunk)
+        if progress:
+            progress(done, total)
+    return done
+
+
+def arrow_schema():
+    return pa.schema([(c, pa.float64() if c in NUMERIC_COLUMNS else pa.string())
+                      for c in HISTORY_COLUMNS])
+
+
+def arrow_batch(chunk, schema):
+    df = pd.DataFrame.from_records(chunk, columns=HISTORY_COLUMNS)
+    for column in NUMERIC_COLUMNS:
+        df[column] = pd.to_numeric(df[column], errors='coerce')
+    for column in HISTORY_COLUMNS:
+        if column not in NUMERIC_COLUMNS:
+            df[column] = df[column].astype(str)
+    return pa.RecordBatch.from_pandas(df, schema=schema, preserve_index=False)
+
+
+def _write_columnar(path, fmt, chunks, progress, total):
+    if pa is None:
+        raise ValueError(f"{fmt} export needs pyarrow (pip install pyarrow)")
+    schema = arrow_schema()
+    if fmt == 'parquet':
+        writer = pq.ParquetWriter(path, schema, compression='zstd')
+        write = writer.write_batch
+    else:
+        sink = pa.OSFile(path, 'wb')
+        writer = pa.ipc.new_file(sink, schema)
+        write = writer.write_batch
+    done = 0
+    try:
+        for chunk in chunks:
+            write(arrow_batch(chunk, schema))
+            done += len(chunk)
+            if progress:
+                progress(done, total)
+    finally:
+        writer.close()
+        if fmt != 'parquet':
+            sink.close()
+    return done
+
+
+def export_history(store, path, fmt=None, progress=None, total=None,
+                   chunk_size=DEFAULT_CHUNK_SIZE, **filters):
+    """Copy the matching records of store to path, one chunk at a time.
+
+    filters are the store's filter keywords (see history_store.FILTERS).
+    progress(rows_written, total) is called after every chunk; total is
+    passed through as given, since counting a CSV history means loading it.
+    Returns the number of records written.
+    """
+    fmt = fmt or format_for_path(path)
+    if fmt not in FORMATS:
+        raise ValueError(f"Unknown export format: {fmt}")
+    chunks = store.iter_chunks(chunk_size, **filters)
+    if fmt == 'csv':
+        with open(path, 'w', encoding='utf-8', newline='') as f:
+            return _write_csv(f, chunks, progress, total)
+    if fmt == 'csv.gz':
+        with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+            return _write_csv(f, chunks, progress, total)
+    return _write_columnar(path, fmt, chunks, progress, total)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export assessment history")
+    parser.add_argument('output', help="Destination (.csv, .csv.gz, .parquet, .arrow)")
+    parser.add_argument('--from', dest='date_from', help="First day, YYYY-MM-DD")
+    parser.add_argument('--to', dest='date_to', help="Last day, YYYY-MM-DD")
+    parser.add_argument('--risk-level', choices=['Low', 'Moderate', 'High'])
+    parser.add_argument('--health-worker')
+    parser.add_argument('--lab', choices=['yes', 'no'], help="Only records with/without lab results")
+    parser.add_argument('--backend', default=HISTORY_BACKEND, choices=['csv', 'sqlite'])
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    filters = date_filters(args.date_from, args.date_to)
+    filters.update(risk_level=args.risk_level, health_worker=args.health_worker,
+                   lab_available=args.lab.capitalize() if args.lab else None)
+    store = open_history_store(args.backend)
+    try:
+        written = export_history(store, args.output, chunk_size=args.chunk_size,
+                                 progress=lambda n, _: print(f"  {n:,} records", end='\r'),
+                                 **filters)
+    except (OSError, ValueError) as e:
+        print(f"Export failed: {e}")
+        return 1
+    finally:
+        store.close()
+    print()
+    print(f"✓ Exported {written:,} records to {args.output}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - History Table Model
+Lazy, paged QAbstractTableModel over a HistoryStore
+"""
+
+from collections import OrderedDict
+from PyQt5.QtCore import Qt, QAbstractTableModel, QModelIndex, QVariant
+from PyQt5.QtGui import QColor, QBrush
+from history_store import matches
+
+HISTORY_HEADERS = [
+    "Date/Time", "Patient ID", "Age", "BMI", "Risk Level",
+    "Confidence", "Model Used", "Health Worker", "Lab Available", "Action"
+]
+PAGE_SIZE = 200
+MAX_CACHED_PAGES = 16
+
+
+class HistoryTableModel(QAbstractTableModel):
+    """Shows history records newest first without materializing the whole store.
+
+    Rows are exposed PAGE_SIZE at a time through canFetchMore/fetchMore as the
+    view scrolls, and record data is held in a small LRU of pages, so memory
+    stays bounded however long the history is.
+    """
+
+    def __init__(self, store, colors, parent=None):
+        super().__init__(parent)
+        self.store = store
+        self.filters = {}
+        self.total = 0
+        self.loaded = 0
+        self.pages = OrderedDict()
+        self.brushes = {
+            'Low': QBrush(QColor(colors['success_bg'])),
+            'Moderate': QBrush(QColor(colors['warning_bg'])),
+            'High': QBrush(QColor(colors['danger_bg'])),
+            'Yes': QBrush(QColor(colors['success_bg'])),
+            'No': QBrush(QColor(colors['warning_bg'])),
+        }
+
+    def reload(self, **filters):
+        """Re-count the store with new filters and show the first page."""
+        self.beginResetModel()
+        self.filters = filters
+        self.pages.clear()
+        self.total = self.store.count(**filters)
+        self.loaded = min(PAGE_SIZE, self.total)
+        self.endResetModel()
+
+    def add_records(self, records):
+        """Show newly saved records at the top without reloading the store.
+
+        The store already holds the records, so only the cached pages (whose
+        offsets have shifted) are dropped; the rest of the view is untouched.
+        Returns the number of rows inserted.
+        """
+        new = [r for r in records if matches(r, **self.filters)]
+        if not new:
+            return 0
+        self.beginInsertRows(QModelIndex(), 0, len(new) - 1)
+        self.pages.clear()
+        self.total += len(new)
+        self.loaded += len(new)
+        self.endInsertRows()
+        return len(new)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self.loaded
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HISTORY_HEADERS)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and self.loaded < self.total
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid():
+            return
+        count = min(PAGE_SIZE, self.total - self.loaded)
+        if count <= 0:
+            return
+        self.beginInsertRows(QModelIndex(), self.loaded, self.loaded + count - 1)
+        self.loaded += count
+        self.endInsertRows()
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HISTORY_HEADERS[section]
+        return QVariant()
+
+    def record(self, row):
+        page_no, offset = divmod(row, PAGE_SIZE)
+        page = self.pages.get(page_no)
+        if page is None:
+            page = self.store.query(offset=page_no * PAGE_SIZE, limit=PAGE_SIZE, **self.filters)
+            self.pages[page_no] = page
+            if len(self.pages) > MAX_CACHED_PAGES:
+                self.pages.popitem(last=False)
+        else:
+            self.pages.move_to_end(page_no)
+        return page[offset] if offset < len(page) else None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or role not in (Qt.DisplayRole, Qt.BackgroundRole):
+            return QVariant()
+        row = self.record(index.row())
+        if row is None:
+            return QVariant()
+        col = index.column()
+        if role == Qt.BackgroundRole:
+            if col == 4:
+                return self.brushes.get(row['Risk_Level'], self.brushes['High'])
+            if col == 8:
+                return self.brushes['Yes' if row.get('Lab_Available') == 'Yes' else 'No']
+            return QVariant()
+        if col == 0:
+            return str(row['Timestamp'])
+        if col == 1:
+            return str(row['Patient_ID'])
+        if col == 2:
+            return str(row['Age'])
+        if col == 3:
+            try:
+                return f"{float(row['BMI']):.1f}"
+            except (TypeError, ValueError):
+                return str(row['BMI'])
+        if col == 4:
+            return str(row['Risk_Level'])
+        if col == 5:
+            return str(row['Confidence'])
+        if col == 6:
+            return row.get('Model_Used') or 'Full Model'
+        if col == 7:
+            return str(row['Health_Worker'])
+        if col == 8:
+            return row.get('Lab_Available') or 'Unknown'
+        return "Saved"
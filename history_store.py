@@ -0,0 +1,566 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - History Store
+Pluggable persistence for assessment records (CSV file or embedded SQLite)
+
+One-time import of an existing CSV:
+    python history_store.py import assessment_history.csv assessment_history.db
+"""
+
+import csv
+import io
+import os
+import sqlite3
+import sys
+import threading
+import numpy as np
+import pandas as pd
+from history import HistoryWriter, HISTORY_FILE, HISTORY_COLUMNS
+from patient_index import PatientIndex
+
+HISTORY_DB = 'assessment_history.db'
+HISTORY_BACKEND = os.environ.get('MRS_HISTORY_BACKEND', 'csv')
+# Bytes of the CSV history parsed at a time
+PARSE_BLOCK_BYTES = 8 * 1024 * 1024
+# Filtered row selections the CSV store keeps for paging
+MAX_CACHED_SELECTIONS = 8
+# Segments under COMPACT_ROWS rows are merged once there are more than
+# MAX_SMALL_SEGMENTS of them
+COMPACT_ROWS = 4096
+MAX_SMALL_SEGMENTS = 32
+
+# Filter keyword -> (column, SQL operator)
+FILTERS = {
+    'patient_id': ('Patient_ID', '='),
+    'risk_level': ('Risk_Level', '='),
+    'health_worker': ('Health_Worker', '='),
+    'lab_available': ('Lab_Available', '='),
+    'date_from': ('Timestamp', '>='),
+    'date_to': ('Timestamp', '<='),
+}
+
+
+def check_filters(filters):
+    unknown = set(filters) - set(FILTERS)
+    if unknown:
+        raise ValueError(f"Unknown history filter(s): {', '.join(sorted(unknown))}")
+    return {k: v for k, v in filters.items() if v not in (None, '')}
+
+
+def matches(record, **filters):
+    """True when a record passes the given filters (same rules as the stores)."""
+    for key, value in check_filters(filters).items():
+        column, op = FILTERS[key]
+        field = str(record.get(column, ''))
+        if op == '>=' and not field >= value or op == '<=' and not field <= value \
+                or op == '=' and field != value:
+            return False
+    return True
+
+
+class HistoryStore:
+    """Interface shared by the history backends.
+
+    Records are dicts keyed by HISTORY_COLUMNS. Filters are keyword
+    arguments from FILTERS; date_from/date_to compare against the
+    'YYYY-MM-DD HH:MM:SS' Timestamp text, so a bare date works as a bound.
+    """
+
+    path = None
+
+    def recover(self):
+        return None
+
+    def append(self, record):
+        raise NotImplementedError
+
+    def count(self, **filters):
+        raise NotImplementedError
+
+    def query(self, offset=0, limit=100, newest_first=True, **filters):
+        """Return one page of records."""
+        raise NotImplementedError
+
+    def iter_chunks(self, chunk_size=10000, **filters):
+        """Yield all matching records, oldest first, as lists of dicts."""
+        raise NotImplementedError
+
+    def mark(self):
+        """Start tracking changes from the current end of the history."""
+        raise NotImplementedError
+
+    def poll(self):
+        """Records added since the last mark()/poll(), oldest first, from this
+        or any other writer. Returns None when the history was rewritten and
+        has to be reloaded in full."""
+        raise NotImplementedError
+
+    def visits(self, patient_id, limit=None):
+        """A patient's records, oldest first (the latest limit of them when
+        given), without scanning the whole history."""
+        raise NotImplementedError
+
+    def index_patients(self):
+        """Bring the patient lookup up to date (slow only the first time)."""
+        pass
+
+    def close(self):
+        pass
+
+
+class _Segment:
+    """Row offsets and filter columns of one parsed block of the history.
+
+    Equality columns are held as int32 codes into the store's vocabularies
+    and Timestamp as fixed-width bytes, a few dozen bytes per row in all.
+    """
+
+    __slots__ = ('offsets', 'codes', 'timestamps')
+
+    def __init__(self, offsets, codes, timestamps):
+        self.offsets = offsets
+        self.codes = codes
+        self.timestamps = timestamps
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def match(self, filters, vocabularies):
+        """Boolean mask of the rows passing filters."""
+        mask = np.ones(len(self), dtype=bool)
+        for key, value in filters.items():
+            column, op = FILTERS[key]
+            if op == '=':
+                code = vocabularies[column].get(value)
+                if code is None:
+                    return np.zeros(len(self), dtype=bool)
+                mask &= self.codes[column] == code
+            else:
+                bound = value.encode('utf-8')
+                mask &= self.timestamps >= bound if op == '>=' else self.timestamps <= bound
+        return mask
+
+    @classmethod
+    def concat(cls, segments):
+        return cls(np.concatenate([s.offsets for s in segments]),
+                   {c: np.concatenate([s.codes[c] for s in segments]) for c in segments[0].codes},
+                   np.concatenate([s.timestamps for s in segments]))
+
+
+class CsvHistoryStore(HistoryStore):
+    """The assessment_history.csv file, paged from disk.
+
+    Only the byte offset of every row and the columns the filters use are
+    kept in memory; a page of records is read from the file at those
+    offsets. The file is parsed once, after that only the bytes appended
+    since the last read, so refreshing after a save costs time in
+    proportion to the new rows. A file that was replaced, truncated or
+    edited in place (see _appended_to) is indexed again from the start.
+
+    There is no per-value index as in SQLite: a filter is a vectorized
+    comparison over the in-memory code columns (about a millisecond per
+    100k rows), after which the matching rows are cached for paging.
+    """
+
+    # Equality-filtered columns, held as codes
+    CODED_COLUMNS = [column for column, op in FILTERS.values() if op == '=']
+
+    def __init__(self, path=HISTORY_FILE):
+        self.path = path
+        self.writer = HistoryWriter(path)
+        self._header = None
+        self._segments = []
+        self._vocabularies = {column: {} for column in self.CODED_COLUMNS}
+        self._selections = {}
+        self._identity, self._header_line, self._tail = None, b'', (0, b'')
+        self._stamp = None
+        self._offset = 0
+        self._pending = []
+        self._tracking = False
+        self._rewritten = False
+        self._patients = None
+        # The GUI thread and background tasks share one store
+        self._lock = threading.RLock()
+
+    def recover(self):
+        return self.writer.recover()
+
+    def append(self, record):
+        return self.writer.append(record)
+
+    @property
+    def patients(self):
+        with self._lock:
+            if self._patients is None:
+                self._patients = PatientIndex(self.path)
+            return self._patients
+
+    def visits(self, patient_id, limit=None):
+        return self.patients.visits(patient_id, limit)
+
+    def index_patients(self):
+        self.patients.refresh()
+        self.patients.save()
+
+    def close(self):
+        if self._patients is not None:
+            self._patients.save()
+
+    def _reset(self):
+        self._rewritten = bool(self._segments)
+        self._header, self._segments, self._offset, self._pending = None, [], 0, []
+        self._identity, self._header_line, self._tail = None, b'', (0, b'')
+        self._vocabularies = {column: {} for column in self.CODED_COLUMNS}
+        self._selections = {}
+
+    def _refresh(self):
+        if not os.path.exists(self.path):
+            if self._segments:
+                self._reset()
+            self._stamp = None
+            return
+        st = os.stat(self.path)
+        stamp = (st.st_mtime_ns, st.st_size)
+        if stamp == self._stamp:
+            return
+        with open(self.path, 'rb') as f:
+            if not self._appended_to(f, st):
+                self._reset()
+                header = f.readline()
+                if not header.endswith(b'\n'):
+                    return
+                self._header = next(csv.reader([header.decode('utf-8-sig')]))
+                self._identity, self._header_line, self._offset = (st.st_dev, st.st_ino), header, len(header)
+            # Parsed a block at a time so the first load never holds the whole file
+            while True:
+                f.seek(self._offset)
+                data = f.read(PARSE_BLOCK_BYTES) + f.readline()
+                # Only parse complete lines; a row still being written is picked up next time
+                data = data[:data.rfind(b'\n') + 1]
+                if not data:
+                    break
+                self._add_segment(data, track=self._tracking and not self._rewritten)
+                self._offset += len(data)
+        self._stamp = stamp
+
+    def _appended_to(self, f, st):
+        """True when the file is the one indexed with only rows added: the
+        same file (device and inode), no shorter, and with the same header
+        and last indexed row. Anything else counts as a rewrite.
+
+        Appends always grow the file, so a modification that leaves its size
+        unchanged is an edit in place. An edit made together with new rows
+        is only caught when it touches the header or the last indexed row;
+        checking more would mean re-reading the history on every refresh.
+        """
+        if self._header is None or (st.st_dev, st.st_ino) != self._identity or st.st_size < self._offset:
+            return False
+        if self._stamp is not None and st.st_size == self._stamp[1]:
+            return False
+        f.seek(0)
+        if f.read(len(self._header_line)) != self._header_line:
+            return False
+        tail_offset, tail = self._tail
+        f.seek(tail_offset)
+        return f.read(len(tail)) == tail
+
+    def _add_segment(self, data, track):
+        lines = data.split(b'\n')[:-1]
+        lengths = np.fromiter((len(line) + 1 for line in lines), dtype=np.int64, count=len(lines))
+        offsets = self._offset + np.cumsum(lengths) - lengths
+        columns = self._parse_columns(data, len(lines))
+        codes = {}
+        for column in self.CODED_COLUMNS:
+            # Factorize locally, then map the few distinct values to store-wide codes
+            local, uniques = pd.factorize(np.asarray(columns[column], dtype=object))
+            vocabulary = self._vocabularies[column]
+            lookup = np.array([vocabulary.setdefault(v, len(vocabulary)) for v in uniques] or [0],
+                              dtype=np.int32)
+            codes[column] = lookup[local]
+        timestamps = np.array([v.encode('utf-8') for v in columns['Timestamp']], dtype=bytes)
+        self._segments.append(_Segment(offsets, codes, timestamps))
+        self._tail = (int(offsets[-1]), lines[-1] + b'\n')
+        # Each save adds a small segment; fold the small trailing ones together
+        # so lookups stay proportional to the number of large blocks
+        small = 0
+        while small < len(self._segments) and len(self._segments[-1 - small]) < COMPACT_ROWS:
+            small += 1
+        if small > MAX_SMALL_SEGMENTS:
+            self._segments[-small:] = [_Segment.concat(self._segments[-small:])]
+        if track:
+            self._pending.extend(self._record(row) for row in csv.reader(line.decode('utf-8') for line in lines))
+
+    def _parse_columns(self, data, n_lines):
+        """{column: n_lines values} of the filter columns, one row per line."""
+        wanted = self.CODED_COLUMNS + ['Timestamp']
+        present = [c for c in wanted if c in self._header]
+        try:
+            # Read as text so 'N/A' and the original number formatting survive
+            df = pd.read_csv(io.BytesIO(data), dtype=str, keep_default_na=False, header=None,
+                             names=self._header, usecols=present, skip_blank_lines=False)
+        except (ValueError, pd.errors.ParserError):
+            df = None
+        if df is None or len(df) != n_lines:
+            # Ragged or multi-line rows; parse line by line so offsets stay aligned
+            rows = list(csv.reader(line.decode('utf-8') for line in data.split(b'\n')[:-1]))
+            positions = {c: self._header.index(c) for c in present}
+            return {c: [row[positions[c]] if c in positions and positions[c] < len(row) else ''
+                        for row in rows] for c in wanted}
+        return {c: df[c].fillna('').tolist() if c in present else [''] * n_lines for c in wanted}
+
+    def _record(self, row):
+        record = dict.fromkeys(HISTORY_COLUMNS, '')
+        record.update(zip(self._header, row))
+        return record
+
+    def _rows(self, filters):
+        """Global row numbers passing filters, oldest first.
+
+        The result is cached per filter set and extended with the rows
+        appended since, so paging through one filtered view scans the code
+        columns once rather than once per page.
+        """
+        key = tuple(sorted(filters.items()))
+        rows, covered = self._selections.pop(key, (np.empty(0, dtype=np.int64), 0))
+        parts, start = [rows], 0
+        for segment in self._segments:
+            if start + len(segment) > covered:
+                mask = segment.match(filters, self._vocabularies)
+                parts.append(np.flatnonzero(mask[covered - start:] if covered > start else mask)
+                             + max(start, covered))
+            start += len(segment)
+        rows = np.concatenate(parts) if len(parts) > 1 else rows
+        self._selections[key] = (rows, start)
+        if len(self._selections) > MAX_CACHED_SELECTIONS:
+            self._selections.pop(next(iter(self._selections)))
+        return rows
+
+    def _offsets_of(self, rows):
+        starts = np.cumsum([0] + [len(s) for s in self._segments])
+        which = np.searchsorted(starts, rows, side='right') - 1
+        return [int(self._segments[s].offsets[r - starts[s]]) for s, r in zip(which, rows)]
+
+    def _read(self, offsets):
+        lines = []
+        with open(self.path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                lines.append(f.readline().decode('utf-8'))
+        return [self._record(row) for row in csv.reader(lines)]
+
+    def mark(self):
+        with self._lock:
+            self._refresh()
+            self._pending = []
+            self._tracking = True
+            self._rewritten = False
+
+    def poll(self):
+        with self._lock:
+            self._refresh()
+            if self._rewritten:
+                self.mark()
+                return None
+            records, self._pending = self._pending, []
+            return records
+
+    def count(self, **filters):
+        filters = check_filters(filters)
+        with self._lock:
+            self._refresh()
+            if not filters:
+                return sum(len(s) for s in self._segments)
+            return len(self._rows(filters))
+
+    def query(self, offset=0, limit=100, newest_first=True, **filters):
+        filters = check_filters(filters)
+        with self._lock:
+            self._refresh()
+            if filters:
+                rows = self._rows(filters)
+                rows = rows[::-1][offset:offset + limit] if newest_first else rows[offset:offset + limit]
+            else:
+                total = sum(len(s) for s in self._segments)
+                first, last = offset, min(total, offset + limit)
+                rows = (np.arange(total - last, total - first)[::-1] if newest_first
+                        else np.arange(first, last))
+            offsets = self._offsets_of(rows)
+            return self._read(offsets)
+
+    def iter_chunks(self, chunk_size=10000, **filters):
+        # Streamed from disk rather than through the row index, so exporting
+        # from a process that never loaded the history skips building it.
+        filters = check_filters(filters)
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, 'r', encoding='utf-8-sig', newline='') as f:
+            chunk = []
+            for row in csv.DictReader(f):
+                if filters and not matches(row, **filters):
+                    continue
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    yield chunk
+                    chunk = []
+            if chunk:
+                yield chunk
+
+
+class SqliteHistoryStore(HistoryStore):
+    """Embedded SQLite database indexed on Timestamp, Patient_ID, Risk_Level
+    and Health_Worker."""
+
+    def __init__(self, path=HISTORY_DB):
+        self.path = path
+        # One connection per thread; WAL lets background writers and GUI readers overlap
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+        columns = ", ".join(f'"{c}"' for c in HISTORY_COLUMNS)
+        with self.conn:
+            self.conn.execute(f"CREATE TABLE IF NOT EXISTS assessments (id INTEGER PRIMARY KEY, {columns})")
+            for column in ('Timestamp', 'Patient_ID', 'Risk_Level', 'Health_Worker'):
+                self.conn.execute(f'CREATE INDEX IF NOT EXISTS idx_{column.lower()} ON assessments ("{column}")')
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._insert = (f"INSERT INTO assessments ({columns}) "
+                        f"VALUES ({', '.join('?' for _ in HISTORY_COLUMNS)})")
+        self._last_id = 0
+
+    @property
+    def conn(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def append(self, record):
+        with self.conn:
+            cur = self.conn.execute(self._insert, [record.get(c, '') for c in HISTORY_COLUMNS])
+        return cur.lastrowid
+
+    def _where(self, filters):
+        filters = check_filters(filters)
+        clauses = [f'"{FILTERS[k][0]}" {FILTERS[k][1]} ?' for k in filters]
+        return (" WHERE " + " AND ".join(clauses)) if clauses else "", list(filters.values())
+
+    def count(self, **filters):
+        where, args = self._where(filters)
+        return self.conn.execute(f"SELECT COUNT(*) FROM assessments{where}", args).fetchone()[0]
+
+    def query(self, offset=0, limit=100, newest_first=True, **filters):
+        where, args = self._where(filters)
+        order = "DESC" if newest_first else "ASC"
+        rows = self.conn.execute(
+            f"SELECT * FROM assessments{where} ORDER BY Timestamp {order}, id {order} LIMIT ? OFFSET ?",
+            args + [limit, offset])
+        return [dict(row) for row in rows]
+
+    def iter_chunks(self, chunk_size=10000, **filters):
+        where, args = self._where(filters)
+        cur = self.conn.execute(f"SELECT * FROM assessments{where} ORDER BY id", args)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [dict(row) for row in rows]
+
+    def mark(self):
+        self._last_id = self.conn.execute("SELECT COALESCE(MAX(id), 0) FROM assessments").fetchone()[0]
+
+    def poll(self):
+        rows = [dict(row) for row in self.conn.execute(
+            "SELECT * FROM assessments WHERE id > ? ORDER BY id", (self._last_id,))]
+        if rows:
+            self._last_id = rows[-1]['id']
+        return rows
+
+    def import_csv(self, csv_path=HISTORY_FILE, chunk_size=10000):
+        """Import an existing history CSV once. Returns the number of rows added
+        (0 when this file was already imported)."""
+        key = f"imported:{os.path.abspath(csv_path)}"
+        if self.conn.execute("SELECT 1 FROM meta WHERE key = ?", (key,)).fetchone():
+            return 0
+        added = 0
+        with open(csv_path, 'r', encoding='utf-8-sig', newline='') as f:
+            rows = csv.DictReader(f)
+            with self.conn:
+                batch = []
+                for row in rows:
+                    batch.append([row.get(c, '') for c in HISTORY_COLUMNS])
+                    if len(batch) >= chunk_size:
+                        self.conn.executemany(self._insert, batch)
+                        added += len(batch)
+                        batch = []
+                if batch:
+                    self.conn.executemany(self._insert, batch)
+                    added += len(batch)
+                self.conn.execute("INSERT INTO meta (key, value) VALUES (?, ?)", (key, str(added)))
+        return added
+
+    def get_meta(self, key, default=None):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def append_batch(self, records, meta=None):
+        """Insert records and set the meta key/values in one transaction, so a
+        caller can record how far it got atomically with the rows themselves."""
+        with self.conn:
+            self.conn.executemany(self._insert, [[r.get(c, '') for c in HISTORY_COLUMNS] for r in records])
+            for key, value in (meta or {}).items():
+                self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+        return len(records)
+
+    def visits(self, patient_id, limit=None):
+        # Served by idx_patient_id
+        rows = self.conn.execute(
+            "SELECT * FROM assessments WHERE Patient_ID = ? ORDER BY Timestamp DESC, id DESC LIMIT ?",
+            (patient_id.strip(), -1 if limit is None else limit))
+        return [dict(row) for row in rows][::-1]
+
+    def close(self):
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections = []
+        self._local = threading.local()
+
+
+def open_history_store(backend=HISTORY_BACKEND):
+    """Open the configured backend (MRS_HISTORY_BACKEND=csv|sqlite).
+
+    The first time the SQLite backend is opened next to an existing CSV
+    history, the CSV is imported into it.
+    """
+    if backend == 'csv':
+        return CsvHistoryStore(HISTORY_FILE)
+    if backend == 'sqlite':
+        store = SqliteHistoryStore(HISTORY_DB)
+        if os.path.exists(HISTORY_FILE):
+            added = store.import_csv(HISTORY_FILE)
+            if added:
+                print(f"✓ Imported {added} records from {HISTORY_FILE}")
+        return store
+    raise ValueError(f"Unknown history backend: {backend}")
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 3 or argv[0] != 'import':
+        print("Usage: python history_store.py import <history.csv> <history.db>")
+        return 1
+    store = SqliteHistoryStore(argv[2])
+    try:
+        added = store.import_csv(argv[1])
+    finally:
+        store.close()
+    print(f"✓ Imported {added} records into {argv[2]}" if added else "Already imported, nothing to do")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,316 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - History Sync
+Ships each station's new assessments to a shared folder as numbered deltas
+and merges them into one consolidated history
+
+Set MRS_SYNC_DIR to the shared folder (any mounted or synced folder) and,
+when the host name is not unique, MRS_STATION_ID. The app then logs every
+save to sync_changelog.jsonl and ships the new entries periodically.
+
+    python history_sync.py seed     # log this station's earlier history
+    python history_sync.py ship     # copy unshipped changes to the shared folder
+    python history_sync.py merge    # fold all stations' deltas into
+                                    # consolidated.db on this machine
+    python history_sync.py status
+
+Layout of the shared folder:
+    deltas/<station>/<first seq>-<last seq>.jsonl
+
+The consolidated history is a SQLite history store (open it like any
+other) kept on the merging machine's own disk, not in the shared folder.
+It runs in WAL mode, whose shared-memory index only works for processes on
+one host; on a network or cloud-synced folder the database can be
+corrupted. Only the delta files, each written once and renamed into place,
+travel through the shared folder.
+
+Shipping reads the change log from the last shipped byte offset and merging
+skips delta files by the sequence range in their names, so both cost time
+in proportion to the new records. The merger records each station's last
+merged sequence number in the same transaction as the rows, so merging again
+(or after a crash) never duplicates a record.
+"""
+
+import argparse
+import json
+import os
+import re
+import socket
+import sys
+import threading
+from collections import Counter
+from history import HISTORY_FILE, HISTORY_COLUMNS, locked
+from history_store import SqliteHistoryStore, CsvHistoryStore
+
+SYNC_DIR = os.environ.get('MRS_SYNC_DIR', '')
+STATION_ID = re.sub(r'[^A-Za-z0-9_.-]+', '_', os.environ.get('MRS_STATION_ID') or socket.gethostname())
+CHANGELOG_FILE = 'sync_changelog.jsonl'
+CONSOLIDATED_DB = 'consolidated.db'
+DELTA_NAME = re.compile(r'^(\d{10})-(\d{10})\.jsonl$')
+
+
+def record_key(record):
+    """The values of a record as the history CSV stores them, for spotting
+    the same record in the log and in the history."""
+    return tuple('' if record.get(c) is None else str(record.get(c)) for c in HISTORY_COLUMNS)
+
+
+class ChangeLog:
+    """Append-only JSONL of this station's saves: {"seq": n, "record": {...}}.
+
+    Sequence numbers start at 1 and never repeat, even when the log file is
+    lost and recreated. How far the log has been shipped (sequence and byte
+    offset) and whether the existing history was seeded is kept in
+    <log>.state. Appending, seeding and shipping hold an exclusive lock on the
+    log, so the app and a history_sync.py run never interleave.
+    """
+
+    TAIL_BYTES = 4096
+
+    def __init__(self, path=CHANGELOG_FILE, station=STATION_ID):
+        self.path = path
+        self.state_path = path + '.state'
+        self.station = station
+        self._lock = threading.Lock()
+        try:
+            with open(self.path, 'rb') as f:
+                self.last_seq = self._last_seq(f)
+                self._end = f.seek(0, os.SEEK_END)
+        except OSError:
+            self.last_seq, self._end = self.shipped()[0], 0
+
+    def _open(self):
+        # Read and append through one descriptor: POSIX record locks are
+        # dropped when the process closes any descriptor of the file
+        return open(self.path, 'a+b')
+
+    def _last_seq(self, f):
+        """Highest sequence number used, from the last complete line of f or,
+        when the log was lost, from the shipped state."""
+        end = f.seek(0, os.SEEK_END)
+        size = self.TAIL_BYTES
+        while True:
+            start = max(0, end - size)
+            f.seek(start)
+            lines = f.read().split(b'\n')[:-1]
+            if start:
+                lines = lines[1:]   # may start mid-line
+            for line in reversed(lines):
+                try:
+                    return max(json.loads(line)['seq'], self.shipped()[0])
+                except (ValueError, KeyError):
+                    continue
+            if size >= end:
+                return self.shipped()[0]
+            size *= 16
+
+    def _entries_from(self, f, offset):
+        """Complete entries from byte offset on, and the offset just past them."""
+        f.seek(offset)
+        data = f.read()
+        data = data[:data.rfind(b'\n') + 1]
+        entries = []
+        for line in data.split(b'\n'):
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                continue
+        return entries, offset + len(data)
+
+    def append(self, record):
+        """Log one saved record. Returns its sequence number."""
+        with self._lock, self._open() as f, locked(f):
+            end = f.seek(0, os.SEEK_END)
+            if end != self._end:
+                # Another process wrote since our last append. A seed run may
+                # already have logged this record from the history file.
+                key = record_key(record)
+                entries, _ = self._entries_from(f, self._end if end > self._end else 0)
+                for entry in entries:
+                    if 'record' in entry and record_key(entry['record']) == key:
+                        self.last_seq, self._end = self._last_seq(f), end
+                        return entry['seq']
+                self.last_seq = self._last_seq(f)
+            self.last_seq += 1
+            line = json.dumps({'seq': self.last_seq, 'record': {c: record.get(c, '') for c in HISTORY_COLUMNS}},
+                              default=str)
+            f.write((line + "\n").encode('utf-8'))
+            f.flush()
+            self._end = f.tell()
+            return self.last_seq
+
+    def _state(self):
+        try:
+            with open(self.state_path, 'r') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def shipped(self):
+        """(sequence, byte offset) shipped so far."""
+        state = self._state()
+        return state.get('seq', 0), state.get('offset', 0)
+
+    def seeded(self):
+        """Whether the history from before the log existed has been logged."""
+        return bool(self._state().get('seeded'))
+
+    def _save_state(self, **changes):
+        state = self._state()
+        state.update(changes, station=self.station)
+        tmp = self.state_path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp, self.state_path)
+
+    def mark_seeded(self):
+        """Record that there is no earlier history to seed."""
+        with self._lock, self._open() as f, locked(f):
+            self._save_state(seeded=True)
+
+    def ship(self, shared_dir=SYNC_DIR):
+        """Copy the entries logged since the last ship to one delta file in
+        shared_dir. Returns the number of records shipped."""
+        with self._lock, self._open() as f, locked(f):
+            shipped_seq, offset = self.shipped()
+            end = f.seek(0, os.SEEK_END)
+            if offset:
+                f.seek(offset - 1)
+                if end < offset or f.read(1) != b'\n':
+                    # The log was replaced since the last ship; rescan it and
+                    # go by sequence number alone
+                    offset = 0
+            entries, offset = self._entries_from(f, offset)
+            entries = [e for e in entries if e.get('seq', 0) > shipped_seq]
+            if not entries:
+                return 0
+            first, last = entries[0]['seq'], entries[-1]['seq']
+            station_dir = os.path.join(shared_dir, 'deltas', self.station)
+            os.makedirs(station_dir, exist_ok=True)
+            path = os.path.join(station_dir, f"{first:010d}-{last:010d}.jsonl")
+            with open(path + '.tmp', 'w', encoding='utf-8') as out:
+                for entry in entries:
+                    out.write(json.dumps(entry) + "\n")
+            # Renamed into place only when complete, so the merger never reads half a delta
+            os.replace(path + '.tmp', path)
+            self._save_state(seq=last, offset=offset)
+            return len(entries)
+
+    def seed(self, history_path=HISTORY_FILE):
+        """Log the records of the local history that are not in the log yet,
+        i.e. those saved before sync was turned on. Safe to repeat and to run
+        while the app is logging saves; refused when the log lost entries, as
+        it can then no longer tell what was shipped. Returns the number of
+        records logged."""
+        store = CsvHistoryStore(history_path)
+        count = 0
+        try:
+            with self._lock, self._open() as f, locked(f):
+                entries, _ = self._entries_from(f, 0)
+                self.last_seq = self._last_seq(f)
+                if self.last_seq and (not entries or entries[0].get('seq') != 1):
+                    raise ValueError(f"{self.path} has lost entries that were already shipped; "
+                                     f"seeding could ship records twice")
+                logged = Counter(record_key(e['record']) for e in entries if 'record' in e)
+                f.seek(0, os.SEEK_END)
+                for chunk in store.iter_chunks():
+                    for record in chunk:
+                        key = record_key(record)
+                        if logged[key]:
+                            logged[key] -= 1
+                            continue
+                        self.last_seq += 1
+                        count += 1
+                        f.write((json.dumps({'seq': self.last_seq,
+                                             'record': {c: record.get(c, '') for c in HISTORY_COLUMNS}})
+                                 + "\n").encode('utf-8'))
+                f.flush()
+                self._save_state(seeded=True)
+        finally:
+            store.close()
+        return count
+
+
+def stations(shared_dir):
+    deltas_dir = os.path.join(shared_dir, 'deltas')
+    if not os.path.isdir(deltas_dir):
+        return []
+    return sorted(name for name in os.listdir(deltas_dir) if os.path.isdir(os.path.join(deltas_dir, name)))
+
+
+def station_deltas(shared_dir, station, merged_seq):
+    """[(first, last, path)] of the station's delta files that go beyond
+    merged_seq, in sequence order. Only file names are read."""
+    station_dir = os.path.join(shared_dir, 'deltas', station)
+    files = []
+    for name in os.listdir(station_dir):
+        match = DELTA_NAME.match(name)
+        if match and int(match.group(2)) > merged_seq:
+            files.append((int(match.group(1)), int(match.group(2)), os.path.join(station_dir, name)))
+    return sorted(files)
+
+
+def merge(shared_dir=SYNC_DIR, db_path=CONSOLIDATED_DB):
+    """Fold every unmerged delta into the consolidated store. Safe to run
+    repeatedly. Returns {station: records added}."""
+    store = SqliteHistoryStore(db_path)
+    added = {}
+    try:
+        for station in stations(shared_dir):
+            key = f"sync:{station}"
+            done = int(store.get_meta(key, 0))
+            for first, last, path in station_deltas(shared_dir, station, done):
+                if first > done + 1:
+                    # An earlier delta has not arrived yet; stop here so the
+                    # merged sequence stays contiguous
+                    break
+                with open(path, 'r', encoding='utf-8') as f:
+                    entries = [json.loads(line) for line in f if line.strip()]
+                records = [e['record'] for e in entries if e['seq'] > done]
+                store.append_batch(records, {key: last})
+                done = last
+                added[station] = added.get(station, 0) + len(records)
+    finally:
+        store.close()
+    return added
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sync assessment history through a shared folder")
+    parser.add_argument('command', choices=['seed', 'ship', 'merge', 'status'])
+    parser.add_argument('--shared', default=SYNC_DIR, help="Shared folder (default: MRS_SYNC_DIR)")
+    parser.add_argument('--changelog', default=CHANGELOG_FILE)
+    parser.add_argument('--history', default=HISTORY_FILE, help="History to seed from")
+    parser.add_argument('--db', default=CONSOLIDATED_DB,
+                        help=f"Consolidated store on a local disk (default: {CONSOLIDATED_DB})")
+    args = parser.parse_args(argv)
+
+    log = ChangeLog(args.changelog)
+    if args.command == 'seed':
+        try:
+            count = log.seed(args.history)
+        except ValueError as e:
+            print(e)
+            return 1
+        print(f"✓ Logged {count:,} existing records as station {log.station}")
+        return 0
+    if args.command == 'status':
+        shipped, _ = log.shipped()
+        print(f"Station {log.station}: {log.last_seq:,} logged, {shipped:,} shipped"
+              f"{'' if log.seeded() else ' (earlier history not seeded)'}")
+        return 0
+    if not args.shared:
+        print("No shared folder: set MRS_SYNC_DIR or pass --shared")
+        return 1
+    if args.command == 'ship':
+        count = log.ship(args.shared)
+        print(f"✓ Shipped {count:,} records from station {log.station}")
+        return 0
+    added = merge(args.shared, args.db)
+    for station, count in added.items():
+        print(f"  {station:<24} {count:,}")
+    print(f"✓ Merged {sum(added.values()):,} records")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
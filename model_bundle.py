@@ -0,0 +1,204 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Model Bundles
+Compact, sklearn-free deployment format for the scaler/model pairs
+
+Export the bundles next to the pickles:
+    python model_bundle.py export
+Check a bundle against its pickles:
+    python model_bundle.py verify
+
+A bundle records the SHA-256 of the pickles and config it was exported from.
+When any of them is replaced or edited afterwards the bundle is stale, and
+load_deployment uses the source files instead until the bundle is exported
+again.
+"""
+
+import hashlib
+import json
+import os
+import sys
+import numpy as np
+from scoring import ScoringEngine, FULL_MODEL_FILES, BASIC_MODEL_FILES
+
+BUNDLE_FORMAT = 1
+FULL_BUNDLE = 'model_FULL.npz'
+BASIC_BUNDLE = 'model_BASIC.npz'
+FULL_CONFIG = 'model_config.json'
+BASIC_CONFIG = 'model_config_BASIC.json'
+
+# Bundle path, pickle pair, config, config key that lists the features
+DEPLOYMENTS = {
+    'full': (FULL_BUNDLE, FULL_MODEL_FILES, FULL_CONFIG, 'top_5_features'),
+    'basic': (BASIC_BUNDLE, BASIC_MODEL_FILES, BASIC_CONFIG, 'features'),
+}
+ARRAY_KEYS = ('feature_names', 'mean', 'scale', 'coef', 'intercept', 'classes', 'config')
+
+
+def content_hash(arrays):
+    """SHA-256 over every array's name, dtype, shape and bytes, in a fixed order."""
+    h = hashlib.sha256()
+    for key in ARRAY_KEYS:
+        arr = np.ascontiguousarray(arrays[key])
+        h.update(key.encode('utf-8'))
+        h.update(arr.dtype.str.encode('ascii'))
+        h.update(repr(arr.shape).encode('ascii'))
+        h.update(arr.tobytes())
+    return h.hexdigest()
+
+
+def config_features(config, features_key):
+    features = config.get(features_key) or config.get('features')
+    if not features:
+        raise ValueError(f"Config has no '{features_key}' feature list")
+    return list(features)
+
+
+def file_sha256(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    return h.hexdigest()
+
+
+def source_hashes(pickles, config_path):
+    """{file name: sha256} of the existing source files of a bundle."""
+    return {os.path.basename(path): file_sha256(path)
+            for path in (*pickles, config_path) if os.path.exists(path)}
+
+
+def stale_sources(config, pickles, config_path):
+    """Names of the source files that differ from the ones the bundle was
+    exported from. A bundle from before source hashes were recorded counts
+    as stale against every source present."""
+    recorded = config.get('bundle_sources') or {}
+    return [name for name, digest in source_hashes(pickles, config_path).items()
+            if recorded.get(name) != digest]
+
+
+def export_bundle(model_path, scaler_path, config_path, bundle_path, features_key='features'):
+    """Write one scaler/model pair and its config as a hashed .npz bundle."""
+    engine = ScoringEngine.from_pickles(model_path, scaler_path)
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    if set(config_features(config, features_key)) != set(engine.feature_names):
+        raise ValueError(f"{config_path} does not describe the features of {model_path}")
+    config['bundle_format'] = BUNDLE_FORMAT
+    config['bundle_sources'] = source_hashes((model_path, scaler_path), config_path)
+    arrays = {
+        'feature_names': np.array(engine.feature_names),
+        'mean': engine.mean,
+        'scale': engine.scale,
+        'coef': np.ascontiguousarray(engine.coef_t.T),
+        'intercept': engine.intercept,
+        'classes': engine.classes.astype(np.int64),
+        'config': np.array(json.dumps(config, sort_keys=True)),
+    }
+    arrays['sha256'] = np.array(content_hash(arrays))
+    with open(bundle_path, 'wb') as f:
+        np.savez_compressed(f, **arrays)
+    return arrays['sha256'].item()
+
+
+def load_bundle(bundle_path, expected_features=None):
+    """Load a bundle with NumPy only. Returns (engine, config).
+
+    Raises ValueError when the bundle is incomplete, its content hash does
+    not match (corrupted or edited), or its features differ from
+    expected_features. The hash detects accidental or casual tampering;
+    it is not a signature.
+    """
+    with np.load(bundle_path, allow_pickle=False) as data:
+        missing = [k for k in ARRAY_KEYS + ('sha256',) if k not in data.files]
+        if missing:
+            raise ValueError(f"{bundle_path}: missing {', '.join(missing)}")
+        arrays = {k: data[k] for k in ARRAY_KEYS}
+        stored = data['sha256'].item()
+    if content_hash(arrays) != stored:
+        raise ValueError(f"{bundle_path}: content hash mismatch, bundle is corrupted or was modified")
+    config = json.loads(arrays['config'].item())
+    if config.get('bundle_format') != BUNDLE_FORMAT:
+        raise ValueError(f"{bundle_path}: unsupported bundle format {config.get('bundle_format')}")
+    feature_names = [str(name) for name in arrays['feature_names']]
+    if expected_features is not None and list(expected_features) != feature_names:
+        raise ValueError(f"{bundle_path}: features {feature_names} do not match {list(expected_features)}")
+    engine = ScoringEngine(feature_names, arrays['mean'], arrays['scale'],
+                           arrays['coef'], arrays['intercept'], arrays['classes'])
+    return engine, config
+
+
+def load_deployment(kind, root=''):
+    """Engine and config for 'full' or 'basic': from the bundle when one is
+    present and up to date, otherwise from the pickles and config. Returns
+    (engine, config, source).
+
+    root is the folder holding the model files (default: the working
+    directory), e.g. a candidate model set kept apart from the deployed one.
+    Raises ValueError when the bundle is stale and its pickles cannot be
+    loaded in its place.
+    """
+    bundle_path, pickles, config_path, features_key = DEPLOYMENTS[kind]
+    if root:
+        bundle_path, config_path = os.path.join(root, bundle_path), os.path.join(root, config_path)
+        pickles = tuple(os.path.join(root, p) for p in pickles)
+    if os.path.exists(bundle_path):
+        engine, config = load_bundle(bundle_path)
+        if set(config_features(config, features_key)) != set(engine.feature_names):
+            raise ValueError(f"{bundle_path}: config does not match the model features")
+        stale = stale_sources(config, pickles, config_path)
+        if not stale:
+            return engine, config, bundle_path
+        # The pickles or config were replaced after the export; they win
+        stale_message = (f"{bundle_path} is older than {', '.join(stale)}; "
+                         f"run 'python model_bundle.py export' again")
+        if not all(os.path.exists(p) for p in pickles):
+            raise ValueError(stale_message)
+        try:
+            engine = ScoringEngine.from_pickles(*pickles)
+        except Exception as e:
+            raise ValueError(f"{stale_message} ({e})") from e
+        with open(config_path, 'r') as f:
+            config = json.load(f)
+        return engine, config, pickles[0]
+    engine = ScoringEngine.from_pickles(*pickles)
+    with open(config_path, 'r') as f:
+        config = json.load(f)
+    return engine, config, pickles[0]
+
+
+def verify_bundle(kind, samples=10000, seed=0):
+    """Label disagreements and max absolute probability difference between a
+    bundle and its pickles over random inputs in the training ranges."""
+    bundle_path, pickles, _, _ = DEPLOYMENTS[kind]
+    reference = ScoringEngine.from_pickles(*pickles)
+    engine, config = load_bundle(bundle_path, reference.feature_names)
+    ranges = config['feature_ranges']
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.uniform(ranges[n]['min'], ranges[n]['max'], samples)
+                         for n in engine.feature_names])
+    ref_labels, ref_proba = reference.score_batch(X)
+    labels, proba = engine.score_batch(X)
+    return int((labels != ref_labels).sum()), float(np.abs(proba - ref_proba).max())
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    command = argv[0] if argv else ''
+    if command == 'export':
+        for kind, (bundle_path, pickles, config_path, features_key) in DEPLOYMENTS.items():
+            digest = export_bundle(*pickles, config_path, bundle_path, features_key)
+            print(f"✓ {bundle_path} ({os.path.getsize(bundle_path):,} bytes) sha256={digest[:16]}...")
+        return 0
+    if command == 'verify':
+        for kind, (bundle_path, pickles, config_path, _) in DEPLOYMENTS.items():
+            label_diff, max_err = verify_bundle(kind)
+            stale = stale_sources(load_bundle(bundle_path)[1], pickles, config_path)
+            print(f"{kind}: {label_diff} label differences, max probability error {max_err:.3g}"
+                  + (f"; stale, {', '.join(stale)} changed since export" if stale else ""))
+        return 0
+    print("Usage: python model_bundle.py export|verify")
+    return 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
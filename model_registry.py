@@ -0,0 +1,124 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Model Registry
+The deployed Full/Basic model pair, reloadable while the app is running
+
+Replace the bundles, pickles or configs in place; the app notices, loads and
+validates the new pair in the background and switches to it between
+assessments. A pair that fails validation is rejected and the running one is
+kept.
+"""
+
+import os
+import threading
+from collections import namedtuple
+import numpy as np
+from model_bundle import DEPLOYMENTS, config_features, load_deployment
+from risk_grid import GRID_FILE, USE_RISK_GRID, load_basic_grid
+
+# One loaded pair. Immutable, so readers holding a reference never see a mix
+# of the old and new models.
+Deployment = namedtuple('Deployment', [
+    'engine_full', 'config_full', 'source_full',
+    'engine_basic', 'config_basic', 'source_basic',
+    'version', 'signature',
+])
+
+
+def model_files():
+    """Every file the deployed pair is loaded from, whether present or not."""
+    paths = []
+    for bundle_path, pickles, config_path, _ in DEPLOYMENTS.values():
+        paths.extend((bundle_path, *pickles, config_path))
+    if USE_RISK_GRID:
+        paths.append(GRID_FILE)
+    return paths
+
+
+def file_signature(paths):
+    """(path, size, mtime_ns) of each existing file; changes whenever any of
+    them is written, replaced, created or removed."""
+    signature = []
+    for path in paths:
+        try:
+            st = os.stat(path)
+        except OSError:
+            continue
+        signature.append((path, st.st_size, st.st_mtime_ns))
+    return tuple(signature)
+
+
+def validate(kind, engine, config):
+    """Raise ValueError unless engine matches its config and produces sane
+    probabilities across the training feature ranges."""
+    features_key = DEPLOYMENTS[kind][3]
+    if set(config_features(config, features_key)) != set(engine.feature_names):
+        raise ValueError(f"{kind} model and config list different features")
+    ranges = config.get('feature_ranges', {})
+    missing = [name for name in engine.feature_names if name not in ranges]
+    if missing:
+        raise ValueError(f"{kind} config has no feature_ranges for {', '.join(missing)}")
+    X = np.array([[ranges[name][stat] for name in engine.feature_names]
+                  for stat in ('min', 'mean', 'max')], dtype=np.float64)
+    _, proba = engine.score_batch(X)
+    if not np.all(np.isfinite(proba)) or not np.allclose(proba.sum(axis=1), 1.0):
+        raise ValueError(f"{kind} model produces invalid probabilities")
+
+
+def model_version(engine_full, engine_basic):
+    return f"Full {engine_full.fingerprint[:8]} · Basic {engine_basic.fingerprint[:8]}"
+
+
+class ModelRegistry:
+    """Holds the current Deployment and loads replacements.
+
+    current is swapped by a single assignment, so a reader takes one
+    consistent pair with registry.current and keeps using it for the whole
+    assessment.
+    """
+
+    def __init__(self, paths=None):
+        self.paths = list(paths or model_files())
+        self.current = None
+        self._lock = threading.Lock()
+
+    def load(self):
+        """Load and validate the pair on disk. Returns a Deployment; raises
+        ValueError (or the loader's OSError) when it is unusable."""
+        signature = file_signature(self.paths)
+        engine_full, config_full, source_full = load_deployment('full')
+        engine_basic, config_basic, source_basic = load_deployment('basic')
+        validate('full', engine_full, config_full)
+        validate('basic', engine_basic, config_basic)
+        if file_signature(self.paths) != signature:
+            # Files were still being copied in; the next change event retries
+            raise ValueError("Model files changed while loading")
+        version = model_version(engine_full, engine_basic)
+        if USE_RISK_GRID:
+            engine_basic = load_basic_grid(engine_basic)
+        return Deployment(engine_full, config_full, source_full,
+                          engine_basic, config_basic, source_basic, version, signature)
+
+    def changed(self):
+        """True when the model files differ from the ones current was loaded from."""
+        return self.current is None or file_signature(self.paths) != self.current.signature
+
+    def reload(self):
+        """Load a replacement when the files changed. Returns the new
+        Deployment, or None when there is nothing new. Does not swap."""
+        with self._lock:
+            if not self.changed():
+                return None
+            deployment = self.load()
+            current = self.current
+            if (current is not None and deployment.version == current.version
+                    and (deployment.config_full, deployment.config_basic)
+                    == (current.config_full, current.config_basic)):
+                # Same models (files touched or copied over unchanged): keep
+                # the running pair but remember the new signature
+                self.current = self.current._replace(signature=deployment.signature)
+                return None
+            return deployment
+
+    def activate(self, deployment):
+        self.current = deployment
+        return deployment
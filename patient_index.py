@@ -0,0 +1,153 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Patient Visit Index
+Patient_ID -> byte offsets of that patient's rows in assessment_history.csv
+
+The index is kept in a sidecar file next to the history. On open it catches
+up on rows appended since it was last saved, and it is rebuilt from scratch
+when the history was truncated or its header changed.
+
+Rebuild the sidecar by hand:
+    python patient_index.py [assessment_history.csv]
+"""
+
+import csv
+import json
+import os
+import sys
+import threading
+from history import HISTORY_FILE
+
+INDEX_SUFFIX = '.patients.json'
+INDEX_FORMAT = 2
+
+
+class PatientIndex:
+    """Maps each Patient_ID to the offsets of its rows, oldest first.
+
+    visits(patient_id) is a dict lookup plus one seek per visit, so it does
+    not depend on the length of the history.
+    """
+
+    def __init__(self, history_path=HISTORY_FILE, index_path=None):
+        self.history_path = history_path
+        self.index_path = index_path or history_path + INDEX_SUFFIX
+        self.header = None
+        self.size = 0
+        self.offsets = {}
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.index_path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('format') == INDEX_FORMAT:
+            self.header = data['header']
+            self.size = data['size']
+            self.offsets = data['patients']
+
+    def save(self):
+        with self._lock:
+            if not self.dirty:
+                return
+            data = {'format': INDEX_FORMAT, 'header': self.header, 'size': self.size,
+                    'patients': self.offsets}
+            tmp = self.index_path + '.tmp'
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(data, f, separators=(',', ':'))
+            os.replace(tmp, self.index_path)
+            self.dirty = False
+
+    def refresh(self):
+        """Index rows appended since the last call. Returns how many were added."""
+        with self._lock:
+            return self._refresh()
+
+    def _refresh(self):
+        try:
+            size = os.path.getsize(self.history_path)
+        except OSError:
+            if self.offsets:
+                self._reset(None)
+            return 0
+        if size == self.size:
+            return 0
+        with open(self.history_path, 'rb') as f:
+            header = f.readline()
+            header_text = header.decode('utf-8-sig').rstrip('\r\n')
+            if header_text != self.header or size < self.size:
+                self._reset(header_text)
+                self.size = len(header)
+            f.seek(self.size)
+            data = f.read(size - self.size)
+        # Complete lines only; a row still being written is picked up next time
+        data = data[:data.rfind(b'\n') + 1]
+        if not data:
+            return 0
+        column = next(csv.reader([self.header])).index('Patient_ID')
+        lines = data.split(b'\n')[:-1]
+        offset = self.size
+        starts = []
+        for line in lines:
+            starts.append(offset)
+            offset += len(line) + 1
+        rows = csv.reader(line.decode('utf-8') for line in lines)
+        for start, row in zip(starts, rows):
+            # Stripped, as lookups are; rows saved before IDs were stripped still match
+            patient_id = row[column].strip() if len(row) > column else ''
+            if patient_id not in ('', 'N/A'):
+                self.offsets.setdefault(patient_id, []).append(start)
+        self.size += len(data)
+        self.dirty = True
+        return len(lines)
+
+    def _reset(self, header):
+        self.header = header
+        self.size = 0
+        self.offsets = {}
+        self.dirty = True
+
+    def visits(self, patient_id, limit=None):
+        """Records for patient_id, oldest first (the last limit of them when given)."""
+        with self._lock:
+            self._refresh()
+            offsets = list(self.offsets.get(patient_id.strip(), ()))
+            header = self.header
+        if limit:
+            offsets = offsets[-limit:]
+        if not offsets:
+            return []
+        columns = next(csv.reader([header]))
+        records = []
+        with open(self.history_path, 'rb') as f:
+            for offset in offsets:
+                f.seek(offset)
+                row = next(csv.reader([f.readline().decode('utf-8')]))
+                records.append(dict(zip(columns, row)))
+        return records
+
+    def count(self, patient_id):
+        with self._lock:
+            self._refresh()
+            return len(self.offsets.get(patient_id.strip(), ()))
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else HISTORY_FILE
+    if not os.path.exists(path):
+        print(f"History file not found: {path}")
+        return 1
+    index = PatientIndex(path)
+    index._reset(None)
+    added = index.refresh()
+    index.save()
+    print(f"✓ Indexed {added:,} records for {len(index.offsets):,} patients -> {index.index_path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
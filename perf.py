@@ -0,0 +1,158 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Performance Instrumentation
+Startup phase timing, rolling latency statistics and per-stage metrics
+
+Stage metrics are off unless MRS_METRICS=1; MRS_METRICS_LOG=path also
+appends every timing to a JSONL file.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+
+class PhaseTimer:
+    """Records named phases relative to a common start time.
+
+    Phases may be recorded from any thread; report() lists them in the
+    order they finished with their duration and offset from the start.
+    """
+
+    def __init__(self, start=None):
+        self.start = time.perf_counter() if start is None else start
+        self.phases = []
+        self._lock = threading.Lock()
+
+    def record(self, name, began, ended=None):
+        ended = time.perf_counter() if ended is None else ended
+        with self._lock:
+            self.phases.append((name, began - self.start, ended - began, threading.current_thread().name))
+
+    @contextmanager
+    def phase(self, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, began)
+
+    def report(self, title="Startup timing"):
+        with self._lock:
+            phases = sorted(self.phases, key=lambda p: p[1] + p[2])
+        lines = [f"{title}:"]
+        for name, offset, duration, thread in phases:
+            where = "" if thread == 'MainThread' else "  [background]"
+            lines.append(f"  {name:<28} {duration * 1000:8.1f} ms   (done at {(offset + duration) * 1000:7.1f} ms){where}")
+        return "\n".join(lines)
+
+
+class LatencyStats:
+    """Rolling window of recent durations (in seconds) with percentiles."""
+
+    def __init__(self, maxlen=256):
+        self.samples = deque(maxlen=maxlen)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+
+    def percentile(self, q):
+        if not self.samples:
+            return float('nan')
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))]
+
+    def percentiles(self, qs=(50, 95, 99)):
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {q: float('nan') for q in qs}
+        return {q: ordered[min(len(ordered) - 1, int(round(q / 100 * (len(ordered) - 1))))] for q in qs}
+
+    def summary(self):
+        if not self.samples:
+            return "no samples"
+        return (f"last {self.samples[-1] * 1000:.2f} ms, p50 {self.percentile(50) * 1000:.2f} ms, "
+                f"p95 {self.percentile(95) * 1000:.2f} ms ({self.count} samples)")
+
+
+_DISABLED = nullcontext()
+
+
+class StageMetrics:
+    """Rolling latency histograms for named pipeline stages.
+
+    stage(name) is a context manager timing one run of a stage. While
+    disabled it hands back a shared no-op context, so instrumented code
+    pays a single attribute check. Stages may be timed from any thread.
+    """
+
+    def __init__(self, enabled=False, log_path=None, window=512):
+        self.enabled = enabled
+        self.window = window
+        self.stages = {}
+        self._lock = threading.Lock()
+        # Line buffered so the log is readable while the app runs
+        self._log = open(log_path, 'a', encoding='utf-8', buffering=1) if enabled and log_path else None
+
+    def stage(self, name):
+        if not self.enabled:
+            return _DISABLED
+        return self._timed(name)
+
+    @contextmanager
+    def _timed(self, name):
+        began = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - began)
+
+    def record(self, name, seconds):
+        if not self.enabled:
+            return
+        with self._lock:
+            stats = self.stages.get(name)
+            if stats is None:
+                stats = self.stages[name] = LatencyStats(self.window)
+            stats.add(seconds)
+            if self._log:
+                self._log.write(json.dumps({'ts': round(time.time(), 3), 'stage': name,
+                                            'ms': round(seconds * 1000, 4)}) + "\n")
+
+    def snapshot(self):
+        """{stage: {'count', 'p50_ms', 'p95_ms', 'p99_ms'}} for every stage seen."""
+        with self._lock:
+            stages = list(self.stages.items())
+        result = {}
+        for name, stats in sorted(stages):
+            p = stats.percentiles()
+            result[name] = {'count': stats.count, 'p50_ms': p[50] * 1000,
+                            'p95_ms': p[95] * 1000, 'p99_ms': p[99] * 1000}
+        return result
+
+    def readout(self, prefix):
+        """One-line p50/p95/p99 summary of the stages whose names start with prefix."""
+        parts = [f"{name.split('.', 1)[-1]} {s['p50_ms']:.2f}/{s['p95_ms']:.2f}/{s['p99_ms']:.2f}"
+                 for name, s in self.snapshot().items() if name.startswith(prefix)]
+        return f"{prefix} p50/p95/p99 ms: " + ", ".join(parts) if parts else ""
+
+    def report(self, title="Stage latency"):
+        lines = [f"{title} (ms):"]
+        for name, s in self.snapshot().items():
+            lines.append(f"  {name:<28} p50 {s['p50_ms']:8.3f}  p95 {s['p95_ms']:8.3f}  "
+                         f"p99 {s['p99_ms']:8.3f}  n={s['count']}")
+        return "\n".join(lines)
+
+    def close(self):
+        with self._lock:
+            if self._log:
+                self._log.close()
+                self._log = None
+
+
+METRICS = StageMetrics(enabled=os.environ.get('MRS_METRICS', '') == '1',
+                       log_path=os.environ.get('MRS_METRICS_LOG'))
@@ -0,0 +1,95 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Prediction Cache
+Bounded LRU memoization of single-assessment scoring
+"""
+
+import threading
+from collections import OrderedDict
+
+# Rounding applied to each feature before it becomes part of the key. The
+# form's spin boxes already step in whole mmHg and 0.01 for the lab values;
+# BMI is derived from weight/height and is only rounded away from float noise.
+QUANT_DECIMALS = {
+    'BMI': 6, 'SystolicBP': 0, 'DiastolicBP': 0,
+    'Blood Sugar Level': 2, 'Hemoglobin Level': 2,
+}
+
+
+class PredictionCache:
+    """LRU cache of (label, probabilities) keyed on the model fingerprint and
+    the quantized feature vector.
+
+    When an engine with new parameters shows up for a feature set the cache
+    has seen before (a replaced model file), the old model's entries are
+    dropped. Misses score the exact input; hits return the stored result
+    without scaling or inference.
+    """
+
+    def __init__(self, maxsize=4096):
+        self.maxsize = maxsize
+        self.entries = OrderedDict()
+        self.models = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def key(self, engine, values):
+        quantized = tuple(round(float(v), QUANT_DECIMALS.get(name, 6))
+                          for name, v in zip(engine.feature_names, values))
+        return engine.fingerprint, quantized
+
+    def _check_model(self, engine):
+        slot = tuple(engine.feature_names)
+        previous = self.models.get(slot)
+        if previous == engine.fingerprint:
+            return
+        self.models[slot] = engine.fingerprint
+        if previous is not None:
+            stale = [k for k in self.entries if k[0] == previous]
+            for k in stale:
+                del self.entries[k]
+            self.evictions += len(stale)
+
+    def get(self, engine, values):
+        """Cached result or None; counts a hit or a miss."""
+        with self._lock:
+            self._check_model(engine)
+            key = self.key(engine, values)
+            result = self.entries.get(key)
+            if result is None:
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return result
+
+    def put(self, engine, values, result):
+        with self._lock:
+            self._check_model(engine)
+            self.entries[self.key(engine, values)] = result
+            while len(self.entries) > self.maxsize:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def score(self, engine, values):
+        """engine.score(values) through the cache."""
+        result = self.get(engine, values)
+        if result is None:
+            result = engine.score(values)
+            self.put(engine, values, result)
+        return result
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+            self.models.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self.entries), 'maxsize': self.maxsize,
+                'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
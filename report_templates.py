@@ -0,0 +1,102 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Report Templates
+Recommendation and referral report HTML, compiled once at import
+
+Everything that depends only on the risk level and on whether lab results
+were available is resolved into one %-format string per combination; a
+report then only formats in the numbers and patient fields.
+"""
+
+import html
+
+STYLE = "font-family:Inter,sans-serif;font-size:13px;line-height:1.6;color:#475569;"
+LAB_WARNING = ("<div style='background:#FEF3C7;padding:12px;border-radius:8px;margin:12px 0;"
+               "border-left:4px solid #F6AD55'><b style='color:#92400E'>Important:</b> Basic Model used. "
+               "Lab tests <b>strongly recommended</b>.</div>")
+PROBABILITY_BOX = ("<div style='background:#f8fafc;padding:12px;border-radius:8px;margin:12px 0'>"
+                   "<b>Probability:</b> Low:%.1f%% | Mod:%.1f%% | High:%.1f%%</div>")
+
+# Per risk level: heading, actions label, actions, lab item shown without
+# lab results, and the closing line. '{lab}' marks where the lab item goes.
+RECOMMENDATIONS = {
+    'Low': (
+        "<h3 style='color:#48BB78'>Low Risk - Routine Care</h3>",
+        "<b>Actions:</b>",
+        ["<li>Regular prenatal checkups (monthly)</li>", "<li>Healthy diet and exercise</li>",
+         "<li>Monitor symptoms</li>", "<li>Return if warning signs</li>", "<li>Next: 4 weeks</li>", "{lab}"],
+        "<li><b>Get lab tests</b> for complete assessment</li>",
+        "<p style='font-style:italic;color:#48BB78'>Patient can be managed at barangay health center level</p>",
+    ),
+    'Moderate': (
+        "<h3 style='color:#F6AD55'>Moderate Risk - Enhanced Monitoring</h3>",
+        "<b>Actions:</b>",
+        ["<li><b>Refer to RHU</b> for evaluation</li>", "{lab}", "<li>Bi-weekly prenatal visits</li>",
+         "<li>Monitor BP and blood sugar</li>", "<li>Watch for warning signs</li>"],
+        "<li style='color:#FC8181'><b>PRIORITY: Get lab tests</b> before RHU visit</li>",
+        "<p style='font-style:italic;color:#F6AD55'>Coordinate with RHU midwife/physician</p>",
+    ),
+    'High': (
+        "<h3 style='color:#FC8181'>High Risk - URGENT REFERRAL</h3>",
+        "<b style='color:#742A2A'>Actions:</b>",
+        ["<li style='color:#FC8181'><b>IMMEDIATE hospital/OB-GYN referral</b></li>", "{lab}",
+         "<li>Specialist care required</li>", "<li>Weekly+ visits needed</li>",
+         "<li>Prepare for complications</li>"],
+        "<li style='color:#FC8181'><b>URGENT: Lab tests en route</b></li>",
+        "<p style='font-weight:bold;color:#FC8181'>DO NOT DELAY: Hospital referral immediately</p>",
+    ),
+}
+
+
+def _compile_recommendations(risk_level, lab_available):
+    heading, actions_label, actions, lab_item, closing = RECOMMENDATIONS[risk_level]
+    warning = LAB_WARNING if not lab_available and risk_level in ('Moderate', 'High') else ""
+    items = "".join(("" if lab_available else lab_item) if item == "{lab}" else item for item in actions)
+    before = f"<div style='{STYLE}'>{warning}{heading}"
+    after = f"{actions_label}<ul>{items}</ul>{closing}</div>"
+    return before.replace('%', '%%') + PROBABILITY_BOX + after.replace('%', '%%')
+
+
+RECOMMENDATION_TEMPLATES = {(level, lab): _compile_recommendations(level, lab)
+                            for level in RECOMMENDATIONS for lab in (True, False)}
+
+REPORT_TEMPLATE = (
+    "<div style='font-family:Inter,sans-serif;font-size:13px;color:#0f172a'>"
+    "<h2 style='color:#1e3a4c'>Maternal Risk Assessment - Referral Report</h2>"
+    "<p style='color:#475569'>Municipal Health Office Bay, Laguna</p>"
+    "<table cellpadding='4' style='margin:8px 0'>"
+    "<tr><td><b>Patient ID:</b></td><td>%(patient_id)s</td><td><b>Assessed:</b></td><td>%(timestamp)s</td></tr>"
+    "<tr><td><b>Age:</b></td><td>%(age)s</td><td><b>Health worker:</b></td><td>%(health_worker)s</td></tr>"
+    "<tr><td><b>BMI:</b></td><td>%(bmi)s</td><td><b>Blood pressure:</b></td><td>%(systolic)s/%(diastolic)s mmHg</td></tr>"
+    "<tr><td><b>Blood sugar:</b></td><td>%(blood_sugar)s</td><td><b>Hemoglobin:</b></td><td>%(hemoglobin)s</td></tr>"
+    "<tr><td><b>Recorded result:</b></td><td>%(recorded)s</td><td><b>Model:</b></td><td>%(model)s</td></tr>"
+    "</table>%(note)s<hr>%(recommendations)s</div>"
+)
+RESCORED_NOTE = ("<p style='color:#92400E'><b>Note:</b> the current models rate these vitals %s; "
+                 "the recommendations below follow the current rating.</p>")
+
+
+def recommendations_html(risk_level, probabilities, lab_available):
+    """Recommendation HTML for one result; probabilities are Low/Moderate/High fractions."""
+    return RECOMMENDATION_TEMPLATES[risk_level, bool(lab_available)] % (
+        probabilities[0] * 100, probabilities[1] * 100, probabilities[2] * 100)
+
+
+def report_html(record, risk_level, probabilities):
+    """Referral report for a history record, with the recommendations for
+    risk_level/probabilities (the record re-scored with the current models)."""
+    lab_available = record.get('Lab_Available') == 'Yes'
+    fields = {key: html.escape(str(record.get(column, '')))
+              for key, column in (('patient_id', 'Patient_ID'), ('timestamp', 'Timestamp'),
+                                  ('age', 'Age'), ('health_worker', 'Health_Worker'),
+                                  ('systolic', 'SystolicBP'), ('diastolic', 'DiastolicBP'),
+                                  ('blood_sugar', 'Blood_Sugar'), ('hemoglobin', 'Hemoglobin'),
+                                  ('model', 'Model_Used'))}
+    try:
+        fields['bmi'] = f"{float(record.get('BMI')):.1f}"
+    except (TypeError, ValueError):
+        fields['bmi'] = html.escape(str(record.get('BMI', '')))
+    recorded = record.get('Risk_Level', '')
+    fields['recorded'] = html.escape(f"{recorded} ({record.get('Confidence', '')})")
+    fields['note'] = RESCORED_NOTE % risk_level if recorded != risk_level else ""
+    fields['recommendations'] = recommendations_html(risk_level, probabilities, lab_available)
+    return REPORT_TEMPLATE % fields
@@ -0,0 +1,210 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - History Re-scoring
+Re-scores every stored assessment with the currently deployed models and
+reports the records whose risk category changed
+
+Usage: python rescore_history.py [--history assessment_history.csv]
+                                 [--report rescore_report.csv] [--workers N]
+                                 [--chunk-size 20000] [--restart]
+
+Work is split into chunks scored on a process pool. Each finished chunk is
+checkpointed under <report>.parts/ with the number of rows it covered, so an
+interrupted run picks up where it stopped even when assessments were saved
+in the meantime (only the growing last chunk is scored again). The
+checkpoints are discarded when the first chunk of the history, the chunk
+size or the models differ from when they were written.
+
+Records that cannot be scored (a required vital sign is missing) are counted
+separately rather than reported as changed.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+from history import HISTORY_FILE
+from model_bundle import load_deployment
+from scoring import score_frame
+
+DEFAULT_REPORT = 'rescore_report.csv'
+DEFAULT_CHUNK_SIZE = 20000
+REPORT_COLUMNS = ['Row', 'Timestamp', 'Patient_ID', 'Health_Worker', 'Old_Risk_Level',
+                  'New_Risk_Level', 'Old_Confidence', 'New_Confidence', 'Model_Used']
+MANIFEST = 'manifest.json'
+PART_NAME = re.compile(r'^chunk_(\d{6})-(\d+)\.csv$')
+
+_engines = None
+
+
+def _init_worker():
+    global _engines
+    _engines = (load_deployment('full')[0], load_deployment('basic')[0])
+
+
+def rescore_chunk(chunk_no, first_row, df, parts_dir):
+    """Score one chunk in a worker and checkpoint its changed and unscored
+    records. Returns (chunk_no, rows)."""
+    results = score_frame(df, *_engines)
+    unscored = results['Risk_Level'].to_numpy() == 'N/A'
+    changed = (results['Risk_Level'].to_numpy() != df['Risk_Level'].to_numpy()) | unscored
+    diff = pd.DataFrame({
+        'Row': first_row + pd.RangeIndex(len(df))[changed],
+        'Timestamp': df['Timestamp'].to_numpy()[changed],
+        'Patient_ID': df['Patient_ID'].to_numpy()[changed],
+        'Health_Worker': df['Health_Worker'].to_numpy()[changed],
+        'Old_Risk_Level': df['Risk_Level'].to_numpy()[changed],
+        'New_Risk_Level': results['Risk_Level'].to_numpy()[changed],
+        'Old_Confidence': df['Confidence'].to_numpy()[changed],
+        'New_Confidence': results['Confidence'].to_numpy()[changed],
+        'Model_Used': results['Model_Used'].to_numpy()[changed],
+    }, columns=REPORT_COLUMNS)
+    path = os.path.join(parts_dir, f"chunk_{chunk_no:06d}-{len(df)}.csv")
+    diff.to_csv(path + '.tmp', index=False)
+    os.replace(path + '.tmp', path)
+    return chunk_no, len(df)
+
+
+def checkpoints(parts_dir):
+    """{chunk number: (rows covered, file name)} of the finished chunks."""
+    found = {}
+    for name in os.listdir(parts_dir):
+        match = PART_NAME.match(name)
+        if match:
+            found[int(match.group(1))] = (int(match.group(2)), name)
+    return found
+
+
+def run_manifest(history_path, chunk_size, first_chunk):
+    """What the checkpoints are only valid for: this history (identified by
+    its first chunk, which appends never touch), chunking and pair of models."""
+    head = hashlib.sha256(",".join(first_chunk.columns).encode('utf-8'))
+    head.update(pd.util.hash_pandas_object(first_chunk, index=False).to_numpy().tobytes())
+    return {
+        'history': os.path.abspath(history_path), 'head': head.hexdigest(),
+        'chunk_size': chunk_size,
+        'models': [load_deployment(kind)[0].fingerprint for kind in ('full', 'basic')],
+    }
+
+
+def prepare_parts(parts_dir, manifest, restart=False):
+    """Create or reuse the checkpoint directory. Returns the checkpoints
+    already there."""
+    path = os.path.join(parts_dir, MANIFEST)
+    if os.path.isdir(parts_dir) and not restart:
+        try:
+            with open(path, 'r') as f:
+                if json.load(f) == manifest:
+                    return checkpoints(parts_dir)
+        except (OSError, ValueError):
+            pass
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    os.makedirs(parts_dir)
+    with open(path, 'w') as f:
+        json.dump(manifest, f)
+    return {}
+
+
+def rescore_history(history_path=HISTORY_FILE, report_path=DEFAULT_REPORT, workers=None,
+                    chunk_size=DEFAULT_CHUNK_SIZE, restart=False, progress=None):
+    """Re-score history_path and write the changed records to report_path.
+
+    Returns {'rows', 'changed', 'unscored', 'patients', 'resumed',
+    'transitions'} where unscored counts records the models cannot score and
+    transitions counts (old, new) risk level pairs of the changed ones.
+    """
+    parts_dir = report_path + '.parts'
+    workers = workers or os.cpu_count() or 1
+    rows = 0
+    resumed = 0
+
+    def collect(futures):
+        for future in futures:
+            _, n = future.result()
+            if progress:
+                progress(n)
+
+    reader = pd.read_csv(history_path, dtype=str, keep_default_na=False, chunksize=chunk_size)
+    with reader, ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        pending = set()
+        done = None
+        for chunk_no, df in enumerate(reader):
+            if done is None:
+                done = prepare_parts(parts_dir, run_manifest(history_path, chunk_size, df), restart)
+            rows += len(df)
+            if chunk_no in done:
+                covered, name = done.pop(chunk_no)
+                if covered == len(df):
+                    resumed += 1
+                    continue
+                # Rows were appended to this chunk since it was checkpointed
+                os.remove(os.path.join(parts_dir, name))
+            pending.add(pool.submit(rescore_chunk, chunk_no, chunk_no * chunk_size, df, parts_dir))
+            # Bound the chunks held in memory to a couple per worker
+            if len(pending) >= 2 * workers:
+                finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+                collect(finished)
+        collect(pending)
+
+    if done is None:
+        # Empty history: no chunks were read
+        prepare_parts(parts_dir, {}, restart=True)
+    # Checkpoints left in done cover chunks the history no longer has
+    parts = sorted(name for no, (_, name) in checkpoints(parts_dir).items() if no not in (done or {}))
+    diffs = [pd.read_csv(os.path.join(parts_dir, name), dtype=str, keep_default_na=False) for name in parts]
+    report = pd.concat(diffs, ignore_index=True) if diffs else pd.DataFrame(columns=REPORT_COLUMNS)
+    unscored = report['New_Risk_Level'] == 'N/A'
+    report = report[~unscored]
+    report.to_csv(report_path, index=False)
+    transitions = report.groupby(['Old_Risk_Level', 'New_Risk_Level']).size().to_dict() if len(report) else {}
+    shutil.rmtree(parts_dir, ignore_errors=True)
+    return {
+        'rows': rows, 'changed': len(report), 'unscored': int(unscored.sum()), 'resumed': resumed,
+        'patients': int(report.loc[~report['Patient_ID'].isin(['', 'N/A']), 'Patient_ID'].nunique()),
+        'transitions': transitions,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Re-score the assessment history with the deployed models")
+    parser.add_argument('--history', default=HISTORY_FILE)
+    parser.add_argument('--report', default=DEFAULT_REPORT, help="CSV of records whose risk level changed")
+    parser.add_argument('--workers', type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument('--restart', action='store_true', help="Ignore checkpoints from an earlier run")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.history):
+        print(f"History file not found: {args.history}")
+        return 1
+    start = time.perf_counter()
+    scored = [0]
+
+    def progress(n):
+        scored[0] += n
+        print(f"  {scored[0]:,} records re-scored", end='\r')
+    try:
+        summary = rescore_history(args.history, args.report, args.workers, args.chunk_size,
+                                  args.restart, progress)
+    except KeyboardInterrupt:
+        print(f"\nInterrupted; run again to resume from {args.report}.parts")
+        return 1
+    print()
+    if summary['resumed']:
+        print(f"Resumed: {summary['resumed']} chunk(s) taken from the previous run")
+    print(f"✓ Re-scored {summary['rows']:,} records in {time.perf_counter() - start:.1f}s")
+    print(f"  {summary['changed']:,} changed risk level, across {summary['patients']:,} patients -> {args.report}")
+    for (old, new), n in sorted(summary['transitions'].items(), key=lambda t: -t[1]):
+        print(f"  {old:>8} -> {new:<8} {n:,}")
+    if summary['unscored']:
+        print(f"  {summary['unscored']:,} records could not be scored (missing vital signs)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,197 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Basic Model Lookup Grid
+Precomputed class probabilities over the Basic model's training domain,
+read back in constant time with trilinear interpolation
+
+Build the grid next to the models and check it against the Basic model:
+    python risk_grid.py build [--bmi-step 0.1] [--bp-step 1]
+    python risk_grid.py verify [--samples 200000]
+"""
+
+import argparse
+import os
+import sys
+import numpy as np
+from model_bundle import load_deployment
+
+GRID_FILE = 'risk_grid_BASIC.npz'
+# Clinically meaningful resolution: BMI to 0.1, blood pressure to 1 mmHg
+DEFAULT_STEPS = {'BMI': 0.1, 'SystolicBP': 1.0, 'DiastolicBP': 1.0}
+# The desktop app scores from the model unless the grid is switched on
+USE_RISK_GRID = os.environ.get('MRS_USE_RISK_GRID', '') == '1'
+
+
+class RiskGrid:
+    """Drop-in replacement for the Basic ScoringEngine backed by a 3-D table.
+
+    Inputs inside the grid are answered by interpolating the stored class
+    probabilities between the eight surrounding grid points; anything outside
+    falls back to the real model.
+    """
+
+    def __init__(self, engine, lows, highs, proba):
+        if engine.n_features != 3:
+            raise ValueError("The lookup grid needs a 3-feature model")
+        self.engine = engine
+        self.feature_names = engine.feature_names
+        self.classes = engine.classes
+        self.fingerprint = engine.fingerprint
+        self.lows = np.asarray(lows, dtype=np.float64)
+        self.highs = np.asarray(highs, dtype=np.float64)
+        self.proba = proba
+        self.shape = np.array(proba.shape[:3])
+        self.steps = (self.highs - self.lows) / (self.shape - 1)
+
+    @property
+    def n_features(self):
+        return 3
+
+    @classmethod
+    def build(cls, engine, feature_ranges, steps=DEFAULT_STEPS):
+        lows, highs, axes = [], [], []
+        for name in engine.feature_names:
+            lo, hi = feature_ranges[name]['min'], feature_ranges[name]['max']
+            count = int(round((hi - lo) / steps[name])) + 1
+            lows.append(lo)
+            highs.append(hi)
+            axes.append(np.linspace(lo, hi, count))
+        mesh = np.meshgrid(*axes, indexing='ij')
+        X = np.column_stack([m.ravel() for m in mesh])
+        _, proba = engine.score_batch(X)
+        proba = proba.reshape(tuple(len(a) for a in axes) + (proba.shape[1],))
+        return cls(engine, lows, highs, proba.astype(np.float32))
+
+    def save(self, path=GRID_FILE):
+        with open(path, 'wb') as f:
+            np.savez_compressed(f, lows=self.lows, highs=self.highs, proba=self.proba,
+                                feature_names=np.array(self.feature_names),
+                                fingerprint=np.array(self.fingerprint))
+
+    @classmethod
+    def load(cls, engine, path=GRID_FILE):
+        """Load a grid built for exactly this engine; a grid from another model
+        version is rejected."""
+        with np.load(path, allow_pickle=False) as data:
+            if data['fingerprint'].item() != engine.fingerprint:
+                raise ValueError(f"{path} was built for a different model; rebuild it")
+            if [str(n) for n in data['feature_names']] != engine.feature_names:
+                raise ValueError(f"{path} feature order does not match the model")
+            return cls(engine, data['lows'], data['highs'], data['proba'])
+
+    def vector(self, values):
+        return self.engine.vector(values)
+
+    def inside(self, X):
+        return ((X >= self.lows) & (X <= self.highs)).all(axis=1)
+
+    def interpolate(self, X):
+        """Trilinear interpolation for rows known to be inside the grid."""
+        pos = (X - self.lows) / self.steps
+        base = np.minimum(np.floor(pos).astype(np.int64), self.shape - 2)
+        frac = pos - base
+        i, j, k = base[:, 0], base[:, 1], base[:, 2]
+        fx, fy, fz = frac[:, 0:1], frac[:, 1:2], frac[:, 2:3]
+        p = self.proba
+        c00 = p[i, j, k] * (1 - fx) + p[i + 1, j, k] * fx
+        c01 = p[i, j, k + 1] * (1 - fx) + p[i + 1, j, k + 1] * fx
+        c10 = p[i, j + 1, k] * (1 - fx) + p[i + 1, j + 1, k] * fx
+        c11 = p[i, j + 1, k + 1] * (1 - fx) + p[i + 1, j + 1, k + 1] * fx
+        c0 = c00 * (1 - fy) + c10 * fy
+        c1 = c01 * (1 - fy) + c11 * fy
+        proba = c0 * (1 - fz) + c1 * fz
+        return proba / proba.sum(axis=1, keepdims=True)
+
+    def score_batch(self, X):
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        labels = np.empty(len(X), dtype=self.classes.dtype)
+        proba = np.empty((len(X), self.proba.shape[3]))
+        inside = self.inside(X)
+        if inside.any():
+            proba[inside] = self.interpolate(X[inside])
+            labels[inside] = self.classes[proba[inside].argmax(axis=1)]
+        if not inside.all():
+            labels[~inside], proba[~inside] = self.engine.score_batch(X[~inside])
+        return labels, proba
+
+    def score(self, values):
+        # Scalar fast path: one 2x2x2 slice and plain float arithmetic, which
+        # beats the fancy indexing of score_batch for a single row
+        x = [float(v) for v in values]
+        lows, highs, steps, shape = self.lows, self.highs, self.steps, self.shape
+        if not all(lows[d] <= x[d] <= highs[d] for d in range(3)):
+            return self.engine.score(values)
+        base, frac = [], []
+        for d in range(3):
+            pos = (x[d] - lows[d]) / steps[d]
+            b = min(int(pos), int(shape[d]) - 2)
+            base.append(b)
+            frac.append(pos - b)
+        i, j, k = base
+        fx, fy, fz = frac
+        cell = self.proba[i:i + 2, j:j + 2, k:k + 2].tolist()
+        n = len(cell[0][0][0])
+        proba = [0.0] * n
+        for a, wa in ((0, 1 - fx), (1, fx)):
+            for b, wb in ((0, 1 - fy), (1, fy)):
+                for c, wc in ((0, 1 - fz), (1, fz)):
+                    w = wa * wb * wc
+                    corner = cell[a][b][c]
+                    for m in range(n):
+                        proba[m] += w * corner[m]
+        proba = np.array(proba)
+        proba /= proba.sum()
+        return self.classes[int(proba.argmax())], proba
+
+    def verify(self, samples=200000, seed=0):
+        """Compare against the model on random points and on every cell centre
+        along the diagonal. Returns max probability error and label agreement."""
+        rng = np.random.default_rng(seed)
+        X = rng.uniform(self.lows, self.highs, size=(samples, 3))
+        centres = self.lows + (np.arange(self.shape.min() - 1)[:, None] + 0.5) * self.steps
+        X = np.vstack([X, centres])
+        ref_labels, ref_proba = self.engine.score_batch(X)
+        labels, proba = self.score_batch(X)
+        return {
+            'samples': len(X),
+            'max_abs_error': float(np.abs(proba - ref_proba).max()),
+            'mean_abs_error': float(np.abs(proba - ref_proba).mean()),
+            'label_agreement': float((labels == ref_labels).mean()),
+        }
+
+
+def load_basic_grid(engine, path=GRID_FILE):
+    """Grid for the loaded Basic engine, or the engine itself when no usable
+    grid exists."""
+    try:
+        return RiskGrid.load(engine, path)
+    except (OSError, ValueError, KeyError) as e:
+        print(f"Risk grid not used: {e}")
+        return engine
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Precomputed lookup grid for the Basic model")
+    parser.add_argument('command', choices=['build', 'verify'])
+    parser.add_argument('--bmi-step', type=float, default=DEFAULT_STEPS['BMI'])
+    parser.add_argument('--bp-step', type=float, default=DEFAULT_STEPS['SystolicBP'])
+    parser.add_argument('--samples', type=int, default=200000)
+    parser.add_argument('--output', default=GRID_FILE)
+    args = parser.parse_args(argv)
+
+    engine, config, source = load_deployment('basic')
+    if args.command == 'build':
+        steps = {'BMI': args.bmi_step, 'SystolicBP': args.bp_step, 'DiastolicBP': args.bp_step}
+        grid = RiskGrid.build(engine, config['feature_ranges'], steps)
+        grid.save(args.output)
+        print(f"✓ {args.output}: {' x '.join(str(n) for n in grid.shape)} grid from {source}")
+    else:
+        grid = RiskGrid.load(engine, args.output)
+    report = grid.verify(args.samples)
+    print(f"Verified on {report['samples']:,} points: max probability error "
+          f"{report['max_abs_error']:.2e}, mean {report['mean_abs_error']:.2e}, "
+          f"label agreement {report['label_agreement'] * 100:.3f}%")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
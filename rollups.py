@@ -0,0 +1,205 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Analytics Rollups
+Per-day, per-health-worker, per-model, per-risk counts and vital sums,
+updated on every save so the dashboard never rescans the history
+
+Rebuild from the full history (after restoring a backup, or when stations
+saved without the rollups):
+    python rollups.py rebuild [--backend csv|sqlite]
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+import threading
+import pandas as pd
+from history_store import open_history_store, HISTORY_BACKEND
+
+ROLLUP_DB = 'assessment_rollups.db'
+GROUP_COLUMNS = ['Day', 'Health_Worker', 'Model_Used', 'Risk_Level']
+SUM_COLUMNS = {'SystolicBP': 'sum_systolic', 'DiastolicBP': 'sum_diastolic', 'BMI': 'sum_bmi'}
+
+
+def record_key(record):
+    return (str(record.get('Timestamp', ''))[:10], str(record.get('Health_Worker', '')),
+            str(record.get('Model_Used', '')), str(record.get('Risk_Level', '')))
+
+
+def record_vitals(record):
+    """(SystolicBP, DiastolicBP, BMI) as floats, or None when any is missing."""
+    try:
+        return tuple(float(record[c]) for c in SUM_COLUMNS)
+    except (KeyError, TypeError, ValueError):
+        return None
+
+
+def aggregate(df):
+    """Rollup rows for a frame of history records in one vectorized pass.
+
+    Returns a frame indexed by GROUP_COLUMNS with count, vitals (rows whose
+    vitals are all numeric) and the vital sums over those rows.
+    """
+    frame = pd.DataFrame({
+        'Day': df['Timestamp'].astype(str).str.slice(0, 10),
+        'Health_Worker': df['Health_Worker'].astype(str),
+        'Model_Used': df['Model_Used'].astype(str),
+        'Risk_Level': df['Risk_Level'].astype(str),
+    })
+    vitals = pd.DataFrame({name: pd.to_numeric(df[c], errors='coerce') for c, name in SUM_COLUMNS.items()})
+    valid = vitals.notna().all(axis=1)
+    frame['count'] = 1
+    frame['vitals'] = valid.astype(int)
+    for name in SUM_COLUMNS.values():
+        frame[name] = vitals[name].where(valid, 0.0)
+    return frame.groupby(GROUP_COLUMNS, sort=False).sum()
+
+
+class RollupStore:
+    """SQLite table of rollup rows keyed on (Day, Health_Worker, Model_Used,
+    Risk_Level). Adding a record is a single upsert; dashboard queries touch
+    rollup rows only, however long the history grows.
+
+    The database should sit next to the history it summarizes. Each station
+    adds only the records it saves itself, so a shared rollup file counts
+    every record exactly once.
+
+    A rebuild holds write_lock from reading the history until the table is
+    replaced, and add() takes it too. A caller that appends to the history
+    and then adds the record should hold write_lock across both. Otherwise a
+    rebuild running in between would count the record twice, or drop it.
+    """
+
+    def __init__(self, path=ROLLUP_DB):
+        self.path = path
+        # Saves run on worker threads and the dashboard reads on the GUI thread
+        self._lock = threading.Lock()
+        self.write_lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute(
+                "CREATE TABLE IF NOT EXISTS rollups (day TEXT, worker TEXT, model TEXT, risk TEXT, "
+                "count INTEGER, vitals INTEGER, sum_systolic REAL, sum_diastolic REAL, sum_bmi REAL, "
+                "PRIMARY KEY (day, worker, model, risk))")
+            self.conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+        self._upsert = (
+            "INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+            "ON CONFLICT (day, worker, model, risk) DO UPDATE SET "
+            "count = count + excluded.count, vitals = vitals + excluded.vitals, "
+            "sum_systolic = sum_systolic + excluded.sum_systolic, "
+            "sum_diastolic = sum_diastolic + excluded.sum_diastolic, "
+            "sum_bmi = sum_bmi + excluded.sum_bmi")
+
+    def add(self, record):
+        vitals = record_vitals(record)
+        row = record_key(record) + (1, 1 if vitals else 0) + (vitals or (0.0, 0.0, 0.0))
+        with self.write_lock, self._lock, self.conn:
+            self.conn.execute(self._upsert, row)
+            self.conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'rows'")
+
+    def rebuild(self, store, chunk_size=100000):
+        """Replace the rollups with a fresh aggregation of every record in store.
+        Returns the number of records aggregated."""
+        with self.write_lock:
+            return self._rebuild(store, chunk_size)
+
+    def _rebuild(self, store, chunk_size):
+        partials = []
+        total = 0
+        for chunk in store.iter_chunks(chunk_size):
+            partials.append(aggregate(pd.DataFrame.from_records(chunk)))
+            total += len(chunk)
+        rows = []
+        if partials:
+            combined = pd.concat(partials).groupby(level=GROUP_COLUMNS, sort=False).sum()
+            values = combined[['count', 'vitals', *SUM_COLUMNS.values()]].itertuples(index=False, name=None)
+            rows = [tuple(map(str, key)) + (int(c), int(v), float(sbp), float(dbp), float(bmi))
+                    for key, (c, v, sbp, dbp, bmi) in zip(combined.index, values)]
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM rollups")
+            self.conn.executemany("INSERT INTO rollups VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built_from', ?)",
+                              (self._source(store),))
+            # History rows counted; add() keeps it current
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('rows', ?)", (total,))
+        return total
+
+    def invalidate(self):
+        """Forget that the rollups match the history, e.g. after a failed add."""
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM meta WHERE key IN ('built_from', 'rows')")
+
+    @staticmethod
+    def _source(store):
+        return os.path.abspath(store.path) if store.path else ''
+
+    def is_built(self, store):
+        """True once the rollups were rebuilt from store's history. Saves
+        alone only count new records, so until then the history is missing."""
+        with self._lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'built_from'").fetchone()
+        return row is not None and row[0] == self._source(store)
+
+    def months(self):
+        """Months with data, newest first, as 'YYYY-MM'."""
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT DISTINCT substr(day, 1, 7) AS month FROM rollups ORDER BY month DESC").fetchall()
+        return [r[0] for r in rows]
+
+    def summary(self, month=None, by='worker'):
+        """Per-worker (or per-model) rows for a month, or for all time:
+        [{'key', 'Low', 'Moderate', 'High', 'total', 'mean_systolic',
+          'mean_diastolic', 'mean_bmi'}], largest total first."""
+        if by not in ('worker', 'model'):
+            raise ValueError(f"Unknown rollup grouping: {by}")
+        # A range on day, the leading primary key column, so SQLite can use the index
+        where, args = ("WHERE day >= ? AND day <= ?", [f"{month}-01", f"{month}-31"]) if month else ("", [])
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT {by}, risk, SUM(count), SUM(vitals), SUM(sum_systolic), SUM(sum_diastolic), "
+                f"SUM(sum_bmi) FROM rollups {where} GROUP BY {by}, risk", args).fetchall()
+        result = {}
+        for key, risk, count, vitals, systolic, diastolic, bmi in rows:
+            entry = result.setdefault(key, {'key': key, 'Low': 0, 'Moderate': 0, 'High': 0, 'total': 0,
+                                            'vitals': 0, 'sum_systolic': 0.0, 'sum_diastolic': 0.0,
+                                            'sum_bmi': 0.0})
+            entry[risk] = entry.get(risk, 0) + count
+            entry['total'] += count
+            entry['vitals'] += vitals
+            entry['sum_systolic'] += systolic
+            entry['sum_diastolic'] += diastolic
+            entry['sum_bmi'] += bmi
+        for entry in result.values():
+            n = entry.pop('vitals')
+            for name, mean in (('sum_systolic', 'mean_systolic'), ('sum_diastolic', 'mean_diastolic'),
+                               ('sum_bmi', 'mean_bmi')):
+                total = entry.pop(name)
+                entry[mean] = total / n if n else float('nan')
+        return sorted(result.values(), key=lambda e: -e['total'])
+
+    def close(self):
+        with self._lock:
+            self.conn.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maintain the assessment analytics rollups")
+    parser.add_argument('command', choices=['rebuild'])
+    parser.add_argument('--backend', default=HISTORY_BACKEND, choices=['csv', 'sqlite'])
+    parser.add_argument('--db', default=ROLLUP_DB)
+    args = parser.parse_args(argv)
+    store = open_history_store(args.backend)
+    rollups = RollupStore(args.db)
+    try:
+        total = rollups.rebuild(store)
+    finally:
+        rollups.close()
+        store.close()
+    print(f"✓ Rebuilt {args.db} from {total:,} records")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,159 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Scoring Engine
+Pure-NumPy inference for the StandardScaler + LogisticRegression pairs
+"""
+
+import hashlib
+import pickle
+import numpy as np
+
+FULL_MODEL_FILES = ('model_BEST_for_deployment.pkl', 'scaler.pkl')
+BASIC_MODEL_FILES = ('model_BASIC_for_deployment.pkl', 'scaler_BASIC.pkl')
+RISK_LABELS = {0: 'Low', 1: 'Moderate', 2: 'High'}
+FULL_MODEL_NAME = "Full Model (5 features)"
+BASIC_MODEL_NAME = "Basic Model (3 features)"
+
+# Model feature name -> assessment_history.csv column
+HISTORY_COLUMNS = {
+    'BMI': 'BMI', 'SystolicBP': 'SystolicBP', 'DiastolicBP': 'DiastolicBP',
+    'Blood Sugar Level': 'Blood_Sugar', 'Hemoglobin Level': 'Hemoglobin'
+}
+RESULT_COLUMNS = ['Risk_Level', 'Confidence', 'Prob_Low', 'Prob_Moderate', 'Prob_High', 'Model_Used']
+
+
+class ScoringEngine:
+    """Scores feature vectors with the parameters of a fitted scaler/model pair.
+
+    The arithmetic mirrors StandardScaler.transform followed by the multinomial
+    LogisticRegression decision function and softmax, step for step, so the
+    label and probabilities are bit-identical to predict/predict_proba. The
+    label is taken from the same decision scores as the probabilities, so one
+    pass yields both.
+    """
+
+    def __init__(self, feature_names, mean, scale, coef, intercept, classes):
+        self.feature_names = list(feature_names)
+        self.mean = np.asarray(mean, dtype=np.float64)
+        self.scale = np.asarray(scale, dtype=np.float64)
+        # Keep the transposed view: BLAS must see the same memory layout as
+        # sklearn for the dot products to round identically.
+        self.coef_t = np.asarray(coef, dtype=np.float64).T
+        self.intercept = np.asarray(intercept, dtype=np.float64)
+        self.classes = np.asarray(classes)
+        n = len(self.feature_names)
+        if self.mean.shape != (n,) or self.scale.shape != (n,) or self.coef_t.shape[0] != n:
+            raise ValueError("Scaler and model parameters do not match the feature list")
+        if self.coef_t.shape[1] != len(self.classes) or self.intercept.shape != (len(self.classes),):
+            raise ValueError("Model coefficients do not match the class list")
+        # Identifies these exact parameters, e.g. for caches keyed on the model
+        digest = hashlib.sha1("|".join(self.feature_names).encode('utf-8'))
+        for arr in (self.mean, self.scale, coef, self.intercept, self.classes):
+            digest.update(np.ascontiguousarray(arr).tobytes())
+        self.fingerprint = digest.hexdigest()[:16]
+
+    @classmethod
+    def from_estimators(cls, model, scaler):
+        if getattr(model, 'multi_class', 'multinomial') == 'ovr' or len(model.classes_) < 3:
+            raise ValueError("Only multinomial logistic regression models are supported")
+        return cls(scaler.feature_names_in_, scaler.mean_, scaler.scale_,
+                   model.coef_, model.intercept_, model.classes_)
+
+    @classmethod
+    def from_pickles(cls, model_path, scaler_path):
+        with open(model_path, 'rb') as f:
+            model = pickle.load(f)
+        with open(scaler_path, 'rb') as f:
+            scaler = pickle.load(f)
+        return cls.from_estimators(model, scaler)
+
+    @property
+    def n_features(self):
+        return len(self.feature_names)
+
+    def vector(self, values):
+        """Build a feature row from a {feature name: value} mapping."""
+        return np.array([values[name] for name in self.feature_names], dtype=np.float64)
+
+    def score_batch(self, X):
+        """Return (labels, probabilities) for an (n_samples, n_features) array."""
+        X = np.array(X, dtype=np.float64, ndmin=2)
+        if X.shape[1] != self.n_features:
+            raise ValueError(f"Expected {self.n_features} features, got {X.shape[1]}")
+        X -= self.mean
+        X /= self.scale
+        scores = X @ self.coef_t + self.intercept
+        labels = self.classes[scores.argmax(axis=1)]
+        scores -= scores.max(axis=1).reshape((-1, 1))
+        np.exp(scores, scores)
+        scores /= scores.sum(axis=1).reshape((-1, 1))
+        return labels, scores
+
+    def score(self, values):
+        """Return (label, probabilities) for a single feature row."""
+        labels, proba = self.score_batch(values)
+        return labels[0], proba[0]
+
+
+def load_engines():
+    """Load the Full and Basic engines from the deployment pickles."""
+    return ScoringEngine.from_pickles(*FULL_MODEL_FILES), ScoringEngine.from_pickles(*BASIC_MODEL_FILES)
+
+
+# pandas is imported inside the DataFrame helpers so that scoring from a
+# model bundle needs nothing but NumPy.
+
+def feature_matrix(df, engine):
+    """Numeric (n_rows, n_features) matrix in the engine's feature order."""
+    import pandas as pd
+    cols = [HISTORY_COLUMNS[name] for name in engine.feature_names]
+    return np.column_stack([pd.to_numeric(df[c], errors='coerce').to_numpy(dtype=np.float64) for c in cols])
+
+
+def lab_mask(df):
+    """Rows that carry both lab values - the same rule as the lab_available toggle."""
+    import pandas as pd
+    mask = np.ones(len(df), dtype=bool)
+    for col in (HISTORY_COLUMNS['Blood Sugar Level'], HISTORY_COLUMNS['Hemoglobin Level']):
+        if col not in df.columns:
+            return np.zeros(len(df), dtype=bool)
+        mask &= pd.to_numeric(df[col], errors='coerce').notna().to_numpy()
+    return mask
+
+
+def score_frame(df, engine_full, engine_basic, risk_labels=RISK_LABELS):
+    """Score every row of a history-shaped DataFrame.
+
+    Rows with lab values go to the Full model and the rest to the Basic model;
+    each group is scored as one matrix. Rows missing a required vital sign get
+    Risk_Level 'N/A' and NaN probabilities.
+    """
+    import pandas as pd
+    n = len(df)
+    proba = np.full((n, 3), np.nan)
+    labels = np.full(n, -1, dtype=np.int64)
+    model_used = np.full(n, 'N/A', dtype=object)
+    use_full = lab_mask(df)
+    for engine, rows, name in ((engine_full, use_full, FULL_MODEL_NAME),
+                               (engine_basic, ~use_full, BASIC_MODEL_NAME)):
+        idx = np.flatnonzero(rows)
+        if not len(idx):
+            continue
+        X = feature_matrix(df.iloc[idx], engine)
+        valid = ~np.isnan(X).any(axis=1)
+        idx, X = idx[valid], X[valid]
+        if not len(idx):
+            continue
+        labels[idx], proba[idx] = engine.score_batch(X)
+        model_used[idx] = name
+    scored = labels >= 0
+    safe = np.maximum(labels, 0)
+    names = np.array([risk_labels[k] for k in sorted(risk_labels)], dtype=object)
+    confidence = proba[np.arange(n), safe] * 100
+    out = pd.DataFrame(index=df.index)
+    out['Risk_Level'] = np.where(scored, names[safe], 'N/A')
+    out['Confidence'] = np.where(scored, np.char.mod('%.1f%%', np.nan_to_num(confidence)), 'N/A')
+    out['Prob_Low'] = proba[:, 0]
+    out['Prob_Moderate'] = proba[:, 1]
+    out['Prob_High'] = proba[:, 2]
+    out['Model_Used'] = model_used
+    return out
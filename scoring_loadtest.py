@@ -0,0 +1,115 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Scoring Service Load Test
+Drives scoring_server.py with concurrent keep-alive clients and reports
+requests/sec and p50/p99 latency
+
+Usage: python scoring_loadtest.py [--url http://127.0.0.1:8765] [--clients 32] [--requests 500]
+       python scoring_loadtest.py --spawn        (starts a local server on a free port)
+"""
+
+import argparse
+import http.client
+import json
+import random
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+from perf import LatencyStats
+
+
+def random_record(rng):
+    record = {
+        'BMI': round(rng.uniform(18.5, 35.0), 1),
+        'SystolicBP': rng.randint(90, 174),
+        'DiastolicBP': rng.randint(60, 112),
+    }
+    if rng.random() < 0.5:
+        record['Blood_Sugar'] = round(rng.uniform(4.0, 18.0), 1)
+        record['Hemoglobin'] = round(rng.uniform(9.5, 14.0), 1)
+    return record
+
+
+def run_client(host, port, requests, batch_size, seed, latencies, errors):
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(host, port, timeout=30)
+    path = '/score/batch' if batch_size > 1 else '/score'
+    try:
+        for _ in range(requests):
+            if batch_size > 1:
+                body = {'records': [random_record(rng) for _ in range(batch_size)]}
+            else:
+                body = random_record(rng)
+            data = json.dumps(body)
+            start = time.perf_counter()
+            conn.request('POST', path, data, {'Content-Type': 'application/json'})
+            response = conn.getresponse()
+            response.read()
+            latencies.append(time.perf_counter() - start)
+            if response.status != 200:
+                errors.append(response.status)
+    except Exception as e:
+        errors.append(str(e))
+    finally:
+        conn.close()
+
+
+def load_test(host, port, clients=32, requests=500, batch_size=1):
+    latencies, errors = [], []
+    threads = [threading.Thread(target=run_client,
+                                args=(host, port, requests, batch_size, i, latencies, errors))
+               for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    stats = LatencyStats(maxlen=None)
+    for seconds in latencies:
+        stats.add(seconds)
+    p50, p99 = stats.percentiles((50, 99)).values()
+    return {
+        'requests': len(latencies),
+        'records': len(latencies) * batch_size,
+        'errors': len(errors),
+        'seconds': elapsed,
+        'requests_per_sec': len(latencies) / elapsed if elapsed else 0.0,
+        'p50_ms': p50 * 1000,
+        'p99_ms': p99 * 1000,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Load test the maternal risk scoring server")
+    parser.add_argument('--url', default='http://127.0.0.1:8765')
+    parser.add_argument('--clients', type=int, default=32, help="Concurrent keep-alive connections")
+    parser.add_argument('--requests', type=int, default=500, help="Requests per client")
+    parser.add_argument('--batch-size', type=int, default=1, help="Records per request (>1 uses /score/batch)")
+    parser.add_argument('--spawn', action='store_true', help="Start a server in-process on a free port")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        from scoring_server import ScoringServer
+        server = ScoringServer(('127.0.0.1', 0))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        host, port = server.server_address
+    else:
+        url = urlparse(args.url)
+        host, port = url.hostname, url.port or 80
+    try:
+        stats = load_test(host, port, args.clients, args.requests, args.batch_size)
+    finally:
+        if server:
+            server.shutdown()
+            server.server_close()
+    print(f"Requests:     {stats['requests']:,} ({stats['records']:,} records, {stats['errors']} errors)")
+    print(f"Throughput:   {stats['requests_per_sec']:,.0f} requests/sec")
+    print(f"Latency p50:  {stats['p50_ms']:.2f} ms")
+    print(f"Latency p99:  {stats['p99_ms']:.2f} ms")
+    return 1 if stats['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,252 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Scoring Service
+Local HTTP scoring server for barangay stations, using the Full/Basic model pair
+
+Usage: python scoring_server.py [--host 127.0.0.1] [--port 8765] [--workers 64]
+
+Endpoints (JSON):
+    POST /score        {"BMI": 24.1, "SystolicBP": 120, "DiastolicBP": 80,
+                        "Blood_Sugar": 5.5, "Hemoglobin": 12.0}
+    POST /score/batch  {"records": [{...}, {...}]}
+    GET  /health
+Records use the assessment_history.csv column names; records with both lab
+values are scored by the Full model, the rest by the Basic model. Vitals
+must be finite numbers; values outside the training ranges are still scored
+(they are often the high-risk cases), as in the app.
+
+Each open connection holds one worker thread, so --workers is the number of
+stations served at once; further connections wait in the listen backlog, and
+connections idle for KEEPALIVE_TIMEOUT seconds are closed.
+"""
+
+import argparse
+import json
+import math
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+import numpy as np
+from model_bundle import load_deployment
+from scoring import HISTORY_COLUMNS, RISK_LABELS, FULL_MODEL_NAME, BASIC_MODEL_NAME
+
+MAX_BODY_BYTES = 8 * 1024 * 1024
+DEFAULT_WORKERS = 64
+LISTEN_BACKLOG = 256
+KEEPALIVE_TIMEOUT = 5
+LAB_COLUMNS = (HISTORY_COLUMNS['Blood Sugar Level'], HISTORY_COLUMNS['Hemoglobin Level'])
+
+
+def parse_record(record, engine_full, engine_basic):
+    """Pick the model for a record and build its feature row.
+
+    Returns (use_full, row); raises ValueError for a missing, non-numeric or
+    non-finite (NaN, Infinity) vital.
+    """
+    if not isinstance(record, dict):
+        raise ValueError("Each record must be a JSON object")
+    use_full = True
+    for column in LAB_COLUMNS:
+        try:
+            use_full = use_full and math.isfinite(float(record.get(column)))
+        except (TypeError, ValueError):
+            use_full = False
+    engine = engine_full if use_full else engine_basic
+    row = []
+    for name in engine.feature_names:
+        column = HISTORY_COLUMNS[name]
+        try:
+            value = float(record[column])
+        except KeyError:
+            raise ValueError(f"Missing field: {column}")
+        except (TypeError, ValueError):
+            raise ValueError(f"Field {column} must be a number")
+        if not math.isfinite(value):
+            raise ValueError(f"Field {column} must be a finite number")
+        row.append(value)
+    return use_full, row
+
+
+def format_result(label, proba, use_full):
+    return {
+        'Risk_Level': RISK_LABELS[int(label)],
+        'Confidence': f"{proba[int(label)] * 100:.1f}%",
+        'Probabilities': {RISK_LABELS[i]: float(p) for i, p in enumerate(proba)},
+        'Model_Used': FULL_MODEL_NAME if use_full else BASIC_MODEL_NAME,
+    }
+
+
+def score_rows(parsed, engine_full, engine_basic):
+    """Score (use_full, row) pairs with one matrix call per model, in order."""
+    results = [None] * len(parsed)
+    for use_full, engine in ((True, engine_full), (False, engine_basic)):
+        idx = [i for i, (full, _) in enumerate(parsed) if full == use_full]
+        if not idx:
+            continue
+        labels, proba = engine.score_batch(np.array([parsed[i][1] for i in idx]))
+        for i, label, p in zip(idx, labels, proba):
+            results[i] = format_result(label, p, use_full)
+    return results
+
+
+class MicroBatcher:
+    """Coalesces concurrent single-record requests into one vectorized call.
+
+    The dispatcher thread waits for a first request, gathers whatever else
+    arrives within max_wait seconds (up to max_batch records) and scores the
+    lot together.
+    """
+
+    def __init__(self, engine_full, engine_basic, max_batch=256, max_wait=0.002):
+        self.engine_full = engine_full
+        self.engine_basic = engine_basic
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.batches = 0
+        self.records = 0
+        self._thread = threading.Thread(target=self._run, name="MicroBatcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, parsed):
+        future = Future()
+        self.queue.put((parsed, future))
+        return future
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.perf_counter() + self.max_wait
+            while len(batch) < self.max_batch:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self.queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                results = score_rows([p for p, _ in batch], self.engine_full, self.engine_basic)
+                for (_, future), result in zip(batch, results):
+                    future.set_result(result)
+            except Exception as e:
+                for _, future in batch:
+                    future.set_exception(e)
+            self.batches += 1
+            self.records += len(batch)
+
+
+class ScoringHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'   # keep-alive
+    timeout = KEEPALIVE_TIMEOUT     # close idle keep-alive connections
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload):
+        body = json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        if length <= 0 or length > MAX_BODY_BYTES:
+            raise ValueError("Request body missing or too large")
+        return json.loads(self.rfile.read(length))
+
+    def do_GET(self):
+        if self.path != '/health':
+            self.send_json(404, {'error': 'Not found'})
+            return
+        server = self.server
+        self.send_json(200, {
+            'status': 'ok', 'models': server.model_sources,
+            'batches': server.batcher.batches, 'records': server.batcher.records,
+        })
+
+    def do_POST(self):
+        server = self.server
+        try:
+            payload = self.read_json()
+            if self.path == '/score':
+                parsed = parse_record(payload, server.engine_full, server.engine_basic)
+                self.send_json(200, server.batcher.submit(parsed).result())
+            elif self.path == '/score/batch':
+                records = payload.get('records') if isinstance(payload, dict) else None
+                if not isinstance(records, list):
+                    raise ValueError("Expected {\"records\": [...]}")
+                parsed = [parse_record(r, server.engine_full, server.engine_basic) for r in records]
+                self.send_json(200, {'results': score_rows(parsed, server.engine_full, server.engine_basic)})
+            else:
+                self.send_json(404, {'error': 'Not found'})
+        except ValueError as e:
+            self.send_json(400, {'error': str(e)})
+        except Exception as e:
+            self.send_json(500, {'error': f"Scoring failed: {e}"})
+
+
+class ScoringServer(HTTPServer):
+    """HTTPServer that serves each connection on a bounded thread pool."""
+
+    allow_reuse_address = True
+    # Room for a burst of stations connecting at once; the default of 5
+    # resets connections beyond it
+    request_queue_size = LISTEN_BACKLOG
+
+    def __init__(self, address, workers=DEFAULT_WORKERS, max_batch=256, max_wait=0.002):
+        self.engine_full, _, source_full = load_deployment('full')
+        self.engine_basic, _, source_basic = load_deployment('basic')
+        self.model_sources = {'full': source_full, 'basic': source_basic}
+        self.batcher = MicroBatcher(self.engine_full, self.engine_basic, max_batch, max_wait)
+        self.pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ScoringWorker")
+        super().__init__(address, ScoringHandler)
+
+    def process_request(self, request, client_address):
+        self.pool.submit(self._serve_connection, request, client_address)
+
+    def _serve_connection(self, request, client_address):
+        try:
+            self.finish_request(request, client_address)
+        except Exception:
+            self.handle_error(request, client_address)
+        finally:
+            self.shutdown_request(request)
+
+    def server_close(self):
+        super().server_close()
+        self.pool.shutdown(wait=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Maternal risk scoring server")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--workers', type=int, default=DEFAULT_WORKERS,
+                        help=f"Connections served at once (default {DEFAULT_WORKERS})")
+    parser.add_argument('--max-batch', type=int, default=256, help="Largest micro-batch")
+    parser.add_argument('--max-wait-ms', type=float, default=2.0, help="Micro-batch gathering window")
+    args = parser.parse_args(argv)
+    try:
+        server = ScoringServer((args.host, args.port), args.workers, args.max_batch, args.max_wait_ms / 1000)
+    except Exception as e:
+        print(f"Failed to start scoring server: {e}")
+        return 1
+    print(f"✓ Scoring server on http://{args.host}:{server.server_address[1]} "
+          f"({server.model_sources['full']}, {server.model_sources['basic']})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
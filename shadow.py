@@ -0,0 +1,173 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Shadow Scoring
+Scores every assessment with a candidate model pair in the background, for
+comparison with the deployed pair before the candidate is promoted
+
+Enable by pointing MRS_SHADOW_DIR at a folder holding the candidate files
+under the deployed names (the pickles or the exported bundles, plus both
+configs). Candidate results are never shown; they
+are appended to MRS_SHADOW_LOG (default shadow_log.jsonl) next to the
+primary's.
+
+Summarize a log:
+    python shadow.py [shadow_log.jsonl]
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from model_bundle import load_deployment
+from scoring import RISK_LABELS
+
+SHADOW_DIR = os.environ.get('MRS_SHADOW_DIR', '')
+SHADOW_LOG = os.environ.get('MRS_SHADOW_LOG', 'shadow_log.jsonl')
+# Candidate results later than this after the assessment are not compared
+SHADOW_BUDGET_MS = float(os.environ.get('MRS_SHADOW_BUDGET_MS', '50'))
+# Assessments waiting for the candidate; beyond this they are dropped
+SHADOW_QUEUE_SIZE = 64
+LEVELS = list(RISK_LABELS.values())
+
+
+class ConfusionSummary:
+    """Primary vs candidate risk levels plus timeout and drop counts."""
+
+    def __init__(self):
+        self.matrix = {(p, c): 0 for p in LEVELS for c in LEVELS}
+        self.timeouts = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def add(self, entry):
+        status = entry.get('status')
+        if status == 'ok':
+            self.matrix[entry['primary'], entry['candidate']] += 1
+        elif status == 'timeout':
+            self.timeouts += 1
+        elif status == 'dropped':
+            self.dropped += 1
+        else:
+            self.errors += 1
+
+    @property
+    def compared(self):
+        return sum(self.matrix.values())
+
+    @property
+    def agreement(self):
+        n = self.compared
+        return sum(self.matrix[level, level] for level in LEVELS) / n if n else float('nan')
+
+    def report(self):
+        corner = "primary \\ candidate"
+        lines = [f"Shadow scoring: {self.compared:,} compared, agreement {self.agreement:.1%}, "
+                 f"{self.timeouts:,} over budget, {self.dropped:,} dropped, {self.errors:,} errors",
+                 f"  {corner:<22}" + "".join(f"{c:>10}" for c in LEVELS)]
+        for p in LEVELS:
+            lines.append(f"  {p:<22}" + "".join(f"{self.matrix[p, c]:>10,}" for c in LEVELS))
+        return "\n".join(lines)
+
+
+class ShadowScorer:
+    """Background thread that scores assessments with the candidate pair.
+
+    submit() only enqueues, so the primary path pays for one queue put. An
+    assessment whose candidate result is not ready within budget_ms of the
+    submit is logged as a timeout and left out of the comparison; when the
+    queue is full, new submissions are dropped rather than waited for.
+    """
+
+    def __init__(self, root=SHADOW_DIR, log_path=SHADOW_LOG, budget_ms=SHADOW_BUDGET_MS):
+        self.engines = {kind: load_deployment(kind, root)[0] for kind in ('full', 'basic')}
+        self.budget = budget_ms / 1000
+        self.summary = ConfusionSummary()
+        self._queue = queue.Queue(maxsize=SHADOW_QUEUE_SIZE)
+        self._lock = threading.Lock()
+        self._log = open(log_path, 'a', encoding='utf-8', buffering=1)
+        self._thread = threading.Thread(target=self._run, name="ShadowScorer", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind, input_data, primary_label, primary_proba):
+        """Queue one assessment; never blocks."""
+        item = (time.perf_counter(), time.strftime('%Y-%m-%d %H:%M:%S'), kind,
+                dict(input_data), primary_label, [float(p) for p in primary_proba])
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            self._write({'timestamp': item[1], 'model': kind, 'primary': primary_label,
+                         'status': 'dropped'})
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            submitted, stamp, kind, input_data, primary_label, primary_proba = item
+            entry = {'timestamp': stamp, 'model': kind, 'inputs': input_data,
+                     'primary': primary_label, 'primary_proba': primary_proba}
+            try:
+                if time.perf_counter() - submitted > self.budget:
+                    entry['status'] = 'timeout'
+                else:
+                    engine = self.engines[kind]
+                    label, proba = engine.score(engine.vector(input_data))
+                    elapsed = time.perf_counter() - submitted
+                    entry.update(candidate=RISK_LABELS[label], candidate_proba=[float(p) for p in proba],
+                                 latency_ms=round(elapsed * 1000, 3),
+                                 status='ok' if elapsed <= self.budget else 'timeout')
+            except Exception as e:
+                entry.update(status='error', error=str(e))
+            self._write(entry)
+
+    def _write(self, entry):
+        with self._lock:
+            self.summary.add(entry)
+            if not self._log.closed:
+                self._log.write(json.dumps(entry) + "\n")
+
+    def close(self, timeout=1.0):
+        """Stop after the queued work (or timeout seconds) and close the log."""
+        try:
+            self._queue.put(None, timeout=timeout)
+        except queue.Full:
+            pass
+        self._thread.join(timeout)
+        with self._lock:
+            self._log.close()
+
+
+def open_shadow_scorer():
+    """ShadowScorer for MRS_SHADOW_DIR, or None when shadow mode is off or the
+    candidate cannot be loaded (the app runs normally either way)."""
+    if not SHADOW_DIR:
+        return None
+    try:
+        return ShadowScorer()
+    except Exception as e:
+        print(f"Shadow scoring disabled: {e}")
+        return None
+
+
+def summarize(log_path=SHADOW_LOG):
+    summary = ConfusionSummary()
+    with open(log_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                summary.add(json.loads(line))
+    return summary
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    path = argv[0] if argv else SHADOW_LOG
+    if not os.path.exists(path):
+        print(f"Shadow log not found: {path}")
+        return 1
+    print(summarize(path).report())
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,41 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - History File Tests
+Run with: python -m pytest -q
+"""
+
+import csv
+from history import HistoryWriter, HISTORY_COLUMNS
+
+
+def record(patient_id):
+    return {'Timestamp': '2026-10-16 09:00:00', 'Patient_ID': patient_id, 'BMI': 24.1,
+            'SystolicBP': 120, 'DiastolicBP': 80, 'Risk_Level': 'Low', 'Health_Worker': 'Ana'}
+
+
+def test_append_after_torn_write_by_another_writer(tmp_path):
+    path = str(tmp_path / 'history.csv')
+    crashed, running = HistoryWriter(path), HistoryWriter(path)
+    crashed.append(record('P1'))
+    # The first instance dies halfway through writing its next row
+    with open(path, 'ab') as f:
+        f.write(b'2026-10-16 09:05:00,P2,,23.')
+    running.append(record('P3'))
+
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    assert [r['Patient_ID'] for r in rows] == ['P1', 'P3']
+    assert all(len(r) == len(HISTORY_COLUMNS) for r in rows)
+    with open(path + '.torn', 'rb') as f:
+        assert f.read() == b'2026-10-16 09:05:00,P2,,23.\n'
+    assert HistoryWriter(path).recover() is None
+
+
+def test_recover_quarantines_torn_tail(tmp_path):
+    path = str(tmp_path / 'history.csv')
+    writer = HistoryWriter(path)
+    writer.append(record('P1'))
+    with open(path, 'ab') as f:
+        f.write(b'2026-10-16,P2')
+    assert writer.recover() == "removed torn last line (13 bytes)"
+    with open(path + '.torn', 'rb') as f:
+        assert f.read() == b'2026-10-16,P2\n'
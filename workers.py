@@ -0,0 +1,81 @@
+"""
+MATERNAL RISK ASSESSMENT SYSTEM - Background Tasks
+Runs slow operations on the Qt thread pool with signal-based completion
+"""
+
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+
+class WorkerSignals(QObject):
+    finished = pyqtSignal(object)
+    failed = pyqtSignal(str)
+    progress = pyqtSignal(object, object)
+
+
+class Worker(QRunnable):
+    def __init__(self, fn, *args, **kwargs):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.signals = WorkerSignals()
+
+    def run(self):
+        try:
+            result = self.fn(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.failed.emit(str(e))
+        else:
+            self.signals.finished.emit(result)
+
+
+class TaskRunner(QObject):
+    """Submits keyed tasks to a QThreadPool.
+
+    A task whose key is already running is ignored, so a second click on a
+    button cannot start the same operation twice. busyChanged reports when
+    the first task starts and the last one finishes. Callbacks run on the
+    GUI thread.
+    """
+
+    busyChanged = pyqtSignal(bool)
+
+    def __init__(self, parent=None, pool=None):
+        super().__init__(parent)
+        self.pool = pool or QThreadPool.globalInstance()
+        self.running = {}
+
+    def is_running(self, key):
+        return key in self.running
+
+    def run(self, key, fn, *args, on_done=None, on_error=None, on_progress=None, **kwargs):
+        """Start fn(*args, **kwargs) unless key is already running. Returns
+        False when the task was dropped as a duplicate.
+
+        With on_progress, fn also receives progress=callable(a, b); each call
+        is delivered to on_progress(a, b) on the GUI thread.
+        """
+        if key in self.running:
+            return False
+        worker = Worker(fn, *args, **kwargs)
+        if on_progress:
+            worker.kwargs['progress'] = worker.signals.progress.emit
+            worker.signals.progress.connect(on_progress)
+        worker.signals.finished.connect(lambda result: self._complete(key, on_done, result))
+        worker.signals.failed.connect(lambda message: self._complete(key, on_error, message))
+        # Keep the signals object alive until the task reports back
+        self.running[key] = worker.signals
+        if len(self.running) == 1:
+            self.busyChanged.emit(True)
+        self.pool.start(worker)
+        return True
+
+    def _complete(self, key, callback, value):
+        self.running.pop(key, None)
+        if not self.running:
+            self.busyChanged.emit(False)
+        if callback:
+            callback(value)
+
+    def wait(self, msecs=-1):
+        return self.pool.waitForDone(msecs)